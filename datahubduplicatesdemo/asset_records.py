@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Compact, pre-normalized asset records for the DataHub Duplicate Detector
+"""
+
+import hashlib
+import re
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from text_vectors import HashedTfidfVectorizer
+
+_NO_TOKENS = np.empty(0, dtype=np.int32)
+
+# Type and version annotations of v2 field paths, e.g. "[version=2.0].[type=struct]."
+_FIELD_PATH_ANNOTATIONS = re.compile(r'\[[^\]=]*=[^\]]*\]\.?')
+
+def lineage_fingerprint(urns: Iterable[str]) -> int:
+    """Hash a set of URNs, independent of their order, to a signed 64-bit integer."""
+    digest = hashlib.blake2b('\n'.join(sorted(set(urns))).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def column_signature(field: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Reduce a schema field to its (fieldPath, native type, description) signature.
+    
+    The path loses v2 annotations and case, the native type its whitespace and
+    case (falling back to the field type when no native type is known), and
+    the description is lowercased with whitespace collapsed.
+    """
+    path = _FIELD_PATH_ANNOTATIONS.sub('', field.get('fieldPath') or '').strip().lower()
+    native_type = ''.join((field.get('nativeDataType') or field.get('type') or '').split()).lower()
+    description = ' '.join((field.get('description') or '').split()).lower()
+    return (path, native_type, description)
+
+class AssetRecord:
+    """One asset reduced to what the detectors and exporters need.
+    
+    Built once per run from the raw GraphQL entity, so the name is normalized,
+    the schema tokenized and the description hashed exactly once.
+    """
+    __slots__ = (
+        'urn', 'type', 'name', 'platform', 'description',
+        'normalized_name', 'group_key', 'schema_tokens', 'description_terms', 'name_signature',
+        'lineage', 'column_tokens', 'sql_signature'
+    )
+    
+    def __init__(self, urn: str, asset_type: str, name: str, platform: str, description: str,
+                 normalized_name: str, schema_tokens: np.ndarray = _NO_TOKENS,
+                 description_terms: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 name_signature: Optional[np.ndarray] = None,
+                 lineage: Optional[Tuple[int, int, int, int]] = None,
+                 column_tokens: np.ndarray = _NO_TOKENS,
+                 sql_signature: Optional[np.ndarray] = None):
+        self.urn = urn
+        self.type = asset_type
+        self.name = name
+        self.platform = platform
+        self.description = description
+        self.normalized_name = normalized_name
+        self.group_key = sys.intern(f"{platform}_{asset_type}")
+        self.schema_tokens = schema_tokens
+        self.description_terms = description_terms
+        # Precomputed MinHash signature of the normalized name, when restored from a store
+        self.name_signature = name_signature
+        # (upstream fingerprint, upstream count, downstream fingerprint, downstream count)
+        # for datasets with lineage, otherwise None
+        self.lineage = lineage
+        # Sorted IDs of the catalog's column signatures for this dataset's fields
+        self.column_tokens = column_tokens
+        # MinHash signature of the SQL body of a stored procedure or data job, if it has one
+        self.sql_signature = sql_signature
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the asset fields written to reports."""
+        return {
+            'urn': self.urn,
+            'type': self.type,
+            'name': self.name,
+            'platform': self.platform,
+            'description': self.description
+        }
+    
+    def with_signals(self, signals: Iterable[str]) -> 'AssetRecord':
+        """Copy of the record keeping only the listed signal fields (e.g. schema_tokens); the rest are empty."""
+        kept = {signal: getattr(self, signal) for signal in signals}
+        return AssetRecord(
+            self.urn, self.type, self.name, self.platform, self.description, self.normalized_name,
+            schema_tokens=kept.get('schema_tokens', _NO_TOKENS),
+            description_terms=kept.get('description_terms'),
+            name_signature=kept.get('name_signature'),
+            lineage=kept.get('lineage'),
+            column_tokens=kept.get('column_tokens', _NO_TOKENS),
+            sql_signature=kept.get('sql_signature')
+        )
+    
+    def __repr__(self) -> str:
+        return f"AssetRecord({self.urn!r})"
+
+class AssetCatalog:
+    """Ingests raw assets into AssetRecords, sharing one schema token vocabulary.
+    
+    Each distinct (fieldPath, type) pair is stored once; records hold sorted
+    int32 arrays of token IDs instead of lists of field dictionaries. Column
+    signatures (see column_signature) are interned the same way in a second
+    vocabulary.
+    """
+    
+    def __init__(self, extract_asset_info: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 normalize_name: Callable[[str], str], vectorizer: HashedTfidfVectorizer,
+                 sql_signature: Optional[Callable[[str], Optional[np.ndarray]]] = None):
+        self._extract_asset_info = extract_asset_info
+        self._normalize_name = normalize_name
+        self.vectorizer = vectorizer
+        self._sql_signature = sql_signature
+        self.records: List[AssetRecord] = []
+        self.schema_vocabulary: Dict[Tuple[str, str], int] = {}
+        self.column_vocabulary: Dict[Tuple[str, str, str], int] = {}
+    
+    def add(self, asset: Dict[str, Any]) -> AssetRecord:
+        """Turn one raw GraphQL entity into a record and keep it."""
+        return self.add_info(self._extract_asset_info(asset))
+    
+    def _schema_tokens(self, fields: Iterable[Tuple[str, str]]) -> np.ndarray:
+        """Map (fieldPath, type) pairs to a sorted array of shared token IDs."""
+        vocabulary = self.schema_vocabulary
+        token_ids = {vocabulary.setdefault(field, len(vocabulary)) for field in fields}
+        return np.array(sorted(token_ids), dtype=np.int32) if token_ids else _NO_TOKENS
+    
+    def _column_tokens(self, columns: Iterable[Tuple[str, str, str]]) -> np.ndarray:
+        """Map column signatures to a sorted array of shared column token IDs."""
+        vocabulary = self.column_vocabulary
+        token_ids = {vocabulary.setdefault(column, len(vocabulary)) for column in columns}
+        return np.array(sorted(token_ids), dtype=np.int32) if token_ids else _NO_TOKENS
+    
+    def add_info(self, info: Dict[str, Any]) -> AssetRecord:
+        """Turn fields already extracted from an entity into a record and keep it."""
+        record = self.make_record(info)
+        self.records.append(record)
+        return record
+    
+    def make_record(self, info: Dict[str, Any]) -> AssetRecord:
+        """Turn fields already extracted from an entity into a record without keeping it."""
+        schema_tokens = column_tokens = _NO_TOKENS
+        if info['schema']:
+            schema_tokens = self._schema_tokens(
+                (field.get('fieldPath', ''), field.get('type', '')) for field in info['schema']
+            )
+            column_tokens = self._column_tokens(column_signature(field) for field in info['schema'])
+        sql = info.get('sql') or ''
+        sql_signature = self._sql_signature(sql) if sql and self._sql_signature is not None else None
+        description = info['description'] or ''
+        upstreams = info.get('upstreams') or []
+        downstreams = info.get('downstreams') or []
+        lineage = None
+        if upstreams or downstreams:
+            lineage = (lineage_fingerprint(upstreams), len(set(upstreams)),
+                       lineage_fingerprint(downstreams), len(set(downstreams)))
+        return AssetRecord(
+            urn=info['urn'],
+            asset_type=sys.intern(info['type'] or ''),
+            name=info['name'] or '',
+            platform=sys.intern(info['platform'] or ''),
+            description=description,
+            normalized_name=self._normalize_name(info['name']),
+            schema_tokens=schema_tokens,
+            description_terms=self.vectorizer.term_counts(description) if description else None,
+            lineage=lineage,
+            column_tokens=column_tokens,
+            sql_signature=sql_signature
+        )
+    
+    def restore(self, urn: str, asset_type: str, name: str, platform: str, description: str,
+                normalized_name: str, schema_fields: List[Tuple[str, str]],
+                description_terms: Optional[Tuple[np.ndarray, np.ndarray]],
+                name_signature: Optional[np.ndarray],
+                lineage: Optional[Tuple[int, int, int, int]] = None,
+                columns: Iterable[Tuple[str, str, str]] = (),
+                sql_signature: Optional[np.ndarray] = None) -> AssetRecord:
+        """Rebuild a record from stored, already normalized fields without keeping it."""
+        return AssetRecord(
+            urn=urn,
+            asset_type=sys.intern(asset_type),
+            name=name,
+            platform=sys.intern(platform),
+            description=description,
+            normalized_name=normalized_name,
+            schema_tokens=self._schema_tokens(schema_fields),
+            description_terms=description_terms,
+            name_signature=name_signature,
+            lineage=lineage,
+            column_tokens=self._column_tokens(columns),
+            sql_signature=sql_signature
+        )
+    
+    def add_all(self, assets: Iterable[Dict[str, Any]]) -> List[AssetRecord]:
+        """Ingest a stream of raw assets; each raw dict can be dropped once ingested."""
+        for asset in assets:
+            self.add(asset)
+        return self.records
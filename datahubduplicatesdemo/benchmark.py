@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Synthetic-catalog benchmark for the DataHub Duplicate Detector
+
+Generates catalogs with a controlled share of injected duplicates, times each
+detection stage on its own, samples peak memory and writes the results to a
+JSON file so runs can be compared across releases.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from duplicate_detector import DataHubDuplicateDetector
+from graphql_projection import projected_bytes
+from stage_metrics import PeakRssSampler, max_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Share of synthetic assets per entity type, and the platforms each type lives on
+ENTITY_MIX = [
+    ('dataset', 0.70, ['snowflake', 'bigquery', 'mssql', 'postgres']),
+    ('chart', 0.10, ['looker', 'tableau']),
+    ('dashboard', 0.10, ['looker', 'tableau']),
+    ('dataJob', 0.05, ['airflow', 'dbt']),
+    ('dataFlow', 0.05, ['airflow', 'dbt'])
+]
+
+NAME_WORDS = [
+    'customer', 'order', 'sales', 'revenue', 'product', 'inventory', 'account', 'user', 'event',
+    'payment', 'ledger', 'balance', 'transaction', 'item', 'region', 'store', 'supplier', 'invoice',
+    'shipment', 'return', 'campaign', 'session', 'click', 'margin', 'forecast', 'budget', 'employee',
+    'payroll', 'contract', 'claim', 'policy', 'risk', 'asset', 'portfolio', 'trade', 'position',
+    'daily', 'weekly', 'monthly', 'summary', 'detail', 'fact', 'dim', 'agg', 'snapshot', 'history',
+    'stage', 'raw', 'clean', 'report', 'metrics', 'kpi', 'pipeline', 'load', 'sync', 'export'
+]
+
+FIELD_TYPES = ['STRING', 'NUMBER', 'BOOLEAN', 'DATE', 'TIME']
+NATIVE_TYPES = {'STRING': 'VARCHAR(255)', 'NUMBER': 'NUMBER(38,0)', 'BOOLEAN': 'BOOLEAN', 'DATE': 'DATE', 'TIME': 'TIME'}
+
+# Scroll projections compared by --projection: label -> detection types, None for every field
+PROJECTIONS = {
+    'all_fields': None,
+    'name': ['name'],
+    'name,schema,description': ['name', 'schema', 'description'],
+    'schema': ['schema'],
+    'description': ['description'],
+    'lineage': ['lineage'],
+    'column': ['column'],
+    'sql': ['sql']
+}
+
+DESCRIPTION_BOILERPLATE = (
+    "This model contains one row per record and is maintained by the data platform team. "
+    "It is built from the staging layer and refreshed daily."
+)
+
+@dataclass
+class SyntheticCatalog:
+    """A synthetic catalog specification and the duplicates injected while generating it."""
+    size: int
+    duplicate_rate: float = 0.1
+    seed: int = 42
+    # (duplicate urn, source urn) per similarity type, filled in by assets()
+    injected: Dict[str, List[Tuple[str, str]]] = field(
+        default_factory=lambda: {'name': [], 'schema': [], 'description': [], 'lineage': [], 'cross_platform': [],
+                                 'column': [], 'sql': []}
+    )
+    
+    def assets(self, prefixes: List[str], suffixes: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yield assets shaped like iter_assets results.
+        
+        A duplicate_rate share of assets are near-copies of a recent original:
+        the name gets one of the configured prefixes or suffixes (or a small
+        edit), a dataset schema loses or gains a field, one description word is
+        replaced, a dataset keeps the upstream lineage of its source, and a data
+        job's load procedure is regenerated for another target table. Some
+        dataset copies instead land on another platform under a quoted,
+        upper-case qualified name, as a replication tool would load them.
+        """
+        rng = random.Random(self.seed)
+        field_pool = [
+            (f"{word}_{attribute}", field_type)
+            for word in NAME_WORDS
+            for attribute in ['id', 'key', 'name', 'code', 'amount', 'count', 'date', 'status', 'type',
+                              'created_at', 'updated_at', 'value', 'flag', 'rate', 'total']
+            for field_type in FIELD_TYPES
+        ]
+        # Low field indexes are picked far more often, like id/created_at columns in real schemas
+        field_cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(field_pool))))
+        description_words = [f"term{k}" for k in range(20000)]
+        type_names = [entity_type for entity_type, _, _ in ENTITY_MIX]
+        type_weights = [share for _, share, _ in ENTITY_MIX]
+        platforms = {entity_type: type_platforms for entity_type, _, type_platforms in ENTITY_MIX}
+        originals: List[Dict[str, Any]] = []
+        dataset_urns: List[str] = []
+        
+        for i in range(self.size):
+            if originals and rng.random() < self.duplicate_rate:
+                source = rng.choice(originals)
+                asset = self._near_copy(rng, source, i, prefixes, suffixes, field_pool, description_words)
+                if asset['platform'] == source['platform']:
+                    self.injected['name'].append((asset['urn'], source['urn']))
+                else:
+                    self.injected['cross_platform'].append((asset['urn'], source['urn']))
+                if asset.get('schemaMetadata'):
+                    self.injected['schema'].append((asset['urn'], source['urn']))
+                if asset['properties']['description']:
+                    self.injected['description'].append((asset['urn'], source['urn']))
+                if asset.get('upstreamLineage'):
+                    self.injected['lineage'].append((asset['urn'], source['urn']))
+                if asset.get('dataTransformLogic'):
+                    self.injected['sql'].append((asset['urn'], source['urn']))
+                yield asset
+                continue
+            
+            entity_type = rng.choices(type_names, type_weights)[0]
+            asset_platform = rng.choice(platforms[entity_type])
+            name = '_'.join(rng.sample(NAME_WORDS, rng.randint(2, 4))) + f"_{rng.randint(0, 99999)}"
+            description = ''
+            if rng.random() < 0.8:
+                description = f"{DESCRIPTION_BOILERPLATE} " + ' '.join(rng.choices(description_words, k=rng.randint(15, 40)))
+            asset = self._asset(i, entity_type, asset_platform, name, description)
+            if entity_type == 'dataset':
+                schema = set(rng.choices(field_pool, cum_weights=field_cum_weights, k=rng.randint(5, 40)))
+                asset['schemaMetadata'] = {'fields': [
+                    self._field(path, field_type) for path, field_type in sorted(schema)
+                ]}
+                if dataset_urns and rng.random() < 0.7:
+                    upstreams = rng.sample(dataset_urns, min(len(dataset_urns), rng.randint(1, 4)))
+                    asset['upstreamLineage'] = {'upstreams': [{'dataset': {'urn': urn}} for urn in upstreams]}
+                dataset_urns.append(asset['urn'])
+                if len(dataset_urns) > 10000:
+                    dataset_urns.pop(rng.randrange(len(dataset_urns)))
+            elif entity_type == 'dataJob':
+                asset['dataTransformLogic'] = self._procedure(rng, name, field_pool)
+            yield asset
+            
+            originals.append(asset)
+            # Bounded pool of recent originals keeps generation memory flat for large catalogs
+            if len(originals) > 10000:
+                originals.pop(rng.randrange(len(originals)))
+    
+    @staticmethod
+    def _procedure(rng: random.Random, target: str, field_pool: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """A T-SQL load procedure shaped like the sp_LoadTBL_* procedures in pimcodemo."""
+        columns = [path for path, _ in rng.sample(field_pool, rng.randint(8, 20))]
+        sql = (
+            f"CREATE PROCEDURE dbo.sp_Load_{target}\nAS\nBEGIN\n"
+            f"    INSERT INTO dbo.{target} ({', '.join(columns)})\n"
+            f"    SELECT {', '.join(f'STG.{column}' for column in columns)}\n"
+            f"    FROM dbo.stg_{rng.choice(NAME_WORDS)}_{rng.randint(1, 9)} STG\n"
+            f"    WHERE STG.{columns[0]} IS NOT NULL AND STG.{columns[1]} >= {rng.randint(0, 1000)};\n"
+            f"    PRINT 'Loaded ' + CAST(@@ROWCOUNT AS VARCHAR(10)) + ' rows into {target}';\n"
+            "END;"
+        )
+        return {'transforms': [{'queryStatement': {'value': sql}}]}
+    
+    @staticmethod
+    def _field(path: str, field_type: str) -> Dict[str, Any]:
+        return {'fieldPath': path, 'type': field_type, 'nativeDataType': NATIVE_TYPES[field_type], 'description': None}
+    
+    @staticmethod
+    def _asset(i: int, entity_type: str, asset_platform: str, name: str, description: str) -> Dict[str, Any]:
+        return {
+            'urn': f"urn:li:{entity_type}:(urn:li:dataPlatform:{asset_platform},synthetic.{name}.{i},PROD)",
+            'type': entity_type,
+            'name': name,
+            'platform': {'name': asset_platform},
+            'properties': {'name': name, 'description': description}
+        }
+    
+    def _near_copy(self, rng: random.Random, source: Dict[str, Any], i: int, prefixes: List[str],
+                   suffixes: List[str], field_pool: List[Tuple[str, str]],
+                   description_words: List[str]) -> Dict[str, Any]:
+        name = source['name']
+        asset_platform = source['platform']['name']
+        variant = rng.random()
+        if source['type'] == 'dataset' and rng.random() < 0.2:
+            dataset_platforms = next(type_platforms for entity_type, _, type_platforms in ENTITY_MIX
+                                     if entity_type == 'dataset')
+            asset_platform = rng.choice([other for other in dataset_platforms if other != asset_platform])
+            name = f'"ANALYTICS"."REPLICA_DBO"."{name.upper()}"'
+        elif variant < 0.4 and suffixes:
+            name = name + rng.choice(suffixes)
+        elif variant < 0.7 and prefixes:
+            name = rng.choice(prefixes) + name
+        elif variant < 0.85:
+            name = name.upper()
+        else:
+            name = name + 's'
+        
+        words = source['properties']['description'].split()
+        if words:
+            words[rng.randrange(len(words))] = rng.choice(description_words)
+        asset = self._asset(i, source['type'], asset_platform, name, ' '.join(words))
+        
+        if source.get('schemaMetadata'):
+            fields = list(source['schemaMetadata']['fields'])
+            if len(fields) > 3 and rng.random() < 0.5:
+                fields.pop(rng.randrange(len(fields)))
+            if rng.random() < 0.5:
+                path, field_type = rng.choice(field_pool)
+                fields.append(self._field(path, field_type))
+            asset['schemaMetadata'] = {'fields': fields}
+        if source.get('upstreamLineage'):
+            asset['upstreamLineage'] = source['upstreamLineage']
+        if source.get('dataTransformLogic'):
+            # The same template generated for another target table
+            sql = source['dataTransformLogic']['transforms'][0]['queryStatement']['value']
+            sql = sql.replace(source['name'], f"{source['name']}_{i}")
+            asset['dataTransformLogic'] = {'transforms': [{'queryStatement': {'value': sql}}]}
+        return asset
+
+class StageMeter:
+    """Measures wall time, CPU time and peak memory of one benchmark stage."""
+    
+    def __init__(self, interval: float = 0.01):
+        self.result: Dict[str, Any] = {}
+        self._sampler = PeakRssSampler(interval)
+    
+    def __enter__(self) -> 'StageMeter':
+        start_rss = self._sampler.start().start_bytes
+        self.result['rss_start_mb'] = round(start_rss / 2**20, 1) if start_rss else None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.result['wall_seconds'] = round(time.perf_counter() - self._wall, 3)
+        self.result['cpu_seconds'] = round(time.process_time() - self._cpu, 3)
+        peak = self._sampler.stop()
+        self.result['peak_rss_mb'] = round(peak / 2**20, 1) if peak else None
+
+def _recall(findings, injected: List[Tuple[str, str]]) -> Optional[float]:
+    """Share of injected duplicate pairs that ended up in the same finding."""
+    if not injected:
+        return None
+    cluster_of = {}
+    for index, finding in enumerate(findings):
+        for record in [finding.primary_asset] + finding.duplicate_assets:
+            cluster_of[record.urn] = index
+    found = sum(
+        1 for duplicate, source in injected
+        if duplicate in cluster_of and cluster_of[duplicate] == cluster_of.get(source)
+    )
+    return round(found / len(injected), 4)
+
+def run_benchmark(size: int, duplicate_rate: float, seed: int, detection_types: List[str],
+                  workers: int = 1) -> Dict[str, Any]:
+    """Benchmark one catalog size, timing ingest and each detection stage separately."""
+    detector = DataHubDuplicateDetector('http://localhost:8080', '')
+    detector.config.workers = workers
+    catalog = SyntheticCatalog(size=size, duplicate_rate=duplicate_rate, seed=seed)
+    stages = {}
+    
+    # Synthetic generation is lazy, so the ingest stage includes it
+    with StageMeter() as meter:
+        records = detector.build_records(
+            catalog.assets(detector.config.ignore_common_prefixes, detector.config.ignore_common_suffixes)
+        )
+    stages['ingest'] = meter.result
+    logger.info(f"[{size}] ingest: {meter.result}")
+    
+    stage_methods = {
+        'name': detector.detect_name_duplicates,
+        'schema': detector.detect_schema_duplicates,
+        'description': detector.detect_description_duplicates,
+        'lineage': detector.detect_lineage_duplicates,
+        'cross_platform': detector.detect_cross_platform_duplicates,
+        'column': detector.detect_column_duplicates,
+        'sql': detector.detect_sql_duplicates,
+        'combined': detector.detect_combined_duplicates
+    }
+    # The combined stage should find every pair injected for any of its signals
+    injected = dict(catalog.injected, combined=sorted(set(
+        catalog.injected['name'] + catalog.injected['schema'] + catalog.injected['description']
+    )))
+    for detection_type in detection_types:
+        with StageMeter() as meter:
+            findings = stage_methods[detection_type](records)
+        meter.result['findings'] = len(findings)
+        meter.result['injected_pairs'] = len(injected[detection_type])
+        meter.result['recall'] = _recall(findings, injected[detection_type])
+        stages[detection_type] = meter.result
+        logger.info(f"[{size}] {detection_type}: {meter.result}")
+        del findings
+    
+    return {
+        'size': size,
+        'duplicate_rate': duplicate_rate,
+        'seed': seed,
+        'assets': len(records),
+        'workers': workers,
+        'stages': stages,
+        'total_wall_seconds': round(sum(stage['wall_seconds'] for stage in stages.values()), 3),
+        'max_rss_mb': round(max_rss_bytes() / 2**20, 1) if max_rss_bytes() else None
+    }
+
+def run_projection_benchmark(size: int, duplicate_rate: float, seed: int) -> Dict[str, Any]:
+    """Compare the search-result bytes each scroll projection would fetch for one synthetic catalog."""
+    detector = DataHubDuplicateDetector('http://localhost:8080', '')
+    catalog = SyntheticCatalog(size=size, duplicate_rate=duplicate_rate, seed=seed)
+    totals = dict.fromkeys(PROJECTIONS, 0)
+    for asset in catalog.assets(detector.config.ignore_common_prefixes, detector.config.ignore_common_suffixes):
+        for label, detection_types in PROJECTIONS.items():
+            totals[label] += projected_bytes([asset], detection_types)
+    full = totals['all_fields']
+    projections = {
+        label: {'bytes': total, 'share_of_all_fields': round(total / full, 4) if full else None}
+        for label, total in totals.items()
+    }
+    for label, projection in projections.items():
+        logger.info(f"[{size}] {label}: {projection['bytes'] / 2**20:.1f} MB "
+                    f"({projection['share_of_all_fields']:.1%} of all fields)")
+    return {'size': size, 'duplicate_rate': duplicate_rate, 'seed': seed, 'projections': projections}
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the DataHub Duplicate Detector on synthetic catalogs')
+    
+    parser.add_argument('--sizes',
+                       help='Comma-separated catalog sizes (default: 1000,10000,100000,1000000)',
+                       default=','.join(str(size) for size in DEFAULT_SIZES))
+    
+    parser.add_argument('--duplicate-rate',
+                       type=float,
+                       help='Share of assets generated as near-duplicates of another asset (default: 0.1)',
+                       default=0.1)
+    
+    parser.add_argument('--detection-types',
+                       help='Comma-separated list of detection stages to time '
+                            '(default: name,schema,description,sql,lineage,cross_platform,column,combined)',
+                       default='name,schema,description,sql,lineage,cross_platform,column,combined')
+    
+    parser.add_argument('--workers',
+                       type=int,
+                       help='Worker processes used for detection (default: 1)',
+                       default=1)
+    
+    parser.add_argument('--seed',
+                       type=int,
+                       help='Random seed for catalog generation (default: 42)',
+                       default=42)
+    
+    parser.add_argument('--projection',
+                       action='store_true',
+                       help='Compare the GraphQL response bytes of each scroll projection instead of timing stages')
+    
+    parser.add_argument('--output',
+                       help='JSON file the results are written to (default: benchmark_results.json)',
+                       default='benchmark_results.json')
+    
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark suite and write the results file."""
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # The detector logs every stage; keep the benchmark output readable
+    logging.getLogger('duplicate_detector').setLevel(logging.WARNING)
+    
+    sizes = [int(size) for size in args.sizes.split(',')]
+    detection_types = [t.strip() for t in args.detection_types.split(',')]
+    
+    results = {
+        'benchmark': 'duplicate_detector',
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': asdict(DataHubDuplicateDetector('http://localhost:8080', '').config),
+        'runs': []
+    }
+    for size in sizes:
+        logger.info(f"Benchmarking {size} assets...")
+        if args.projection:
+            results['runs'].append(run_projection_benchmark(size, args.duplicate_rate, args.seed))
+        else:
+            results['runs'].append(run_benchmark(size, args.duplicate_rate, args.seed, detection_types, args.workers))
+        # Rewrite after every size so partial results survive an interrupted run
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    
+    logger.info(f"Benchmark results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
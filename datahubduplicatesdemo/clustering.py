@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Union-find clustering of pairwise duplicate matches for the DataHub Duplicate Detector
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+# (row i, row j, similarity score) with i < j
+ScoredPair = Tuple[int, int, float]
+
+class UnionFind:
+    """Disjoint sets over rows 0..size-1 with path compression and union by size."""
+    
+    def __init__(self, size: int):
+        self._parent = list(range(size))
+        self._size = [1] * size
+    
+    def find(self, row: int) -> int:
+        """Return the representative of a row's set, compressing the path to it."""
+        parent = self._parent
+        root = row
+        while parent[root] != root:
+            root = parent[root]
+        while parent[row] != root:
+            parent[row], row = root, parent[row]
+        return root
+    
+    def union(self, row1: int, row2: int) -> bool:
+        """Merge the sets of two rows; return False if they were already together."""
+        root1, root2 = self.find(row1), self.find(row2)
+        if root1 == root2:
+            return False
+        if self._size[root1] < self._size[root2]:
+            root1, root2 = root2, root1
+        self._parent[root2] = root1
+        self._size[root1] += self._size[root2]
+        return True
+    
+    def set_size(self, row: int) -> int:
+        """Return the number of rows in a row's set."""
+        return self._size[self.find(row)]
+
+def cluster_pairs(size: int, pairs: Iterable[ScoredPair]) -> List[Tuple[List[int], List[ScoredPair]]]:
+    """Merge scored pairs over rows 0..size-1 into connected clusters.
+    
+    Returns (members, pairs) for every cluster of two or more rows. Members and
+    pairs are sorted, and clusters are ordered by their first member, so the
+    result only depends on the set of pairs, not on the order they came in.
+    """
+    union_find = UnionFind(size)
+    pairs = sorted(pairs)
+    for i, j, _ in pairs:
+        union_find.union(i, j)
+    
+    members: Dict[int, Set[int]] = {}
+    cluster_pairs_by_root: Dict[int, List[ScoredPair]] = {}
+    for i, j, score in pairs:
+        root = union_find.find(i)
+        cluster_pairs_by_root.setdefault(root, []).append((i, j, score))
+        members.setdefault(root, set()).update((i, j))
+    
+    clusters = [(sorted(members[root]), cluster_pairs_by_root[root]) for root in members]
+    clusters.sort(key=lambda cluster: cluster[0][0])
+    return clusters
@@ -32,6 +32,29 @@ class DuplicateDetectorConfig:
     min_assets_for_duplicate: int = int(os.getenv('MIN_ASSETS_FOR_DUPLICATE', '2'))
     case_sensitive: bool = os.getenv('CASE_SENSITIVE', 'false').lower() == 'true'
     
+    # Catalog Scan Configuration
+    page_size: int = int(os.getenv('SEARCH_PAGE_SIZE', '500'))
+    fetch_workers: int = int(os.getenv('FETCH_WORKERS', '4'))
+    fetch_retries: int = int(os.getenv('FETCH_RETRIES', '4'))
+    
+    # Parallel Detection Configuration
+    workers: int = int(os.getenv('DETECTOR_WORKERS', '1'))
+    
+    # Lineage Detection Configuration
+    lineage_include_downstream: bool = os.getenv('LINEAGE_INCLUDE_DOWNSTREAM', 'false').lower() == 'true'
+    
+    # Incremental Detection Configuration (empty path = full run every time).
+    # Description and combined pairs between unchanged assets are re-scored but
+    # not searched again, so TF-IDF weight shifts can miss pairs a full run finds
+    signature_store_path: str = os.getenv('SIGNATURE_STORE_PATH', '')
+    
+    # Offline Snapshot Configuration (empty path = scan DataHub live)
+    snapshot_path: str = os.getenv('SNAPSHOT_PATH', '')
+    
+    # Disk-Backed Detection Configuration (empty spill directory = system temporary directory)
+    external_blocking: bool = os.getenv('EXTERNAL_BLOCKING', 'false').lower() == 'true'
+    spill_dir: str = os.getenv('SPILL_DIR', '')
+    
     # Common suffixes/prefixes to ignore
     ignore_common_suffixes: List[str] = None
     ignore_common_prefixes: List[str] = None
@@ -63,11 +86,15 @@ class DuplicateDetectorConfig:
         """Validate the configuration and return any errors."""
         errors = []
         
-        if not self.datahub_token:
-            errors.append("DATAHUB_GMS_TOKEN is required")
-        
-        if not self.datahub_gms_url:
-            errors.append("DATAHUB_GMS_URL is required")
+        # A snapshot run never contacts DataHub
+        if not self.snapshot_path:
+            if not self.datahub_token:
+                errors.append("DATAHUB_GMS_TOKEN is required")
+            
+            if not self.datahub_gms_url:
+                errors.append("DATAHUB_GMS_URL is required")
+        elif not os.path.isfile(self.snapshot_path):
+            errors.append(f"SNAPSHOT_PATH does not exist: {self.snapshot_path}")
         
         if not self.entity_types:
             errors.append("At least one entity type must be specified")
@@ -87,6 +114,24 @@ class DuplicateDetectorConfig:
         if self.min_assets_for_duplicate < 2:
             errors.append("MIN_ASSETS_FOR_DUPLICATE must be at least 2")
         
+        if not (1 <= self.page_size <= 10000):
+            errors.append("SEARCH_PAGE_SIZE must be between 1 and 10000")
+        
+        if self.fetch_workers < 1:
+            errors.append("FETCH_WORKERS must be at least 1")
+        
+        if self.fetch_retries < 0:
+            errors.append("FETCH_RETRIES must be at least 0")
+        
+        if self.workers < 1:
+            errors.append("DETECTOR_WORKERS must be at least 1")
+        
+        if self.spill_dir and not os.path.isdir(self.spill_dir):
+            errors.append(f"SPILL_DIR does not exist: {self.spill_dir}")
+        
+        if self.external_blocking and self.signature_store_path:
+            errors.append("EXTERNAL_BLOCKING cannot be combined with a signature store")
+        
         return errors
     
     def to_dict(self) -> dict:
@@ -100,6 +145,15 @@ class DuplicateDetectorConfig:
             'content_similarity_threshold': self.content_similarity_threshold,
             'min_assets_for_duplicate': self.min_assets_for_duplicate,
             'case_sensitive': self.case_sensitive,
+            'page_size': self.page_size,
+            'fetch_workers': self.fetch_workers,
+            'fetch_retries': self.fetch_retries,
+            'workers': self.workers,
+            'lineage_include_downstream': self.lineage_include_downstream,
+            'signature_store_path': self.signature_store_path,
+            'snapshot_path': self.snapshot_path,
+            'external_blocking': self.external_blocking,
+            'spill_dir': self.spill_dir,
             'ignore_common_suffixes': self.ignore_common_suffixes,
             'ignore_common_prefixes': self.ignore_common_prefixes
         }
@@ -6,29 +6,102 @@ Finds duplicated tables, views, stored procedures, and other assets in DataHub.
 
 import json
 import logging
+import multiprocessing
 import os
+import queue
+import random
 import re
-from collections import defaultdict
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Sequence, Set, Tuple
+import numpy as np
 import requests
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from dataclasses import asdict, dataclass, field, replace
 from difflib import SequenceMatcher
+from asset_records import AssetCatalog, AssetRecord
+from clustering import cluster_pairs
+from external_sort import ExternalSorter
+from graphql_projection import scroll_query
+from minhash_lsh import MinHasher, char_ngrams, hash_tokens, lsh_neighbors
+from qualified_names import name_agreement, schemas_match, split_qualified_name
+from report_writers import JsonArrayWriter, MarkdownReportWriter, finding_markdown, report_header
+from sample_estimates import StratumEstimate, estimate_stratum, exact_stratum, total_estimate, z_score
+from schema_index import SchemaTokenIndex
+from sharding import ShardPair, ShardPlan, shard_of
+from signature_store import IncrementalRun, SignatureStore, StoredPair, content_hash
+from similarity_index import SIGNALS, SimilarityIndex
+from snapshot import SnapshotReader
+from sparse_pairs import PAIR_CHUNK, pair_products
+from sql_signatures import SqlSignatures
+from stage_metrics import DetectionMetrics
+from threshold_sweep import ScoreMatrix, sweep_clusters
+from text_vectors import HashedTfidfVectorizer, cosine_top_k
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# GraphQL EntityType enum values for the entity type names used in configuration
+ENTITY_TYPE_ENUMS = {
+    'dataset': 'DATASET',
+    'chart': 'CHART',
+    'dashboard': 'DASHBOARD',
+    'dataFlow': 'DATA_FLOW',
+    'dataJob': 'DATA_JOB'
+}
+ENTITY_TYPE_NAMES = {enum: name for name, enum in ENTITY_TYPE_ENUMS.items()}
+
+# Custom properties that may hold a procedure's SQL when there is no dataTransformLogic aspect
+SQL_PROPERTY_KEYS = ('code', 'definition', 'sql', 'query')
+
+# Marks the end of one scroll cursor on the page queue
+_SCROLL_DONE = object()
+
+# HTTP statuses worth retrying besides 5xx
+_RETRY_STATUSES = {408, 429}
+
+class ScanError(RuntimeError):
+    """A catalog scan failed, so the assets it streamed are incomplete."""
+
+@dataclass(frozen=True)
+class ScrollCursor:
+    """One scroll over an entity type, optionally limited to or excluding some platforms."""
+    entity_type: str
+    platforms: Tuple[str, ...] = ()
+    # Scroll every platform except those listed instead of only those
+    exclude: bool = False
+    
+    def or_filters(self) -> Optional[List[Dict[str, Any]]]:
+        """The scroll input's orFilters, or None to scroll the whole entity type."""
+        if not self.platforms:
+            return None
+        return [{"and": [{"field": "platform", "values": list(self.platforms), "negated": self.exclude}]}]
+    
+    @property
+    def label(self) -> str:
+        if not self.platforms:
+            return f"{self.entity_type} assets"
+        if self.exclude:
+            return f"{self.entity_type} assets on other platforms"
+        return f"{self.entity_type} assets on {', '.join(self.platforms)}"
+
 @dataclass
 class DuplicateFinding:
     """Represents a duplicate finding with details about the assets and similarity."""
     asset_type: str
     similarity_type: str
     similarity_score: float
-    primary_asset: Dict[str, Any]
-    duplicate_assets: List[Dict[str, Any]]
+    primary_asset: AssetRecord
+    duplicate_assets: List[AssetRecord]
     reason: str
     confidence: str  # high, medium, low
+    # (urn, urn, similarity) for every matched pair within the cluster
+    pair_scores: List[Tuple[str, str, float]] = field(default_factory=list)
 
 @dataclass
 class DetectionConfig:
@@ -40,6 +113,258 @@ class DetectionConfig:
     case_sensitive: bool = False
     ignore_common_suffixes: List[str] = None
     ignore_common_prefixes: List[str] = None
+    page_size: int = 500
+    fetch_workers: int = 4
+    max_buffered_pages: int = 8
+    scroll_keep_alive: str = "5m"
+    # Transient scroll failures (5xx, 429, timeouts, expired scroll contexts) are
+    # retried up to fetch_retries times, waiting fetch_retry_backoff seconds
+    # doubled per attempt; requests time out after fetch_timeout seconds
+    fetch_retries: int = 4
+    fetch_retry_backoff: float = 1.0
+    fetch_timeout: float = 60.0
+    # MinHash LSH candidate generation for name matching. More bands (fewer rows
+    # per band) raise recall and the number of candidate pairs scored exactly.
+    name_ngram_size: int = 3
+    name_minhash_permutations: int = 128
+    name_lsh_bands: int = 32
+    name_lsh_min_group_size: int = 1000
+    lsh_seed: int = 1
+    # Datasets whose schema candidates are scored per sparse matrix product
+    schema_block_size: int = 4096
+    # TF-IDF description matching keeps at most description_top_k matches per asset
+    description_top_k: int = 100
+    description_hash_features: int = 1 << 20
+    description_max_df: float = 1.0
+    # Process-pool execution: stages are split into tasks of at most shard_size
+    # anchor rows per platform/type group and merged back in task order
+    workers: int = 1
+    shard_size: int = 5000
+    # Lineage fingerprints: hash the upstream URN set (and optionally the downstream
+    # set); buckets larger than lineage_max_bucket_size are fan-out, not copies
+    lineage_include_downstream: bool = False
+    lineage_max_bucket_size: int = 100
+    # Cross-platform matching hash-joins datasets on their normalized table name;
+    # blocks larger than cross_platform_max_block_size are common names, not copies
+    cross_platform_max_block_size: int = 100
+    # Column matching buckets datasets by each field's (fieldPath, native type,
+    # description) signature; columns in at least column_min_datasets datasets
+    # are reported, optionally only those with a description
+    column_min_datasets: int = 3
+    column_require_description: bool = False
+    # SQL-body matching: MinHash over shingles of sql_shingle_size normalized tokens,
+    # LSH-bucketed; the score is the share of agreeing signature values
+    sql_similarity_threshold: float = 0.8
+    sql_shingle_size: int = 5
+    sql_minhash_permutations: int = 128
+    sql_lsh_bands: int = 32
+    # Combined scoring: one weighted mean of the name, schema and description
+    # scores per candidate pair, over the signals both assets have
+    combined_similarity_threshold: float = 0.8
+    combined_name_weight: float = 0.4
+    combined_schema_weight: float = 0.35
+    combined_description_weight: float = 0.25
+    # External blocking (iter_duplicates_external): records buffered per sorted
+    # run before spilling, and runs merged at once
+    external_run_size: int = 100000
+    external_merge_fan_in: int = 64
+    # Sample estimates (estimate_duplicates): anchors sampled per platform/type
+    # stratum, confidence level of the reported intervals and sampling seed
+    estimate_sample_size: int = 200
+    estimate_confidence: float = 0.95
+    estimate_seed: int = 1
+
+# (anchor row, [(matched row, similarity), ...]) within one stage's asset list
+AnchorMatches = Tuple[int, List[Tuple[int, float]]]
+# (anchor matches, pairs scored) returned by one shard task
+ShardResult = Tuple[List[AnchorMatches], int]
+
+# (high, medium) lower bounds on the mean pair score of a finding; descriptions are never high
+_CONFIDENCE_BANDS = {
+    'name': (0.95, 0.8),
+    'schema': (0.9, 0.7),
+    'description': (float('inf'), 0.9),
+    'sql': (0.95, 0.8),
+    'combined': (0.9, 0.8)
+}
+
+# Signals of the combined scorer, in the column order of its score arrays
+COMBINED_SIGNALS = ('name', 'schema', 'description')
+
+# Record signals each stage reads, kept in the blocks of a disk-backed run
+_BLOCK_SIGNALS = {
+    'name': ('name_signature',),
+    'schema': ('schema_tokens',),
+    'description': ('description_terms',),
+    'sql': ('sql_signature',),
+    'combined': ('name_signature', 'schema_tokens', 'description_terms'),
+    'lineage': ('lineage',),
+    'cross_platform': (),
+    'column': ('column_tokens',)
+}
+
+# Similarity type -> (groups method, shard method, threshold setting, score tolerance) for sweeps;
+# cosine_top_k accepts scores within 1e-9 below the threshold
+_SWEEP_STAGES = {
+    'name': ('name_groups', '_name_shard', 'name_similarity_threshold', 0.0),
+    'schema': ('schema_groups', '_schema_shard', 'schema_similarity_threshold', 0.0),
+    'description': ('description_groups', '_description_shard', 'content_similarity_threshold', 1e-9)
+}
+
+# Similarity type -> (groups method, shard method) of the pairwise-scored stages, which sample estimates
+# and shard plans can anchor on a subset of records; the hash-join stages (lineage, cross_platform,
+# column) are cheap enough to run on every record
+_PAIRWISE_STAGES = {
+    'name': ('name_groups', '_name_shard'),
+    'schema': ('schema_groups', '_schema_shard'),
+    'description': ('description_groups', '_description_shard'),
+    'sql': ('sql_groups', '_sql_shard'),
+    'combined': ('type_groups', '_combined_shard')
+}
+
+# Stages whose scores depend on the whole type group through TF-IDF weights; the pairs
+# incremental runs carry forward are scored again against the current records
+_CORPUS_SCORED_STAGES = {'description', 'combined'}
+
+def _anchor_pairs(group_size: int, start: int, end: int) -> int:
+    """Number of (i, j) pairs with start <= i < end and i < j < group_size."""
+    end = min(end, group_size)
+    if end <= start:
+        return 0
+    return (end - start) * (group_size - 1) - (start + end - 1) * (end - start) // 2
+
+class DetectionShards:
+    """Stage inputs derived from one run's records, built lazily and cached.
+    
+    Shard tasks only carry group keys and row ranges. Each worker process holds
+    its own copy of this object, so groupings, signatures and indexes are built
+    once per worker rather than once per task.
+    """
+    
+    def __init__(self, detector: 'DataHubDuplicateDetector', records: List[AssetRecord],
+                 changed: Optional[Set[str]] = None):
+        self.detector = detector
+        self.records = records
+        # In incremental runs, URNs of the changed records (placed first in records)
+        self.changed = changed
+        self._cache: Dict[Any, Any] = {}
+    
+    def _cached(self, key: Any, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+    
+    def anchor_count(self, group: List[AssetRecord]) -> int:
+        """Number of leading rows of a group to anchor on: all, or only the changed ones."""
+        if self.changed is None:
+            return len(group)
+        return sum(1 for record in group if record.urn in self.changed)
+    
+    def name_groups(self) -> Dict[str, List[AssetRecord]]:
+        """Records grouped by platform and type, in ingest order."""
+        def build():
+            groups = defaultdict(list)
+            for record in self.records:
+                groups[record.group_key].append(record)
+            return dict(groups)
+        return self._cached('name_groups', build)
+    
+    def name_signatures(self, group_key: str) -> np.ndarray:
+        """MinHash signatures over character n-grams of a group's normalized names."""
+        return self._cached(('name_signatures', group_key),
+                            lambda: self.detector.record_name_signatures(self.name_groups()[group_key]))
+    
+    def type_groups(self) -> Dict[str, List[AssetRecord]]:
+        """Records grouped by type only, in ingest order; the dataset group is datasets()."""
+        def build():
+            groups = defaultdict(list)
+            for record in self.records:
+                groups[record.type].append(record)
+            return dict(groups)
+        return self._cached('type_groups', build)
+    
+    def type_group_rows(self, group_key: str) -> np.ndarray:
+        """Row in its type group of each record of a platform/type name group."""
+        def build():
+            group = self.name_groups()[group_key]
+            positions = self._cached(('type_positions', group[0].type), lambda: {
+                record.urn: i for i, record in enumerate(self.type_groups()[group[0].type])
+            })
+            return np.array([positions[record.urn] for record in group], dtype=np.int64)
+        return self._cached(('type_group_rows', group_key), build)
+    
+    def name_character_counts(self, asset_type: str) -> np.ndarray:
+        """Counts of each character code (mod 128) in the normalized names of a type group."""
+        def build():
+            group = self.type_groups()[asset_type]
+            counts = np.zeros((len(group), 128), dtype=np.uint16)
+            for row, record in enumerate(group):
+                codes = np.frombuffer(record.normalized_name.encode('utf-32-le'), dtype=np.uint32) % 128
+                np.add.at(counts[row], codes, 1)
+            return counts
+        return self._cached(('name_character_counts', asset_type), build)
+    
+    def description_rows(self, asset_type: str) -> np.ndarray:
+        """Row of each record of a type group within its description group, or -1 without a description."""
+        def build():
+            described = np.array([record.description_terms is not None for record in self.type_groups()[asset_type]])
+            rows = np.cumsum(described) - 1
+            rows[~described] = -1
+            return rows
+        return self._cached(('description_rows', asset_type), build)
+    
+    def datasets(self) -> List[AssetRecord]:
+        """Dataset records, in ingest order."""
+        return self._cached('datasets', lambda: [record for record in self.records if record.type == 'dataset'])
+    
+    def schema_index(self) -> SchemaTokenIndex:
+        """Inverted schema token index over the dataset records."""
+        def build():
+            index = SchemaTokenIndex([record.schema_tokens.tolist() for record in self.datasets()])
+            logger.debug(f"Indexed {len(index.vocabulary)} distinct schema fields across {len(self.datasets())} datasets")
+            return index
+        return self._cached('schema_index', build)
+    
+    def schema_groups(self) -> Dict[str, List[AssetRecord]]:
+        """The dataset records as the single group compared by schema."""
+        return {'dataset': self.datasets()} if self.datasets() else {}
+    
+    def description_groups(self) -> Dict[str, List[AssetRecord]]:
+        """Records with a description grouped by type, in ingest order."""
+        def build():
+            groups = defaultdict(list)
+            for record in self.records:
+                if record.description_terms is not None:
+                    groups[record.type].append(record)
+            return dict(groups)
+        return self._cached('description_groups', build)
+    
+    def description_vectors(self, asset_type: str):
+        """TF-IDF matrix over the descriptions of one type group."""
+        config = self.detector.config
+        
+        def build():
+            vectorizer = HashedTfidfVectorizer(
+                n_features=config.description_hash_features,
+                max_df=config.description_max_df
+            )
+            return vectorizer.transform_counts([record.description_terms for record in self.description_groups()[asset_type]])
+        return self._cached(('description_vectors', asset_type), build)
+    
+    def sql_groups(self) -> Dict[str, List[AssetRecord]]:
+        """Records with a SQL body grouped by type, in ingest order."""
+        def build():
+            groups = defaultdict(list)
+            for record in self.records:
+                if record.sql_signature is not None:
+                    groups[record.type].append(record)
+            return dict(groups)
+        return self._cached('sql_groups', build)
+    
+    def sql_signatures(self, asset_type: str) -> np.ndarray:
+        """SQL-body MinHash signatures of one type group as a matrix."""
+        return self._cached(('sql_signatures', asset_type),
+                            lambda: np.vstack([record.sql_signature for record in self.sql_groups()[asset_type]]))
 
 class DataHubDuplicateDetector:
     """Main class for detecting duplicate assets in DataHub."""
@@ -53,6 +378,15 @@ class DataHubDuplicateDetector:
             'Content-Type': 'application/json'
         })
         self.config = DetectionConfig()
+        # Stage metrics of the latest iter_duplicates run
+        self.metrics = DetectionMetrics()
+        # Column signatures of the latest ingest by token ID, which records' column_tokens refer to
+        self.column_vocabulary: Dict[Tuple[str, str, str], int] = {}
+        # Set once iter_assets or iter_snapshot_assets has streamed every asset;
+        # incremental runs only drop stored assets missing from a complete scan
+        self.scan_complete = False
+        
+        self._pool_size = 0
         
         # Common suffixes/prefixes to ignore
         self.config.ignore_common_suffixes = [
@@ -63,125 +397,269 @@ class DataHubDuplicateDetector:
             'backup_', 'old_', 'temp_', 'tmp_', 'test_', 'dev_', 'staging_'
         ]
     
-    def search_assets(self, entity_types: List[str] = None, query: str = "*", 
-                     start: int = 0, count: int = 1000) -> List[Dict[str, Any]]:
-        """Search for assets in DataHub."""
-        try:
-            if entity_types is None:
-                entity_types = ["dataset", "chart", "dashboard", "dataFlow", "dataJob"]
-            
-            search_query = {
-                "query": query,
-                "entityTypes": entity_types,
-                "start": start,
-                "count": count
+    def _build_scroll_query(self, entity_type: str, detection_types: Optional[List[str]] = None) -> str:
+        """Build the GraphQL scroll query for one entity type.
+        
+        Only the fields the given detection types read are selected (see
+        graphql_projection); with no detection types every field is fetched.
+        """
+        return scroll_query([entity_type], detection_types, self.config.lineage_include_downstream)
+    
+    def _ensure_connection_pool(self, size: int) -> None:
+        """Pool enough keep-alive connections for one scroll cursor per fetch worker."""
+        if size <= self._pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._pool_size = size
+    
+    def _post_graphql(self, label: str, payload: Dict[str, Any], stop: threading.Event) -> Dict[str, Any]:
+        """POST a GraphQL request, retrying transient failures with exponential backoff.
+        
+        5xx, 408 and 429 responses, timeouts and connection errors are retried
+        up to fetch_retries times. Returns the decoded response, which may carry
+        GraphQL errors; raises ScanError for any other HTTP failure, once the
+        retries are used up, or when the scan is stopped while waiting.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(f"{self.datahub_gms_url}/graphql", json=payload,
+                                             timeout=self.config.fetch_timeout)
+                self.metrics.count(graphql_bytes=len(response.content))
+                if response.status_code == 200:
+                    return response.json()
+                failure = f"{response.status_code} - {response.text[:500]}"
+                if response.status_code < 500 and response.status_code not in _RETRY_STATUSES:
+                    raise ScanError(f"Error {label}: {failure}")
+            except (requests.Timeout, requests.ConnectionError) as e:
+                failure = str(e)
+            if attempt >= self.config.fetch_retries:
+                raise ScanError(f"Error {label} after {attempt + 1} attempts: {failure}")
+            delay = self.config.fetch_retry_backoff * 2 ** attempt
+            attempt += 1
+            logger.warning(f"Error {label} ({failure}); retry {attempt} of {self.config.fetch_retries} in {delay:.1f}s")
+            if stop.wait(delay):
+                raise ScanError(f"Scan stopped while {label}")
+    
+    def _platform_counts(self, entity_type: str, query: str, stop: threading.Event) -> Tuple[int, Dict[str, int]]:
+        """Matching assets of one entity type, in total and per platform URN from the search platform facet."""
+        graphql_query = """
+        query platformFacet($input: SearchAcrossEntitiesInput!) {
+          searchAcrossEntities(input: $input) {
+            total
+            facets {
+              field
+              aggregations {
+                value
+                count
+              }
             }
-            
-            response = self.session.post(
-                f"{self.datahub_gms_url}/graphql",
-                json={
-                    "query": """
-                    query search($input: SearchInput!) {
-                        search(input: $input) {
-                            searchResults {
-                                entity {
-                                    urn
-                                    type
-                                    ... on Dataset {
-                                        name
-                                        platform {
-                                            name
-                                        }
-                                        properties {
-                                            name
-                                            description
-                                        }
-                                        schemaMetadata {
-                                            fields {
-                                                fieldPath
-                                                type
-                                                description
-                                            }
-                                        }
-                                        upstreamLineage {
-                                            upstreams {
-                                                dataset {
-                                                    urn
-                                                }
-                                            }
-                                        }
-                                        downstreamLineage {
-                                            downstreams {
-                                                dataset {
-                                                    urn
-                                                }
-                                            }
-                                        }
-                                    }
-                                    ... on Chart {
-                                        name
-                                        platform {
-                                            name
-                                        }
-                                        properties {
-                                            name
-                                            description
-                                        }
-                                    }
-                                    ... on Dashboard {
-                                        name
-                                        platform {
-                                            name
-                                        }
-                                        properties {
-                                            name
-                                            description
-                                        }
-                                    }
-                                    ... on DataFlow {
-                                        name
-                                        platform {
-                                            name
-                                        }
-                                        properties {
-                                            name
-                                            description
-                                        }
-                                    }
-                                    ... on DataJob {
-                                        name
-                                        platform {
-                                            name
-                                        }
-                                        properties {
-                                            name
-                                            description
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                    """,
-                    "variables": {"input": search_query}
+          }
+        }
+        """
+        search_input = {"types": [ENTITY_TYPE_ENUMS.get(entity_type, entity_type)], "query": query,
+                        "start": 0, "count": 0}
+        data = self._post_graphql(f"counting {entity_type} assets per platform",
+                                  {"query": graphql_query, "variables": {"input": search_input}}, stop)
+        if 'errors' in data:
+            raise ScanError(f"GraphQL errors while counting {entity_type} assets per platform: {data['errors']}")
+        search = data.get('data', {}).get('searchAcrossEntities') or {}
+        platforms = {}
+        for facet in search.get('facets') or []:
+            if facet.get('field') == 'platform':
+                platforms = {aggregation['value']: aggregation['count'] for aggregation in facet.get('aggregations') or []}
+        return max(search.get('total') or 0, sum(platforms.values())), platforms
+    
+    def _scroll_cursors(self, entity_types: List[str], query: str, stop: threading.Event) -> List[ScrollCursor]:
+        """Split the scan into scroll cursors that keep fetch_workers busy.
+        
+        Each entity type gets one cursor. While an entity type's cursor would
+        hold more than its share (all assets over fetch_workers), its largest
+        platform by the search facet counts moves to a cursor of its own, which
+        the entity type's cursor then excludes, so a catalog dominated by one
+        entity type is still fetched concurrently. At most fetch_workers - 1
+        platforms are split out, and a single platform is never split further.
+        If the facets cannot be read, the scan keeps one cursor per entity type.
+        """
+        if self.config.fetch_workers <= 1:
+            return [ScrollCursor(entity_type) for entity_type in entity_types]
+        
+        counts = {}
+        for entity_type in entity_types:
+            try:
+                counts[entity_type] = self._platform_counts(entity_type, query, stop)
+            except ScanError as e:
+                logger.warning(f"{str(e)}; scrolling one cursor per entity type")
+                return [ScrollCursor(entity_type) for entity_type in entity_types]
+        
+        share = sum(total for total, _ in counts.values()) / self.config.fetch_workers
+        splits = self.config.fetch_workers - 1
+        cursors = []
+        for entity_type in sorted(entity_types, key=lambda entity_type: -counts[entity_type][0]):
+            remainder, platforms = counts[entity_type]
+            split = []
+            for platform, count in sorted(platforms.items(), key=lambda item: -item[1]):
+                if remainder <= share or not splits or count >= remainder:
+                    break
+                split.append(platform)
+                remainder -= count
+                splits -= 1
+            cursors.extend(ScrollCursor(entity_type, (platform,)) for platform in split)
+            cursors.append(ScrollCursor(entity_type, tuple(split), exclude=bool(split)))
+        return cursors
+    
+    def _scroll_cursor(self, cursor: ScrollCursor, query: str, pages: queue.Queue, stop: threading.Event,
+                       failures: List[BaseException], detection_types: Optional[List[str]] = None) -> None:
+        """Walk one scroll cursor, putting each page on the queue.
+        
+        A continuation page the GMS rejects (usually an expired scroll context)
+        restarts the cursor, skipping the assets already handed on, within the
+        same retry budget as failed requests. Any failure that cannot be
+        retried is appended to failures for iter_assets to raise.
+        """
+        scroll_id = None
+        entity_type = cursor.entity_type
+        graphql_query = self._build_scroll_query(entity_type, detection_types)
+        label = f"scrolling {cursor.label}"
+        # Assets handed on so far, and still to skip after a restart
+        emitted = 0
+        skip = 0
+        restarts = 0
+        try:
+            while not stop.is_set():
+                scroll_input = {
+                    "types": [ENTITY_TYPE_ENUMS.get(entity_type, entity_type)],
+                    "query": query,
+                    "count": self.config.page_size,
+                    "keepAlive": self.config.scroll_keep_alive
                 }
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Error searching DataHub: {response.status_code} - {response.text}")
-                return []
-            
-            data = response.json()
-            if 'errors' in data:
-                logger.error(f"GraphQL errors: {data['errors']}")
-                return []
-            
-            search_results = data.get('data', {}).get('search', {}).get('searchResults', [])
-            return [result['entity'] for result in search_results]
-            
+                if cursor.platforms:
+                    scroll_input["orFilters"] = cursor.or_filters()
+                if scroll_id:
+                    scroll_input["scrollId"] = scroll_id
+                
+                data = self._post_graphql(label, {"query": graphql_query, "variables": {"input": scroll_input}}, stop)
+                if 'errors' in data:
+                    if not scroll_id:
+                        raise ScanError(f"GraphQL errors while {label}: {data['errors']}")
+                    if restarts >= self.config.fetch_retries:
+                        raise ScanError(f"GraphQL errors while {label} after {restarts} restarts: {data['errors']}")
+                    # Scroll order is stable while the index is, so the restarted
+                    # cursor skips the assets already handed on
+                    restarts += 1
+                    logger.warning(f"Restarting the scroll of {cursor.label} after {emitted} assets "
+                                   f"({restarts} of {self.config.fetch_retries}): {data['errors']}")
+                    scroll_id, skip = None, emitted
+                    continue
+                
+                scroll = data.get('data', {}).get('scrollAcrossEntities') or {}
+                results = scroll.get('searchResults', [])
+                page = [result['entity'] for result in results[skip:]]
+                skip = max(0, skip - len(results))
+                for entity in page:
+                    entity['type'] = ENTITY_TYPE_NAMES.get(entity.get('type'), entity.get('type'))
+                
+                # Block while the consumer catches up so memory stays bounded
+                while page and not stop.is_set():
+                    try:
+                        pages.put(page, timeout=0.5)
+                        emitted += len(page)
+                        break
+                    except queue.Full:
+                        continue
+                
+                scroll_id = scroll.get('nextScrollId')
+                if not scroll_id or not results:
+                    return
         except Exception as e:
-            logger.error(f"Error searching assets: {str(e)}")
-            return []
+            if not stop.is_set():
+                error = e if isinstance(e, ScanError) else ScanError(f"Error {label}: {str(e)}")
+                logger.error(str(error))
+                failures.append(error)
+        finally:
+            pages.put(_SCROLL_DONE)
+    
+    def iter_assets(self, entity_types: List[str] = None, query: str = "*",
+                    detection_types: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream every matching asset in DataHub over concurrent scroll cursors.
+        
+        Pages of up to fetch_workers cursors (see _scroll_cursors) are fetched
+        concurrently over the pooled session and handed on as they arrive; at most ``max_buffered_pages`` pages are held in memory at once.
+        Given detection types, only the fields they read are fetched. Raises
+        ScanError as soon as a cursor fails for good, so callers never run on a
+        silently truncated catalog.
+        """
+        if entity_types is None:
+            entity_types = ["dataset", "chart", "dashboard", "dataFlow", "dataJob"]
+        
+        pages = queue.Queue(maxsize=self.config.max_buffered_pages)
+        stop = threading.Event()
+        failures: List[BaseException] = []
+        started = time.perf_counter()
+        self._ensure_connection_pool(max(1, self.config.fetch_workers))
+        cursors = self._scroll_cursors(entity_types, query, stop)
+        workers = max(1, min(self.config.fetch_workers, len(cursors)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="datahub-scroll")
+        for cursor in cursors:
+            executor.submit(self._scroll_cursor, cursor, query, pages, stop, failures, detection_types)
+        
+        fetched = 0
+        remaining = len(cursors)
+        self.scan_complete = False
+        try:
+            while remaining:
+                page = pages.get()
+                if page is _SCROLL_DONE:
+                    remaining -= 1
+                    if failures:
+                        raise failures[0]
+                    continue
+                for entity in page:
+                    fetched += 1
+                    yield entity
+            self.scan_complete = True
+        finally:
+            stop.set()
+            # Drain so producers blocked on a full queue can exit
+            while remaining:
+                try:
+                    if pages.get(timeout=0.5) is _SCROLL_DONE:
+                        remaining -= 1
+                except queue.Empty:
+                    continue
+            executor.shutdown(wait=True)
+            elapsed = time.perf_counter() - started
+            rate = fetched / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Fetched {fetched} assets in {elapsed:.1f}s ({rate:.1f} assets/sec)")
+    
+    def iter_snapshot_assets(self, path: str, entity_types: List[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the assets of a local snapshot file instead of scanning DataHub.
+        
+        Takes search results captured with SnapshotWriter or MCP/MCE files such
+        as metadata_generator's output; see snapshot.py.
+        """
+        if entity_types is None:
+            entity_types = ["dataset", "chart", "dashboard", "dataFlow", "dataJob"]
+        wanted = set(entity_types)
+        self.scan_complete = False
+        for entity in SnapshotReader(path):
+            entity['type'] = ENTITY_TYPE_NAMES.get(entity.get('type'), entity.get('type'))
+            if entity['type'] in wanted:
+                yield entity
+        self.scan_complete = True
+    
+    def search_assets(self, entity_types: List[str] = None, query: str = "*", 
+                     start: int = 0, count: Optional[int] = None,
+                     detection_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Search for assets in DataHub, returning the whole catalog unless count is given."""
+        stop = start + count if count is not None else None
+        assets = self.iter_assets(entity_types, query, detection_types)
+        try:
+            return list(islice(assets, start, stop))
+        finally:
+            assets.close()
     
     def normalize_name(self, name: str) -> str:
         """Normalize asset name for comparison."""
@@ -212,16 +690,42 @@ class DataHubDuplicateDetector:
     
     def calculate_name_similarity(self, name1: str, name2: str) -> float:
         """Calculate similarity between two asset names."""
-        norm1 = self.normalize_name(name1)
-        norm2 = self.normalize_name(name2)
-        
+        return self._normalized_name_similarity(self.normalize_name(name1), self.normalize_name(name2))
+    
+    def _normalized_name_similarity(self, norm1: str, norm2: str) -> float:
+        """Calculate similarity between two names that are already normalized."""
         if norm1 == norm2:
             return 1.0
         
-        # Use SequenceMatcher for fuzzy matching
+        # Use SequenceMatcher for fuzzy matching; it is not symmetric, so order the
+        # pair to give the same score whichever asset is the anchor
+        if norm2 < norm1:
+            norm1, norm2 = norm2, norm1
         similarity = SequenceMatcher(None, norm1, norm2).ratio()
         return similarity
     
+    def _similar_names(self, anchor: str, normalized_names: List[str],
+                       candidates: Sequence[int]) -> List[Tuple[int, float]]:
+        """Score candidates against an anchor name, keeping those above the threshold.
+        
+        The anchor's character counts are computed once and reused for the
+        symmetric quick_ratio upper bound, so most non-matches are rejected
+        without running the full SequenceMatcher comparison.
+        """
+        threshold = self.config.name_similarity_threshold
+        bound = SequenceMatcher(None, '', anchor)
+        matches = []
+        for j in candidates:
+            other = normalized_names[j]
+            if other != anchor:
+                bound.set_seq1(other)
+                if bound.real_quick_ratio() < threshold or bound.quick_ratio() < threshold:
+                    continue
+            similarity = self._normalized_name_similarity(anchor, other)
+            if similarity >= threshold:
+                matches.append((j, similarity))
+        return matches
+    
     def calculate_schema_similarity(self, schema1: List[Dict], schema2: List[Dict]) -> float:
         """Calculate similarity between two schemas."""
         if not schema1 or not schema2:
@@ -249,259 +753,1386 @@ class DataHubDuplicateDetector:
             'platform': '',
             'description': '',
             'schema': [],
+            'upstreams': [],
+            'downstreams': [],
+            'sql': '',
             'properties': {}
         }
         
-        # Extract name and platform based on asset type
+        # Extract name and platform based on asset type (GraphQL returns null for missing aspects)
+        properties = asset.get('properties') or {}
         if asset.get('type') == 'dataset':
             info['name'] = asset.get('name', '')
             platform = asset.get('platform', {})
             info['platform'] = platform.get('name', '') if platform else ''
-            info['description'] = asset.get('properties', {}).get('description', '')
-            info['schema'] = asset.get('schemaMetadata', {}).get('fields', [])
+            info['description'] = properties.get('description', '')
+            info['schema'] = (asset.get('schemaMetadata') or {}).get('fields') or []
+            info['upstreams'] = [
+                upstream['dataset']['urn']
+                for upstream in (asset.get('upstreamLineage') or {}).get('upstreams') or []
+                if (upstream.get('dataset') or {}).get('urn')
+            ]
+            info['downstreams'] = [
+                downstream['dataset']['urn']
+                for downstream in (asset.get('downstreamLineage') or {}).get('downstreams') or []
+                if (downstream.get('dataset') or {}).get('urn')
+            ]
         else:
             # For other asset types
             info['name'] = asset.get('name', '')
             platform = asset.get('platform', {})
             info['platform'] = platform.get('name', '') if platform else ''
-            info['description'] = asset.get('properties', {}).get('description', '')
+            info['description'] = properties.get('description', '')
+            info['sql'] = self.extract_sql(asset)
         
-        info['properties'] = asset.get('properties', {})
+        info['properties'] = properties
         return info
     
-    def detect_name_duplicates(self, assets: List[Dict[str, Any]]) -> List[DuplicateFinding]:
-        """Detect assets with similar names."""
-        findings = []
+    def extract_sql(self, asset: Dict[str, Any]) -> str:
+        """Return the SQL body of a stored procedure or data job, or '' if it has none.
         
-        # Group assets by platform and type
-        grouped_assets = defaultdict(list)
+        Taken from the dataTransformLogic query statements, which SQL Server
+        ingestion writes for stored procedures, or else from a custom property
+        such as ``code`` or ``definition``.
+        """
+        transforms = (asset.get('dataTransformLogic') or {}).get('transforms') or []
+        statements = [
+            (transform.get('queryStatement') or {}).get('value') or ''
+            for transform in transforms
+        ]
+        if any(statements):
+            return '\n'.join(statement for statement in statements if statement)
+        custom_properties = {
+            entry.get('key'): entry.get('value')
+            for entry in (asset.get('properties') or {}).get('customProperties') or []
+        }
+        return next((custom_properties[key] for key in SQL_PROPERTY_KEYS if custom_properties.get(key)), '')
+    
+    def _new_catalog(self) -> AssetCatalog:
+        """Create an empty catalog using this detector's normalization and vectorizer settings."""
+        vectorizer = HashedTfidfVectorizer(
+            n_features=self.config.description_hash_features,
+            max_df=self.config.description_max_df
+        )
+        sql_signatures = SqlSignatures(self.config.sql_shingle_size, self.config.sql_minhash_permutations,
+                                       seed=self.config.lsh_seed)
+        catalog = AssetCatalog(self.extract_asset_info, self.normalize_name, vectorizer, sql_signatures.signature)
+        self.column_vocabulary = catalog.column_vocabulary
+        return catalog
+    
+    def build_records(self, assets: Iterable[Dict[str, Any]]) -> List[AssetRecord]:
+        """Ingest raw assets once into compact, pre-normalized records.
+        
+        Accepts any iterable, so assets streamed from iter_assets can be
+        discarded as soon as they have been reduced to a record.
+        """
+        return self._new_catalog().add_all(assets)
+    
+    def _store_fingerprint(self, entity_types: Optional[List[str]], detection_types: List[str]) -> str:
+        """Digest of every setting that affects stored signatures and pairs."""
+        operational = {'page_size', 'fetch_workers', 'max_buffered_pages', 'scroll_keep_alive',
+                       'fetch_retries', 'fetch_retry_backoff', 'fetch_timeout',
+                       'schema_block_size', 'workers', 'shard_size'}
+        settings = {key: value for key, value in asdict(self.config).items() if key not in operational}
+        settings['entity_types'] = sorted(entity_types or ENTITY_TYPE_ENUMS)
+        settings['detection_types'] = sorted(detection_types)
+        return content_hash(settings)
+    
+    def build_records_incremental(self, assets: Iterable[Dict[str, Any]], store: SignatureStore,
+                                  entity_types: Optional[List[str]] = None,
+                                  detection_types: Optional[List[str]] = None
+                                  ) -> Tuple[List[AssetRecord], IncrementalRun]:
+        """Ingest assets against a signature store, re-processing only new and changed ones.
+        
+        Each asset's extracted fields are hashed; records whose hash matches the
+        store are restored with their precomputed signatures instead of being
+        normalized, tokenized and hashed again. Assets missing from the scan are
+        removed from the store, but only when assets came from iter_assets or
+        iter_snapshot_assets and were streamed to the end; other iterables keep
+        every stored asset. Records are returned in scan order.
+        """
+        store.use_fingerprint(self._store_fingerprint(entity_types, detection_types or []))
+        stored_hashes = store.content_hashes()
+        catalog = self._new_catalog()
+        scan_order = []
+        changed: Dict[str, AssetRecord] = {}
+        hashes: Dict[str, str] = {}
+        self.scan_complete = False
         for asset in assets:
             info = self.extract_asset_info(asset)
-            key = f"{info['platform']}_{info['type']}"
-            grouped_assets[key].append((info['name'], asset))
+            urn = info['urn']
+            digest = content_hash(info)
+            scan_order.append(urn)
+            if stored_hashes.get(urn) != digest:
+                changed[urn] = catalog.add_info(info)
+                hashes[urn] = digest
         
-        # Check for duplicates within each group
-        for group_name, asset_list in grouped_assets.items():
-            for i, (name1, asset1) in enumerate(asset_list):
-                duplicates = [asset1]
-                
-                for j, (name2, asset2) in enumerate(asset_list[i+1:], i+1):
-                    similarity = self.calculate_name_similarity(name1, name2)
-                    
-                    if similarity >= self.config.name_similarity_threshold:
-                        duplicates.append(asset2)
-                
-                if len(duplicates) >= self.config.min_assets_for_duplicate:
-                    # Determine confidence
-                    if similarity >= 0.95:
-                        confidence = "high"
-                    elif similarity >= 0.8:
-                        confidence = "medium"
-                    else:
-                        confidence = "low"
-                    
-                    finding = DuplicateFinding(
-                        asset_type=asset1.get('type', ''),
-                        similarity_type="name",
-                        similarity_score=similarity,
-                        primary_asset=duplicates[0],
-                        duplicate_assets=duplicates[1:],
-                        reason=f"Similar names: {name1} vs {[self.extract_asset_info(a)['name'] for a in duplicates[1:]]}",
-                        confidence=confidence
-                    )
-                    findings.append(finding)
+        seen = set(scan_order)
+        removed = [urn for urn in stored_hashes if urn not in seen]
+        if removed and not self.scan_complete:
+            logger.warning(f"Scan not known to be complete; keeping {len(removed)} stored assets it did not return")
+            removed = []
+        restored = store.load_records(seen - changed.keys(), catalog)
+        
+        changed_records = list(changed.values())
+        if changed_records:
+            for record, signature in zip(changed_records, self.name_signatures(changed_records)):
+                record.name_signature = signature
+        store.save_records(changed_records, hashes, catalog)
+        store.delete_records(removed)
+        logger.info(f"Incremental run: {len(changed)} new or changed, {len(restored)} unchanged, "
+                    f"{len(removed)} removed assets")
+        
+        records = [changed[urn] if urn in changed else restored[urn] for urn in scan_order]
+        return records, IncrementalRun(store=store, changed=set(changed) | set(removed))
+    
+    def name_signatures(self, records: Sequence[AssetRecord]) -> np.ndarray:
+        """MinHash signatures over character n-grams of the records' normalized names."""
+        hasher = MinHasher(self.config.name_minhash_permutations, seed=self.config.lsh_seed)
+        return hasher.signatures([
+            hash_tokens(char_ngrams(record.normalized_name, self.config.name_ngram_size))
+            for record in records
+        ])
+    
+    def record_name_signatures(self, records: Sequence[AssetRecord]) -> np.ndarray:
+        """Name signatures of records as a matrix, reusing those restored from a signature store."""
+        signatures = np.empty((len(records), self.config.name_minhash_permutations), dtype=np.uint32)
+        missing = [k for k, record in enumerate(records) if record.name_signature is None]
+        for k, record in enumerate(records):
+            if record.name_signature is not None:
+                signatures[k] = record.name_signature
+        if missing:
+            signatures[missing] = self.name_signatures([records[k] for k in missing])
+        return signatures
+    
+    def _name_candidates(self, shards: 'DetectionShards', group_key: str, start: int,
+                         end: int) -> Iterator[Tuple[int, Sequence[int]]]:
+        """Yield (i, [j, ...]) for anchors start <= i < end in a group worth scoring exactly, with i < j.
+        
+        Small groups are compared exhaustively. Larger groups go through a MinHash
+        LSH index over character n-grams so only names likely to be similar are
+        scored, turning the quadratic scan into roughly linear work.
+        """
+        group_size = len(shards.name_groups()[group_key])
+        if group_size < self.config.name_lsh_min_group_size:
+            for i in range(start, min(end, group_size - 1)):
+                yield i, range(i + 1, group_size)
+            return
+        
+        signatures = shards.name_signatures(group_key)
+        for i, candidates in lsh_neighbors(signatures, self.config.name_lsh_bands, start, end):
+            yield i, candidates.tolist()
+    
+    def _name_shard(self, shards: 'DetectionShards', group_key: str, start: int, end: int) -> ShardResult:
+        """Score the name candidates of anchors start <= i < end in one platform/type group.
+        
+        Every candidate is scored, including those already clustered with the
+        anchor, so the pairs (and the scores of the findings built from them)
+        do not depend on shard boundaries, worker count or run mode.
+        """
+        normalized = [record.normalized_name for record in shards.name_groups()[group_key]]
+        results = []
+        comparisons = 0
+        for i, candidates in self._name_candidates(shards, group_key, start, end):
+            comparisons += len(candidates)
+            matches = self._similar_names(normalized[i], normalized, candidates)
+            if matches:
+                results.append((i, matches))
+        return results, comparisons
+    
+    def _schema_shard(self, shards: 'DetectionShards', asset_type: str, start: int,
+                      end: int) -> ShardResult:
+        """Score the schema candidates of dataset anchors start <= i < end."""
+        stats = {'scored_pairs': 0}
+        results = [
+            (i, list(zip(matches.tolist(), similarities.tolist())))
+            for i, matches, similarities in shards.schema_index().similar_pairs(
+                self.config.schema_similarity_threshold, self.config.schema_block_size, start, end, stats
+            )
+        ]
+        return results, stats['scored_pairs']
+    
+    def _description_shard(self, shards: 'DetectionShards', asset_type: str, start: int,
+                           end: int) -> ShardResult:
+        """Score the description candidates of anchors start <= i < end in one type group."""
+        stats = {'scored_pairs': 0}
+        results = [
+            (i, list(zip(matches.tolist(), similarities.tolist())))
+            for i, matches, similarities in cosine_top_k(
+                shards.description_vectors(asset_type), self.config.content_similarity_threshold,
+                self.config.description_top_k, row_start=start, row_end=end, stats=stats
+            )
+        ]
+        return results, stats['scored_pairs']
+    
+    def _sql_shard(self, shards: 'DetectionShards', asset_type: str, start: int, end: int) -> ShardResult:
+        """Score the SQL-body candidates of anchors start <= i < end in one type group.
+        
+        Candidates share at least one LSH band of their MinHash signatures and
+        are scored by the share of signature values they agree on, an estimate
+        of the Jaccard similarity of their token shingles. As for names, every
+        candidate is scored, so pairs do not depend on how the stage is sharded.
+        """
+        signatures = shards.sql_signatures(asset_type)
+        threshold = self.config.sql_similarity_threshold
+        results = []
+        comparisons = 0
+        for i, candidates in lsh_neighbors(signatures, self.config.sql_lsh_bands, start, end):
+            comparisons += len(candidates)
+            similarities = (signatures[candidates] == signatures[i]).mean(axis=1)
+            keep = similarities >= threshold
+            if keep.any():
+                results.append((i, list(zip(candidates[keep].tolist(), similarities[keep].tolist()))))
+        return results, comparisons
+    
+    def _combined_candidates(self, shards: 'DetectionShards', asset_type: str, start: int,
+                             end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate pairs (rows, cols) with start <= row < col in one type group, each pair once.
+        
+        The union of what each signal's index proposes: the name stage's
+        candidates within each platform, dataset pairs passing the schema
+        prefix filter at the schema threshold, and description matches at the
+        content threshold. Schema and description candidates span platforms.
+        """
+        config = self.config
+        rows, cols = [], []
+        for group_key, group in shards.name_groups().items():
+            if group[0].type != asset_type:
+                continue
+            # Platform group rows are a subsequence of the type group rows
+            type_rows = shards.type_group_rows(group_key)
+            group_start, group_end = np.searchsorted(type_rows, [start, end]).tolist()
+            for i, candidates in self._name_candidates(shards, group_key, group_start, group_end):
+                candidates = np.asarray(candidates, dtype=np.int64)
+                rows.append(np.full(len(candidates), type_rows[i], dtype=np.int64))
+                cols.append(type_rows[candidates])
+        if asset_type == 'dataset':
+            for i, matches, _ in shards.schema_index().similar_pairs(
+                    config.schema_similarity_threshold, config.schema_block_size, start, end):
+                rows.append(np.full(len(matches), i, dtype=np.int64))
+                cols.append(matches.astype(np.int64))
+        if asset_type in shards.description_groups():
+            # Description rows map back to type-group rows in the same order
+            described = np.flatnonzero(shards.description_rows(asset_type) >= 0)
+            for k, matches, _ in cosine_top_k(
+                    shards.description_vectors(asset_type), config.content_similarity_threshold,
+                    config.description_top_k, row_start=int(np.searchsorted(described, start)),
+                    row_end=int(np.searchsorted(described, end))):
+                rows.append(np.full(len(matches), described[k], dtype=np.int64))
+                cols.append(described[matches])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
         
-        return findings
+        size = len(shards.type_groups()[asset_type])
+        keys = np.unique(np.concatenate(rows) * size + np.concatenate(cols))
+        return keys // size, keys % size
+    
+    def combined_signal_scores(self, shards: 'DetectionShards', asset_type: str, rows: np.ndarray,
+                               cols: np.ndarray, threshold: Optional[float] = None
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        """Score type-group row pairs on every combined signal.
+        
+        Returns (scores, available) arrays of shape (pairs, 3), with columns in
+        COMBINED_SIGNALS order. A schema or description score is only available
+        when both assets have a schema or a description; names always are.
+        
+        With a threshold, pairs that cannot reach it are left unscored (all
+        zero) as early as possible. The shared character counts of two names
+        bound their similarity from above, like SequenceMatcher.quick_ratio;
+        pairs whose bound falls short even with perfect schema and description
+        scores are dropped before the sparse products, and the rest are only
+        scored exactly by name when the bound allows for their actual schema
+        and description scores.
+        """
+        group = shards.type_groups()[asset_type]
+        scores = np.zeros((len(rows), len(COMBINED_SIGNALS)), dtype=np.float64)
+        available = np.zeros((len(rows), len(COMBINED_SIGNALS)), dtype=bool)
+        available[:, 0] = True
+        schema_sizes = shards.schema_index().sizes if asset_type == 'dataset' else None
+        if schema_sizes is not None:
+            available[:, 1] = (schema_sizes[rows] > 0) & (schema_sizes[cols] > 0)
+        description_rows = shards.description_rows(asset_type)
+        available[:, 2] = (description_rows[rows] >= 0) & (description_rows[cols] >= 0)
+        
+        weights = self._combined_weights()
+        scored = np.ones(len(rows), dtype=bool)
+        if threshold is not None:
+            name_bounds = self._name_bounds(shards, asset_type, rows, cols)
+            scored = self._name_needed(threshold, available, available.astype(np.float64), weights) <= name_bounds
+        
+        schema_pairs = np.flatnonzero(scored & available[:, 1])
+        if len(schema_pairs):
+            index = shards.schema_index()
+            intersections = pair_products(index.matrix, rows[schema_pairs], cols[schema_pairs])
+            scores[schema_pairs, 1] = intersections / (
+                schema_sizes[rows[schema_pairs]] + schema_sizes[cols[schema_pairs]] - intersections)
+        description_pairs = np.flatnonzero(scored & available[:, 2])
+        if len(description_pairs):
+            scores[description_pairs, 2] = np.minimum(pair_products(
+                shards.description_vectors(asset_type), description_rows[rows[description_pairs]],
+                description_rows[cols[description_pairs]]
+            ), 1.0)
+        
+        if threshold is not None:
+            scored &= self._name_needed(threshold, available, scores, weights) <= name_bounds
+        normalized = [record.normalized_name for record in group]
+        for k in np.flatnonzero(scored).tolist():
+            scores[k, 0] = self._normalized_name_similarity(normalized[rows[k]], normalized[cols[k]])
+        return scores, available
+    
+    def _name_bounds(self, shards: 'DetectionShards', asset_type: str, rows: np.ndarray,
+                     cols: np.ndarray) -> np.ndarray:
+        """Upper bounds on the name similarity of row pairs from their shared character counts."""
+        counts = shards.name_character_counts(asset_type)
+        lengths = counts.sum(axis=1, dtype=np.int64)
+        bounds = np.ones(len(rows), dtype=np.float64)
+        step = max(1, PAIR_CHUNK // counts.shape[1])
+        for chunk in range(0, len(rows), step):
+            chunk_rows, chunk_cols = rows[chunk:chunk + step], cols[chunk:chunk + step]
+            shared = np.minimum(counts[chunk_rows], counts[chunk_cols]).sum(axis=1, dtype=np.int64)
+            total = lengths[chunk_rows] + lengths[chunk_cols]
+            np.divide(2.0 * shared, total, out=bounds[chunk:chunk + step], where=total > 0)
+        return bounds
+    
+    def _name_needed(self, threshold: float, available: np.ndarray, scores: np.ndarray,
+                     weights: np.ndarray) -> np.ndarray:
+        """Lowest name score with which each pair reaches the threshold given its other scores."""
+        other = np.where(available[:, 1:], scores[:, 1:], 0.0) @ weights[1:]
+        shortfall = threshold * (available @ weights) - other
+        if weights[0] <= 0:
+            return np.where(shortfall > 1e-9, np.inf, 0.0)
+        return shortfall / weights[0] - 1e-9
+    
+    def _combined_weights(self) -> np.ndarray:
+        return np.array([self.config.combined_name_weight, self.config.combined_schema_weight,
+                         self.config.combined_description_weight], dtype=np.float64)
     
-    def detect_schema_duplicates(self, assets: List[Dict[str, Any]]) -> List[DuplicateFinding]:
+    def combined_scores(self, scores: np.ndarray, available: np.ndarray) -> np.ndarray:
+        """Weighted mean of each pair's available signal scores, in one vectorized pass."""
+        weights = self._combined_weights()
+        total_weights = available @ weights
+        combined = np.zeros(len(scores), dtype=np.float64)
+        np.divide(np.where(available, scores, 0.0) @ weights, total_weights, out=combined, where=total_weights > 0)
+        return combined
+    
+    def _combined_shard(self, shards: 'DetectionShards', asset_type: str, start: int,
+                        end: int) -> ShardResult:
+        """Score the candidates of anchors start <= i < end in one type group on all signals at once.
+        
+        Candidates are generated once for all signals (see _combined_candidates),
+        and pairs whose weighted score reaches combined_similarity_threshold
+        are kept.
+        """
+        rows, cols = self._combined_candidates(shards, asset_type, start, end)
+        threshold = self.config.combined_similarity_threshold
+        scores, available = self.combined_signal_scores(shards, asset_type, rows, cols, threshold)
+        combined = self.combined_scores(scores, available)
+        keep = combined >= threshold
+        rows, cols, combined = rows[keep], cols[keep], combined[keep]
+        boundaries = np.flatnonzero(np.diff(rows)) + 1
+        results = [
+            (int(anchor_rows[0]), list(zip(anchor_cols.tolist(), anchor_scores.tolist())))
+            for anchor_rows, anchor_cols, anchor_scores in zip(
+                np.split(rows, boundaries), np.split(cols, boundaries), np.split(combined, boundaries))
+            if len(anchor_rows)
+        ]
+        return results, len(keep)
+    
+    def _shard_ranges(self, size: int) -> List[Tuple[int, int]]:
+        """Split a group's anchor rows into contiguous ranges of at most shard_size rows."""
+        step = max(1, self.config.shard_size)
+        return [(start, min(start + step, size)) for start in range(0, size, step)]
+    
+    def _run_shards(self, shards: 'DetectionShards', tasks: List[Tuple]) -> List[ShardResult]:
+        """Run shard tasks, in a process pool when workers > 1, returning results in task order.
+        
+        Each task is (method name, *args) and only carries group keys and row
+        ranges; workers receive the records once at start-up (without copying
+        where fork is available) and rebuild the stage inputs they need.
+        """
+        if self.config.workers <= 1 or len(tasks) <= 1:
+            return [getattr(self, method)(shards, *args) for method, *args in tasks]
+        
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=min(self.config.workers, len(tasks)), mp_context=context,
+                                 initializer=_init_shard_worker,
+                                 initargs=(self.config, shards.records, shards.changed)) as pool:
+            return list(pool.map(_run_shard_task, tasks))
+    
+    def _stage_matches(self, shards: 'DetectionShards', groups_method: str, shard_method: str,
+                       similarity_type: str, incremental: Optional[IncrementalRun] = None
+                       ) -> Dict[str, List[AnchorMatches]]:
+        """Run one stage's shard tasks and return the anchor matches of each group.
+        
+        In an incremental run only the changed records are anchored on (they are
+        moved to the front of their groups, so later rows cover everything else);
+        their fresh pairs replace the stored ones and pairs between unchanged
+        records are carried forward from the store.
+        """
+        search = shards
+        if incremental is not None:
+            search = DetectionShards(self, incremental.search_order(shards.records), incremental.changed)
+        search_groups = getattr(search, groups_method)()
+        tasks = [
+            (shard_method, key, start, end)
+            for key, group in search_groups.items()
+            for start, end in self._shard_ranges(search.anchor_count(group))
+        ]
+        
+        matches = defaultdict(list)
+        comparisons = 0
+        for (_, key, _, _), (shard_results, shard_comparisons) in zip(tasks, self._run_shards(search, tasks)):
+            matches[key].extend(shard_results)
+            comparisons += shard_comparisons
+        searched = sum(_anchor_pairs(len(search_groups[key]), start, end) for _, key, start, end in tasks)
+        self.metrics.count(comparisons=comparisons, pruned_pairs=searched - comparisons)
+        if incremental is None:
+            return matches
+        
+        pairs = [
+            (search_groups[key][i].urn, search_groups[key][j].urn, score)
+            for key, anchors in matches.items()
+            for i, anchor_matches in anchors
+            for j, score in anchor_matches
+        ]
+        stored_pairs = incremental.store.replace_pairs(similarity_type, incremental.changed, pairs)
+        logger.info(f"Scored {len(pairs)} {similarity_type} pairs of changed assets; "
+                    f"{len(stored_pairs) - len(pairs)} carried forward")
+        if similarity_type in _CORPUS_SCORED_STAGES and incremental.changed:
+            rescored_pairs = self._rescore_pairs(shards, groups_method, similarity_type, stored_pairs)
+            logger.info(f"Re-scored {len(stored_pairs)} {similarity_type} pairs against the current TF-IDF "
+                        f"weights; {len(stored_pairs) - len(rescored_pairs)} fell below the threshold")
+            incremental.store.set_pairs(similarity_type, rescored_pairs)
+            stored_pairs = rescored_pairs
+        return self._pairs_to_matches(getattr(shards, groups_method)(), stored_pairs)
+    
+    def _rescore_pairs(self, shards: 'DetectionShards', groups_method: str, similarity_type: str,
+                       pairs: List[StoredPair]) -> List[StoredPair]:
+        """Score stored description or combined pairs again and keep those still at the threshold.
+        
+        Description weights are computed over each whole type group, so they
+        shift whenever any asset of the group is added, changed or removed.
+        """
+        groups = getattr(shards, groups_method)()
+        position = {record.urn: (key, i) for key, group in groups.items() for i, record in enumerate(group)}
+        by_group = defaultdict(list)
+        for urn_a, urn_b, _ in pairs:
+            if urn_a in position and urn_b in position and position[urn_a][0] == position[urn_b][0]:
+                by_group[position[urn_a][0]].append((position[urn_a][1], position[urn_b][1]))
+        
+        rescored = []
+        for key, rows_cols in by_group.items():
+            rows, cols = (np.array(side, dtype=np.int64) for side in zip(*rows_cols))
+            if similarity_type == 'description':
+                scores = np.minimum(pair_products(shards.description_vectors(key), rows, cols), 1.0)
+                # cosine_top_k accepts scores within 1e-9 below the threshold
+                keep = scores >= max(self.config.content_similarity_threshold, 1e-9) - 1e-9
+            else:
+                scores = self.combined_scores(*self.combined_signal_scores(shards, key, rows, cols))
+                keep = scores >= self.config.combined_similarity_threshold
+            group = groups[key]
+            rescored.extend(
+                (group[i].urn, group[j].urn, score)
+                for i, j, score in zip(rows[keep].tolist(), cols[keep].tolist(), scores[keep].tolist())
+            )
+        return rescored
+    
+    def _pairs_to_matches(self, groups: Dict[str, List[AssetRecord]],
+                          pairs: Iterable[StoredPair]) -> Dict[str, List[AnchorMatches]]:
+        """Arrange URN pairs as anchor matches over group rows, as a full run would produce them."""
+        position = {record.urn: (key, i) for key, group in groups.items() for i, record in enumerate(group)}
+        by_anchor = defaultdict(lambda: defaultdict(list))
+        for urn_a, urn_b, score in pairs:
+            if urn_a not in position or urn_b not in position:
+                continue
+            (key, i), (_, j) = position[urn_a], position[urn_b]
+            if i > j:
+                i, j = j, i
+            by_anchor[key][i].append((j, score))
+        return {
+            key: [(i, sorted(anchors[i])) for i in sorted(anchors)]
+            for key, anchors in by_anchor.items()
+        }
+    
+    def _cluster_findings(self, group: List[AssetRecord], anchor_matches: List[AnchorMatches]
+                          ) -> Iterator[Tuple[List[AssetRecord], List[Tuple[str, str, float]], float]]:
+        """Merge a group's pairwise matches into clusters of mutual duplicates.
+        
+        Yields (members in group order, pair scores, mean pair score) for every
+        cluster with at least min_assets_for_duplicate assets.
+        """
+        pairs = [(i, j, score) for i, matches in anchor_matches for j, score in matches]
+        for members, cluster in cluster_pairs(len(group), pairs):
+            if len(members) >= self.config.min_assets_for_duplicate:
+                pair_scores = [(group[i].urn, group[j].urn, score) for i, j, score in cluster]
+                yield [group[m] for m in members], pair_scores, sum(score for _, _, score in cluster) / len(cluster)
+    
+    def _confidence(self, similarity_type: str, similarity: float) -> str:
+        """Confidence of a pairwise-scored finding from its mean pair score."""
+        high, medium = _CONFIDENCE_BANDS[similarity_type]
+        if similarity >= high:
+            return "high"
+        if similarity >= medium:
+            return "medium"
+        return "low"
+    
+    def iter_name_duplicates(self, records: List[AssetRecord],
+                               incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect assets with similar names, yielding findings as they are clustered."""
+        # Group assets by platform and type, then shard each group's anchors
+        shards = DetectionShards(self, records)
+        grouped_records = shards.name_groups()
+        group_matches = self._stage_matches(shards, 'name_groups', '_name_shard', 'name', incremental)
+        
+        # Merge each group's matches into clusters of mutual duplicates
+        for group_key, group in grouped_records.items():
+            for duplicates, pair_scores, similarity in self._cluster_findings(group, group_matches.get(group_key, [])):
+                finding = DuplicateFinding(
+                    asset_type=duplicates[0].type,
+                    similarity_type="name",
+                    similarity_score=similarity,
+                    primary_asset=duplicates[0],
+                    duplicate_assets=duplicates[1:],
+                    reason=f"Similar names: {duplicates[0].name} vs {[record.name for record in duplicates[1:]]}",
+                    confidence=self._confidence("name", similarity),
+                    pair_scores=pair_scores
+                )
+                yield finding
+    
+    def detect_name_duplicates(self, records: List[AssetRecord],
+                               incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect assets with similar names."""
+        return list(self.iter_name_duplicates(records, incremental))
+    
+    def iter_schema_duplicates(self, records: List[AssetRecord],
+                                 incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect datasets with similar schemas, yielding findings as they are clustered."""
+        # Index each dataset's (fieldPath, type) token IDs and score all candidate
+        # pairs in bulk instead of comparing every pair of datasets
+        shards = DetectionShards(self, records)
+        datasets = shards.datasets()
+        group_matches = self._stage_matches(shards, 'schema_groups', '_schema_shard', 'schema', incremental)
+        
+        for duplicates, pair_scores, avg_similarity in self._cluster_findings(datasets, group_matches.get('dataset', [])):
+            finding = DuplicateFinding(
+                asset_type="dataset",
+                similarity_type="schema",
+                similarity_score=avg_similarity,
+                primary_asset=duplicates[0],
+                duplicate_assets=duplicates[1:],
+                reason=f"Similar schemas with {avg_similarity:.2%} field overlap",
+                confidence=self._confidence("schema", avg_similarity),
+                pair_scores=pair_scores
+            )
+            yield finding
+    
+    def detect_schema_duplicates(self, records: List[AssetRecord],
+                                 incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
         """Detect datasets with similar schemas."""
-        findings = []
+        return list(self.iter_schema_duplicates(records, incremental))
+    
+    def iter_description_duplicates(self, records: List[AssetRecord],
+                                      incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect assets with similar descriptions, yielding findings as they are clustered."""
+        # Group assets by type, then shard each group's anchors
+        shards = DetectionShards(self, records)
+        grouped_records = shards.description_groups()
+        group_matches = self._stage_matches(shards, 'description_groups', '_description_shard', 'description',
+                                            incremental)
+        
+        # Cluster each group's TF-IDF cosine matches into duplicate groups
+        for asset_type, group in grouped_records.items():
+            for duplicates, pair_scores, similarity in self._cluster_findings(group, group_matches.get(asset_type, [])):
+                finding = DuplicateFinding(
+                    asset_type=asset_type,
+                    similarity_type="description",
+                    similarity_score=similarity,
+                    primary_asset=duplicates[0],
+                    duplicate_assets=duplicates[1:],
+                    reason=f"Similar descriptions with {similarity:.2%} TF-IDF cosine similarity",
+                    confidence=self._confidence("description", similarity),
+                    pair_scores=pair_scores
+                )
+                yield finding
+    
+    def detect_description_duplicates(self, records: List[AssetRecord],
+                                      incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect assets with similar descriptions."""
+        return list(self.iter_description_duplicates(records, incremental))
+    
+    def iter_sql_duplicates(self, records: List[AssetRecord],
+                            incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect stored procedures and data jobs with near-duplicate SQL bodies.
         
-        # Filter to only datasets
-        datasets = [asset for asset in assets if asset.get('type') == 'dataset']
+        Bodies were normalized (comments dropped, literals and whitespace
+        removed, identifiers lowercased) and MinHashed over token shingles at
+        ingest; candidates come from LSH buckets over the signatures, so
+        thousands of templated procedures are not compared pairwise.
+        """
+        shards = DetectionShards(self, records)
+        grouped_records = shards.sql_groups()
+        group_matches = self._stage_matches(shards, 'sql_groups', '_sql_shard', 'sql', incremental)
         
-        for i, asset1 in enumerate(datasets):
-            info1 = self.extract_asset_info(asset1)
-            schema1 = info1['schema']
+        for asset_type, group in grouped_records.items():
+            for duplicates, pair_scores, similarity in self._cluster_findings(group, group_matches.get(asset_type, [])):
+                yield DuplicateFinding(
+                    asset_type=asset_type,
+                    similarity_type="sql",
+                    similarity_score=similarity,
+                    primary_asset=duplicates[0],
+                    duplicate_assets=duplicates[1:],
+                    reason=f"Similar SQL bodies with {similarity:.2%} estimated token-shingle overlap",
+                    confidence=self._confidence("sql", similarity),
+                    pair_scores=pair_scores
+                )
+    
+    def detect_sql_duplicates(self, records: List[AssetRecord],
+                              incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect stored procedures and data jobs with near-duplicate SQL bodies."""
+        return list(self.iter_sql_duplicates(records, incremental))
+    
+    def iter_combined_duplicates(self, records: List[AssetRecord],
+                                 incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect duplicates on name, schema and description together, one finding per cluster.
+        
+        Assets are grouped by type across platforms. Candidate pairs are
+        generated once from the name, schema and description indexes, every
+        candidate is scored on each signal both assets have, and the configured
+        weights combine the score arrays in one vectorized pass. A duplicate
+        pair found by all three signals is reported once instead of three
+        times.
+        """
+        shards = DetectionShards(self, records)
+        grouped_records = shards.type_groups()
+        group_matches = self._stage_matches(shards, 'type_groups', '_combined_shard', 'combined', incremental)
+        
+        for asset_type, group in grouped_records.items():
+            clusters = list(self._cluster_findings(group, group_matches.get(asset_type, [])))
+            if not clusters:
+                continue
             
-            if not schema1:
+            # Per-signal scores of every reported pair of the group, for the finding reasons
+            positions = {record.urn: i for i, record in enumerate(group)}
+            pairs = [(positions[urn_a], positions[urn_b]) for _, pair_scores, _ in clusters
+                     for urn_a, urn_b, _ in pair_scores]
+            rows, cols = np.array(pairs, dtype=np.int64).reshape(-1, 2).T
+            all_scores, all_available = self.combined_signal_scores(shards, asset_type, rows, cols)
+            offset = 0
+            for duplicates, pair_scores, similarity in clusters:
+                scores = all_scores[offset:offset + len(pair_scores)]
+                available = all_available[offset:offset + len(pair_scores)]
+                offset += len(pair_scores)
+                signals = ', '.join(
+                    f"{signal} {scores[available[:, k], k].mean():.2%}"
+                    for k, signal in enumerate(COMBINED_SIGNALS) if available[:, k].any()
+                )
+                yield DuplicateFinding(
+                    asset_type=asset_type,
+                    similarity_type="combined",
+                    similarity_score=similarity,
+                    primary_asset=duplicates[0],
+                    duplicate_assets=duplicates[1:],
+                    reason=f"Similar on combined signals (mean pair scores: {signals})",
+                    confidence=self._confidence("combined", similarity),
+                    pair_scores=pair_scores
+                )
+    
+    def detect_combined_duplicates(self, records: List[AssetRecord],
+                                   incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect duplicates on name, schema and description together."""
+        return list(self.iter_combined_duplicates(records, incremental))
+    
+    def iter_lineage_duplicates(self, records: List[AssetRecord],
+                                incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect datasets built from the same sources, yielding one finding per bucket.
+        
+        Each dataset's sorted upstream URN set (plus its downstream set when
+        lineage_include_downstream is on) was hashed at ingest, so datasets are
+        bucketed by fingerprint in a single pass instead of being compared
+        pairwise. Fingerprints are recomputed from every record on each run, so
+        incremental runs need no stored pairs for this stage.
+        """
+        include_downstream = self.config.lineage_include_downstream
+        buckets = defaultdict(list)
+        datasets = sum(1 for record in records if record.type == 'dataset')
+        # Bucketing compares no pairs at all
+        self.metrics.count(pruned_pairs=datasets * (datasets - 1) // 2)
+        for record in records:
+            key = self._lineage_key(record)
+            if key is not None:
+                buckets[key].append(record)
+        
+        for duplicates in buckets.values():
+            if len(duplicates) < self.config.min_assets_for_duplicate:
+                continue
+            if len(duplicates) > self.config.lineage_max_bucket_size:
+                logger.debug(f"Skipping lineage bucket of {len(duplicates)} datasets (e.g. {duplicates[0].urn})")
                 continue
             
-            duplicates = [asset1]
+            _, upstream_count, _, downstream_count = duplicates[0].lineage
+            sources = f"{upstream_count} upstream"
+            if include_downstream:
+                sources += f" and {downstream_count} downstream"
+            primary = duplicates[0]
+            yield DuplicateFinding(
+                asset_type="dataset",
+                similarity_type="lineage",
+                similarity_score=1.0,
+                primary_asset=primary,
+                duplicate_assets=duplicates[1:],
+                reason=f"Identical lineage: built from the same {sources} datasets",
+                # A single shared source is common for unrelated derived tables
+                confidence="high" if upstream_count + (downstream_count if include_downstream else 0) >= 2 else "medium",
+                pair_scores=[(primary.urn, duplicate.urn, 1.0) for duplicate in duplicates[1:]]
+            )
+    
+    def _lineage_key(self, record: AssetRecord) -> Optional[Tuple[int, ...]]:
+        """Fingerprint bucket of a dataset for lineage detection, or None if it has no lineage to match."""
+        if record.type != 'dataset' or record.lineage is None:
+            return None
+        upstream_fingerprint, upstream_count, downstream_fingerprint, _ = record.lineage
+        if self.config.lineage_include_downstream:
+            return (upstream_fingerprint, downstream_fingerprint)
+        return (upstream_fingerprint,) if upstream_count else None
+    
+    def detect_lineage_duplicates(self, records: List[AssetRecord],
+                                  incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect datasets built from the same sources."""
+        return list(self.iter_lineage_duplicates(records, incremental))
+    
+    def iter_cross_platform_duplicates(self, records: List[AssetRecord],
+                                       incremental: Optional[IncrementalRun] = None
+                                       ) -> Iterator[DuplicateFinding]:
+        """Detect the same dataset copied between platforms, yielding findings as they are clustered.
+        
+        Name matching only compares assets within one platform. Here each
+        dataset's qualified name is split into database, schema and table parts
+        (case and quoting removed) and datasets are hash-joined on their
+        normalized table name, so only datasets in the same block on different
+        platforms are paired. Blocks are rebuilt from every record on each run,
+        so incremental runs need no stored pairs for this stage.
+        """
+        blocks = defaultdict(list)
+        datasets = 0
+        for record in records:
+            if record.type != 'dataset':
+                continue
+            datasets += 1
+            parts = split_qualified_name(record.name)
+            if parts:
+                blocks[self._table_key(parts)].append((record, parts))
+        
+        comparisons = 0
+        for key, block in blocks.items():
+            if not key or len({record.platform for record, _ in block}) < 2:
+                continue
+            if len(block) > self.config.cross_platform_max_block_size:
+                logger.debug(f"Skipping cross-platform block '{key}' of {len(block)} datasets")
+                continue
             
-            for j, asset2 in enumerate(datasets[i+1:], i+1):
-                info2 = self.extract_asset_info(asset2)
-                schema2 = info2['schema']
-                
-                if not schema2:
-                    continue
-                
-                similarity = self.calculate_schema_similarity(schema1, schema2)
-                
-                if similarity >= self.config.schema_similarity_threshold:
-                    duplicates.append(asset2)
+            group = [record for record, _ in block]
+            anchor_matches = []
+            for i, (record, parts) in enumerate(block):
+                matches = [
+                    (j, name_agreement(parts, other_parts))
+                    for j, (other, other_parts) in enumerate(block[i + 1:], i + 1)
+                    if other.platform != record.platform
+                ]
+                comparisons += len(matches)
+                if matches:
+                    anchor_matches.append((i, matches))
             
-            if len(duplicates) >= self.config.min_assets_for_duplicate:
-                # Calculate average similarity
-                avg_similarity = sum(
-                    self.calculate_schema_similarity(
-                        self.extract_asset_info(duplicates[0])['schema'],
-                        self.extract_asset_info(dup)['schema']
-                    ) for dup in duplicates[1:]
-                ) / len(duplicates[1:])
-                
-                # Determine confidence
-                if avg_similarity >= 0.9:
-                    confidence = "high"
-                elif avg_similarity >= 0.7:
-                    confidence = "medium"
-                else:
-                    confidence = "low"
-                
-                finding = DuplicateFinding(
+            parts_by_urn = {record.urn: parts for record, parts in block}
+            for duplicates, pair_scores, similarity in self._cluster_findings(group, anchor_matches):
+                # Same table and schema on both sides of every pair, or the schema is unknown
+                same_schema = all(
+                    len(parts_by_urn[urn1]) < 2 or len(parts_by_urn[urn2]) < 2 or
+                    schemas_match(parts_by_urn[urn1][-2], parts_by_urn[urn2][-2])
+                    for urn1, urn2, _ in pair_scores
+                )
+                platforms = sorted({record.platform for record in duplicates})
+                yield DuplicateFinding(
                     asset_type="dataset",
-                    similarity_type="schema",
-                    similarity_score=avg_similarity,
+                    similarity_type="cross_platform",
+                    similarity_score=similarity,
                     primary_asset=duplicates[0],
                     duplicate_assets=duplicates[1:],
-                    reason=f"Similar schemas with {avg_similarity:.2%} field overlap",
-                    confidence=confidence
+                    reason=f"Same table '{key}' on {len(platforms)} platforms: {', '.join(platforms)}",
+                    confidence="high" if same_schema else "medium",
+                    pair_scores=pair_scores
                 )
-                findings.append(finding)
+        self.metrics.count(comparisons=comparisons, pruned_pairs=datasets * (datasets - 1) // 2 - comparisons)
+    
+    def _table_key(self, parts: List[str]) -> str:
+        """Normalized table name that cross-platform detection hash-joins datasets on."""
+        return self.normalize_name(parts[-1])
+    
+    def detect_cross_platform_duplicates(self, records: List[AssetRecord],
+                                         incremental: Optional[IncrementalRun] = None
+                                         ) -> List[DuplicateFinding]:
+        """Detect the same dataset copied between platforms."""
+        return list(self.iter_cross_platform_duplicates(records, incremental))
+    
+    def iter_column_duplicates(self, records: List[AssetRecord],
+                               incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Detect columns replicated across datasets, yielding one finding per column.
+        
+        Every dataset field was reduced at ingest to a (fieldPath, native type,
+        description) signature and interned in the column vocabulary, so
+        datasets are bucketed by column token in one counting pass over all
+        fields instead of comparing columns pairwise. Buckets are rebuilt from
+        every record on each run, so incremental runs need no stored pairs for
+        this stage.
+        """
+        datasets = [record for record in records if record.type == 'dataset' and len(record.column_tokens)]
+        if not datasets:
+            return
+        counts = np.bincount(np.concatenate([record.column_tokens for record in datasets]))
+        fields = int(counts.sum())
+        # Bucketing compares no pairs of columns at all
+        self.metrics.count(pruned_pairs=fields * (fields - 1) // 2)
+        min_datasets = max(self.config.column_min_datasets, self.config.min_assets_for_duplicate, 2)
+        buckets = defaultdict(list)
+        for record in datasets:
+            tokens = record.column_tokens
+            for token in tokens[counts[tokens] >= min_datasets].tolist():
+                buckets[token].append(record)
+        columns = {token: column for column, token in self.column_vocabulary.items() if token in buckets}
         
-        return findings
+        for token, duplicates in buckets.items():
+            path, native_type, description = columns[token]
+            if self.config.column_require_description and not description:
+                continue
+            reason = f"Column '{path}' ({native_type or 'unknown type'}) replicated in {len(duplicates)} datasets"
+            if description:
+                reason += f" with description '{description[:80]}'"
+            primary = duplicates[0]
+            yield DuplicateFinding(
+                asset_type="dataset",
+                similarity_type="column",
+                similarity_score=1.0,
+                primary_asset=primary,
+                duplicate_assets=duplicates[1:],
+                reason=reason,
+                # Undescribed columns include generic ones such as id or created_at
+                confidence="high" if description else "medium",
+                pair_scores=[(primary.urn, duplicate.urn, 1.0) for duplicate in duplicates[1:]]
+            )
     
-    def detect_description_duplicates(self, assets: List[Dict[str, Any]]) -> List[DuplicateFinding]:
-        """Detect assets with similar descriptions."""
-        findings = []
+    def detect_column_duplicates(self, records: List[AssetRecord],
+                                 incremental: Optional[IncrementalRun] = None) -> List[DuplicateFinding]:
+        """Detect columns replicated across datasets."""
+        return list(self.iter_column_duplicates(records, incremental))
+    
+    def detect_duplicates(self, entity_types: List[str] = None, 
+                         detection_types: List[str] = None,
+                         store: Optional[SignatureStore] = None,
+                         assets: Optional[Iterable[Dict[str, Any]]] = None) -> List[DuplicateFinding]:
+        """Main method to detect all types of duplicates."""
+        return list(self.iter_duplicates(entity_types, detection_types, store, assets))
+    
+    def iter_duplicates(self, entity_types: List[str] = None,
+                        detection_types: List[str] = None,
+                        store: Optional[SignatureStore] = None,
+                        assets: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[DuplicateFinding]:
+        """Detect all types of duplicates, yielding findings as each stage produces them.
         
-        # Group assets by type
-        grouped_assets = defaultdict(list)
-        for asset in assets:
-            info = self.extract_asset_info(asset)
-            if info['description']:
-                grouped_assets[info['type']].append((info['description'], asset))
+        Findings can be handed to streaming writers one at a time instead of
+        being collected first. With a signature store, only new and changed
+        assets are compared (against every asset) and matches between unchanged
+        assets are carried forward from the previous run; the store is committed
+        once all stages are done. Assets are scanned from DataHub, fetching only
+        the fields the detection types read, unless an iterable of them is
+        given, e.g. from iter_snapshot_assets.
         
-        # Check for duplicates within each group
-        for asset_type, asset_list in grouped_assets.items():
-            for i, (desc1, asset1) in enumerate(asset_list):
-                duplicates = [asset1]
-                
-                for j, (desc2, asset2) in enumerate(asset_list[i+1:], i+1):
-                    similarity = SequenceMatcher(None, desc1.lower(), desc2.lower()).ratio()
-                    
-                    if similarity >= 0.8:  # High threshold for description similarity
-                        duplicates.append(asset2)
-                
-                if len(duplicates) >= self.config.min_assets_for_duplicate:
-                    finding = DuplicateFinding(
-                        asset_type=asset_type,
-                        similarity_type="description",
-                        similarity_score=similarity,
-                        primary_asset=duplicates[0],
-                        duplicate_assets=duplicates[1:],
-                        reason=f"Similar descriptions with {similarity:.2%} text overlap",
-                        confidence="medium" if similarity >= 0.9 else "low"
+        Each stage (ingest, then one per detection type) is measured in
+        ``self.metrics``; time spent by the caller handling a finding is not
+        charged to the stage that yielded it.
+        """
+        if detection_types is None:
+            detection_types = ["name", "schema", "description"]
+        
+        self.metrics = DetectionMetrics()
+        if assets is None:
+            logger.info("Searching for assets in DataHub...")
+            assets = self.iter_assets(entity_types, detection_types=detection_types)
+        incremental = None
+        with self.metrics.stage("ingest"):
+            if store is None:
+                records = self.build_records(assets)
+            else:
+                records, incremental = self.build_records_incremental(
+                    assets, store, entity_types, detection_types
+                )
+        logger.info(f"Found {len(records)} assets to analyze")
+        
+        yield from self._iter_stages(records, detection_types, incremental)
+        
+        if store is not None:
+            store.commit()
+        
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+    
+    def _iter_stages(self, records: List[AssetRecord], detection_types: List[str],
+                     incremental: Optional[IncrementalRun] = None) -> Iterator[DuplicateFinding]:
+        """Run the requested stages over records, measuring each and yielding its findings."""
+        total = 0
+        for detection_type, label, iter_findings in self._detection_stages(detection_types):
+            logger.info(f"Detecting {label} duplicates...")
+            count = 0
+            with self.metrics.stage(detection_type) as stage_metrics:
+                for finding in iter_findings(records, incremental):
+                    count += 1
+                    stage_metrics.findings += 1
+                    with self.metrics.paused():
+                        yield finding
+            total += count
+            logger.info(f"Found {count} {label} duplicates")
+        logger.info(f"Total duplicate findings: {total}")
+    
+    def _detection_stages(self, detection_types: List[str]) -> List[Tuple[str, str, Any]]:
+        """(detection type, log label, iter method) of the requested stages, in run order."""
+        stages = [
+            ("name", "name-based", self.iter_name_duplicates),
+            ("schema", "schema-based", self.iter_schema_duplicates),
+            ("description", "description-based", self.iter_description_duplicates),
+            ("sql", "SQL-body", self.iter_sql_duplicates),
+            ("combined", "combined multi-signal", self.iter_combined_duplicates),
+            ("lineage", "lineage-based", self.iter_lineage_duplicates),
+            ("cross_platform", "cross-platform", self.iter_cross_platform_duplicates),
+            ("column", "column-level", self.iter_column_duplicates)
+        ]
+        return [stage for stage in stages if stage[0] in detection_types]
+    
+    def block_key(self, detection_type: str, record: AssetRecord) -> Optional[str]:
+        """Key of the block a stage compares a record within, or None when the stage ignores it.
+        
+        Every stage only pairs records that share its block key: names within a
+        platform/type group, schemas and columns across all datasets,
+        descriptions, SQL bodies and combined scores within a type, lineage
+        within a fingerprint bucket and cross-platform copies within a table
+        name. Running a stage on each block separately therefore finds what a
+        run over all records finds.
+        """
+        if detection_type == 'name':
+            return record.group_key
+        if detection_type in ('schema', 'column'):
+            return 'dataset' if record.type == 'dataset' else None
+        if detection_type == 'description':
+            return record.type if record.description_terms is not None else None
+        if detection_type == 'sql':
+            return record.type if record.sql_signature is not None else None
+        if detection_type == 'combined':
+            return record.type
+        if detection_type == 'lineage':
+            key = self._lineage_key(record)
+            return None if key is None else ':'.join(str(fingerprint) for fingerprint in key)
+        if detection_type == 'cross_platform':
+            parts = split_qualified_name(record.name) if record.type == 'dataset' else None
+            return (self._table_key(parts) or None) if parts else None
+        raise ValueError(f"Unknown detection type: {detection_type}")
+    
+    def iter_duplicates_external(self, entity_types: List[str] = None,
+                                 detection_types: List[str] = None,
+                                 assets: Optional[Iterable[Dict[str, Any]]] = None,
+                                 spill_dir: Optional[str] = None) -> Iterator[DuplicateFinding]:
+        """Detect duplicates with records spilled to disk and compared one block at a time.
+        
+        For catalogs larger than memory. Each scanned asset is reduced to a
+        compact record and handed to an external merge sort once per stage,
+        under that stage's block key (see block_key) and with only the
+        signals that stage reads; no record list is kept. The sorted runs are
+        then streamed back stage by stage and each block is run through the
+        stage on its own, so only the largest block (and the schema and
+        column vocabularies) has to fit in memory. Findings are those of
+        iter_duplicates, in block order. Signature stores are not supported
+        in this mode.
+        """
+        if detection_types is None:
+            detection_types = ["name", "schema", "description"]
+        stages = self._detection_stages(detection_types)
+        
+        self.metrics = DetectionMetrics()
+        if assets is None:
+            logger.info("Searching for assets in DataHub...")
+            assets = self.iter_assets(entity_types, detection_types=detection_types)
+        with ExternalSorter(self.config.external_run_size, self.config.external_merge_fan_in, spill_dir) as sorter:
+            with self.metrics.stage("ingest"):
+                catalog = self._new_catalog()
+                count = 0
+                for asset in assets:
+                    record = catalog.make_record(self.extract_asset_info(asset))
+                    count += 1
+                    for position, (detection_type, _, _) in enumerate(stages):
+                        key = self.block_key(detection_type, record)
+                        if key is not None:
+                            sorter.add((position, key), record.with_signals(_BLOCK_SIGNALS[detection_type]))
+                # Writes the last run and merges runs down to fan_in before the first block is read
+                blocks = sorter.blocks()
+                block = next(blocks, None)
+            logger.info(f"Spilled {count} assets as {sorter.items} block entries "
+                        f"({sorter.spilled_bytes / 2**20:.1f} MB) to {spill_dir or 'the temporary directory'}")
+            
+            total = 0
+            for position, (detection_type, label, iter_findings) in enumerate(stages):
+                logger.info(f"Detecting {label} duplicates block by block...")
+                count = 0
+                largest = 0
+                with self.metrics.stage(detection_type) as stage_metrics:
+                    while block is not None and block[0][0] == position:
+                        # Drop each block before the next one is read
+                        records, block = block[1], None
+                        largest = max(largest, len(records))
+                        for finding in iter_findings(records):
+                            count += 1
+                            stage_metrics.findings += 1
+                            with self.metrics.paused():
+                                yield finding
+                        records = None
+                        block = next(blocks, None)
+                total += count
+                logger.info(f"Found {count} {label} duplicates (largest block {largest} records)")
+        
+        logger.info(f"Total duplicate findings: {total}")
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+    
+    def sweep_thresholds(self, records: List[AssetRecord],
+                         thresholds: Dict[str, List[float]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Report findings for several thresholds per similarity type from one scoring pass.
+        
+        Each of the name, schema and description stages in ``thresholds`` is
+        scored once at its lowest threshold and every candidate pair is kept in
+        a ScoreMatrix; cluster and finding counts for each threshold are then
+        read off the matrix. Stages score every candidate pair, so finding,
+        clustered asset and confidence counts match separate detection runs at
+        each threshold.
+        """
+        shards = DetectionShards(self, records)
+        results = {}
+        for similarity_type, stage_thresholds in thresholds.items():
+            groups_method, shard_method, threshold_setting, tolerance = _SWEEP_STAGES[similarity_type]
+            config = self.config
+            self.config = replace(config, **{threshold_setting: min(stage_thresholds)})
+            try:
+                with self.metrics.stage(f"{similarity_type}_sweep"):
+                    group_matches = self._stage_matches(shards, groups_method, shard_method, similarity_type)
+                    matrix = ScoreMatrix.from_group_matches(getattr(shards, groups_method)(), group_matches)
+                    del group_matches
+                    logger.info(f"Retained {len(matrix)} {similarity_type} pair scores "
+                                f"({matrix.nbytes / 2**20:.1f} MB) at threshold {min(stage_thresholds)}")
+                    results[similarity_type] = sweep_clusters(
+                        matrix, [threshold - tolerance for threshold in stage_thresholds],
+                        self.config.min_assets_for_duplicate,
+                        lambda similarity: self._confidence(similarity_type, similarity)
                     )
-                    findings.append(finding)
+                for row, threshold in zip(results[similarity_type], stage_thresholds):
+                    row['threshold'] = threshold
+            finally:
+                self.config = config
+        return results
+    
+    def sweep_duplicates(self, entity_types: List[str] = None,
+                         thresholds: Dict[str, List[float]] = None,
+                         assets: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Scan (or read) the catalog once and sweep thresholds; see sweep_thresholds."""
+        self.metrics = DetectionMetrics()
+        if assets is None:
+            logger.info("Searching for assets in DataHub...")
+            assets = self.iter_assets(entity_types, detection_types=list(thresholds or {}))
+        with self.metrics.stage("ingest"):
+            records = self.build_records(assets)
+        logger.info(f"Found {len(records)} assets to analyze")
         
-        return findings
+        results = self.sweep_thresholds(records, thresholds or {})
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+        return results
     
-    def detect_duplicates(self, entity_types: List[str] = None, 
-                         detection_types: List[str] = None) -> List[DuplicateFinding]:
-        """Main method to detect all types of duplicates."""
+    def estimate_counts(self, records: List[AssetRecord],
+                        detection_types: List[str]) -> Dict[str, List[StratumEstimate]]:
+        """Estimate duplicated assets and clusters per platform/type stratum from a sample of anchors.
+        
+        Up to estimate_sample_size records of every stratum are sampled and
+        put first in the search order, so each pairwise stage only anchors on
+        them, as an incremental run anchors on changed records, while still
+        comparing them against every record. The match counts of the sampled
+        anchors are extrapolated to the stratum (see sample_estimates). The
+        hash-join stages are run on every record and counted exactly. Each
+        stage's list ends with its total over all strata.
+        """
+        config = self.config
+        z = z_score(config.estimate_confidence)
+        strata = defaultdict(list)
+        for record in records:
+            strata[record.group_key].append(record)
+        rng = random.Random(config.estimate_seed)
+        samples = {key: rng.sample(group, min(len(group), config.estimate_sample_size))
+                   for key, group in sorted(strata.items())}
+        anchors = {record.urn for sample in samples.values() for record in sample}
+        search = DetectionShards(
+            self,
+            [record for sample in samples.values() for record in sample] +
+            [record for record in records if record.urn not in anchors],
+            anchors
+        )
+        logger.info(f"Sampled {len(anchors)} of {len(records)} assets across {len(strata)} platform/type strata")
+        
+        results = {}
+        for detection_type in detection_types:
+            with self.metrics.stage(f"{detection_type}_estimate") as stage_metrics:
+                if detection_type in _PAIRWISE_STAGES:
+                    groups_method, shard_method = _PAIRWISE_STAGES[detection_type]
+                    matched = defaultdict(set)
+                    groups = getattr(search, groups_method)()
+                    for key, group_matches in self._stage_matches(search, groups_method, shard_method,
+                                                                  detection_type).items():
+                        group = groups[key]
+                        anchor_count = search.anchor_count(group)
+                        for i, matches in group_matches:
+                            for j, _ in matches:
+                                # Pairs between two anchors are only reported from the first
+                                matched[group[i].urn].add(j)
+                                if j < anchor_count:
+                                    matched[group[j].urn].add(i)
+                    stratum_estimates = [
+                        estimate_stratum(key, len(strata[key]),
+                                         [len(matched[record.urn]) for record in sample],
+                                         config.min_assets_for_duplicate, z)
+                        for key, sample in samples.items()
+                    ]
+                else:
+                    stratum_estimates = self._exact_counts(detection_type, records, strata)
+                stage_metrics.findings = sum(1 for estimate in stratum_estimates if estimate.duplicated_assets)
+            results[detection_type] = stratum_estimates + [total_estimate('total', stratum_estimates)]
+        return results
+    
+    def _exact_counts(self, detection_type: str, records: List[AssetRecord],
+                      strata: Dict[str, List[AssetRecord]]) -> List[StratumEstimate]:
+        """Duplicated assets and clusters per stratum of a stage run on every record."""
+        iter_findings = dict((stage[0], stage[2]) for stage in self._detection_stages([detection_type]))
+        duplicated = defaultdict(set)
+        clusters = defaultdict(float)
+        for finding in iter_findings[detection_type](records):
+            members = [finding.primary_asset] + finding.duplicate_assets
+            for record in members:
+                duplicated[record.group_key].add(record.urn)
+                # A cluster spanning strata is shared between them by member count
+                clusters[record.group_key] += 1 / len(members)
+        return [exact_stratum(key, len(group), len(duplicated[key]), clusters[key])
+                for key, group in sorted(strata.items())]
+    
+    def estimate_duplicates(self, entity_types: List[str] = None,
+                            detection_types: List[str] = None,
+                            assets: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, List[StratumEstimate]]:
+        """Scan (or read) the catalog once and estimate duplicate counts; see estimate_counts."""
         if detection_types is None:
             detection_types = ["name", "schema", "description"]
+        self.metrics = DetectionMetrics()
+        if assets is None:
+            logger.info("Searching for assets in DataHub...")
+            assets = self.iter_assets(entity_types, detection_types=detection_types)
+        with self.metrics.stage("ingest"):
+            records = self.build_records(assets)
+        logger.info(f"Found {len(records)} assets to analyze")
         
-        logger.info("Searching for assets in DataHub...")
-        assets = self.search_assets(entity_types)
-        logger.info(f"Found {len(assets)} assets to analyze")
+        results = self.estimate_counts(records, detection_types)
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+        return results
+    
+    def plan_shards(self, snapshot_path: str, directory: str, shard_count: int,
+                    entity_types: List[str] = None, detection_types: List[str] = None,
+                    split_block_size: int = 20000) -> ShardPlan:
+        """Partition a snapshot into shard files for independent workers; see sharding.py.
         
-        all_findings = []
+        The snapshot is read twice: once to size every block of the pairwise
+        stages (records are built and dropped, keeping only their block
+        keys), and once to write each asset to the shards of its blocks.
+        Blocks of more than split_block_size assets are spread over all
+        shards. Assets in no pairwise block are left out; the merge step
+        reads them from the snapshot.
+        """
+        if entity_types is None:
+            entity_types = list(ENTITY_TYPE_ENUMS)
+        if detection_types is None:
+            detection_types = ["name", "schema", "description"]
+        stages = [detection_type for detection_type in detection_types if detection_type in _PAIRWISE_STAGES]
+        os.makedirs(directory, exist_ok=True)
         
-        if "name" in detection_types:
-            logger.info("Detecting name-based duplicates...")
-            name_findings = self.detect_name_duplicates(assets)
-            all_findings.extend(name_findings)
-            logger.info(f"Found {len(name_findings)} name-based duplicates")
+        catalog = self._new_catalog()
+        asset_keys = []
+        block_sizes = Counter()
+        for asset in self.iter_snapshot_assets(snapshot_path, entity_types):
+            record = catalog.make_record(self.extract_asset_info(asset))
+            keys = [(stage, self.block_key(stage, record)) for stage in stages]
+            keys = [(stage, key) for stage, key in keys if key is not None]
+            block_sizes.update(keys)
+            asset_keys.append((record.urn, keys))
+        del catalog
+        split = {block for block, size in block_sizes.items() if size > split_block_size}
         
-        if "schema" in detection_types:
-            logger.info("Detecting schema-based duplicates...")
-            schema_findings = self.detect_schema_duplicates(assets)
-            all_findings.extend(schema_findings)
-            logger.info(f"Found {len(schema_findings)} schema-based duplicates")
+        plan = ShardPlan(
+            directory=directory,
+            snapshot_path=os.path.abspath(snapshot_path),
+            shard_count=shard_count,
+            entity_types=entity_types,
+            detection_types=detection_types,
+            config=asdict(self.config),
+            shard_assets=[0] * shard_count,
+            split_blocks=sorted((stage, key, block_sizes[(stage, key)]) for stage, key in split)
+        )
+        shard_files = [open(plan.shard_path(shard), 'w') for shard in range(shard_count)]
+        try:
+            for asset, (urn, keys) in zip(self.iter_snapshot_assets(snapshot_path, entity_types), asset_keys):
+                if asset.get('urn') != urn:
+                    raise ValueError(f"Snapshot {snapshot_path} changed while it was being planned")
+                roles = defaultdict(dict)
+                for stage, key in keys:
+                    if (stage, key) in split:
+                        anchor_shard = shard_of(urn, shard_count)
+                        for shard in range(shard_count):
+                            roles[shard][stage] = 'anchor' if shard == anchor_shard else 'target'
+                    else:
+                        roles[shard_of(f"{stage}\0{key}", shard_count)][stage] = 'anchor'
+                for shard, shard_roles in roles.items():
+                    shard_files[shard].write(json.dumps({'entity': {**asset, 'shardRoles': shard_roles}}))
+                    shard_files[shard].write("\n")
+                    plan.shard_assets[shard] += 1
+        finally:
+            for shard_file in shard_files:
+                shard_file.close()
+        plan.save()
+        logger.info(f"Planned {len(asset_keys)} assets into {shard_count} shards in {directory} "
+                    f"({len(split)} blocks spread over all shards): {plan.shard_assets}")
+        return plan
+    
+    def shard_pairs(self, assets: Iterable[Dict[str, Any]], detection_types: List[str]) -> Iterator[ShardPair]:
+        """Score the pairs of one shard file's assets, stage by stage, anchoring on the shard's anchors.
         
-        if "description" in detection_types:
-            logger.info("Detecting description-based duplicates...")
-            desc_findings = self.detect_description_duplicates(assets)
-            all_findings.extend(desc_findings)
-            logger.info(f"Found {len(desc_findings)} description-based duplicates")
+        Each stage only sees the assets the plan gave a role in it; their
+        anchors are put first and compared against all of them, as an
+        incremental run compares its changed records.
+        """
+        self.metrics = DetectionMetrics()
+        roles = {}
+        with self.metrics.stage("ingest"):
+            catalog = self._new_catalog()
+            for asset in assets:
+                record = catalog.add(asset)
+                roles[record.urn] = asset.get('shardRoles') or {}
+            records = catalog.records
+        logger.info(f"Found {len(records)} shard assets to analyze")
         
-        logger.info(f"Total duplicate findings: {len(all_findings)}")
-        return all_findings
+        for detection_type in detection_types:
+            if detection_type not in _PAIRWISE_STAGES:
+                continue
+            groups_method, shard_method = _PAIRWISE_STAGES[detection_type]
+            anchors = [record for record in records if roles[record.urn].get(detection_type) == 'anchor']
+            targets = [record for record in records if roles[record.urn].get(detection_type) == 'target']
+            count = 0
+            with self.metrics.stage(detection_type) as stage_metrics:
+                search = DetectionShards(self, anchors + targets, {record.urn for record in anchors})
+                groups = getattr(search, groups_method)()
+                for key, group_matches in self._stage_matches(search, groups_method, shard_method,
+                                                              detection_type).items():
+                    group = groups[key]
+                    for i, matches in group_matches:
+                        for j, score in matches:
+                            count += 1
+                            with self.metrics.paused():
+                                yield detection_type, group[i].urn, group[j].urn, score
+                stage_metrics.findings = count
+            logger.info(f"Scored {count} {detection_type} pairs anchored on {len(anchors)} of "
+                        f"{len(anchors) + len(targets)} assets")
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
     
-    def generate_report(self, findings: List[DuplicateFinding], 
-                       output_file: str = None) -> str:
-        """Generate a detailed report of duplicate findings."""
-        report = []
-        report.append("# DataHub Duplicate Asset Detection Report")
-        report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"Total Findings: {len(findings)}")
-        report.append("")
+    def iter_merged_duplicates(self, store: SignatureStore, detection_types: List[str] = None,
+                               assets: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[DuplicateFinding]:
+        """Detect duplicates over all assets from the pairs the shards of a plan scored.
         
-        # Group findings by type
-        by_type = defaultdict(list)
-        by_confidence = defaultdict(list)
+        The pairwise stages score nothing themselves: the pairs in the store
+        (see SignatureStore.add_pairs) are clustered over every record, as
+        an incremental run clusters carried-forward pairs, so clusters whose
+        pairs were scored on different shards are merged. The hash-join stages
+        run on every record.
+        """
+        if detection_types is None:
+            detection_types = ["name", "schema", "description"]
+        self.metrics = DetectionMetrics()
+        with self.metrics.stage("ingest"):
+            records = self.build_records(assets)
+        logger.info(f"Found {len(records)} assets to merge")
         
-        for finding in findings:
-            by_type[finding.similarity_type].append(finding)
-            by_confidence[finding.confidence].append(finding)
-        
-        # Summary
-        report.append("## Summary")
-        report.append(f"- Name-based duplicates: {len(by_type['name'])}")
-        report.append(f"- Schema-based duplicates: {len(by_type['schema'])}")
-        report.append(f"- Description-based duplicates: {len(by_type['description'])}")
-        report.append("")
-        report.append(f"- High confidence: {len(by_confidence['high'])}")
-        report.append(f"- Medium confidence: {len(by_confidence['medium'])}")
-        report.append(f"- Low confidence: {len(by_confidence['low'])}")
-        report.append("")
-        
-        # Detailed findings
-        for finding in findings:
-            report.append(f"## {finding.similarity_type.title()} Duplicate - {finding.confidence.upper()} Confidence")
-            report.append(f"**Similarity Score:** {finding.similarity_score:.2%}")
-            report.append(f"**Reason:** {finding.reason}")
-            report.append("")
-            
-            # Primary asset
-            primary_info = self.extract_asset_info(finding.primary_asset)
-            report.append(f"### Primary Asset")
-            report.append(f"- **Name:** {primary_info['name']}")
-            report.append(f"- **Type:** {primary_info['type']}")
-            report.append(f"- **Platform:** {primary_info['platform']}")
-            report.append(f"- **URN:** {primary_info['urn']}")
-            if primary_info['description']:
-                report.append(f"- **Description:** {primary_info['description'][:200]}...")
-            report.append("")
-            
-            # Duplicate assets
-            report.append(f"### Duplicate Assets ({len(finding.duplicate_assets)})")
-            for i, dup_asset in enumerate(finding.duplicate_assets, 1):
-                dup_info = self.extract_asset_info(dup_asset)
-                report.append(f"#### Duplicate {i}")
-                report.append(f"- **Name:** {dup_info['name']}")
-                report.append(f"- **Type:** {dup_info['type']}")
-                report.append(f"- **Platform:** {dup_info['platform']}")
-                report.append(f"- **URN:** {dup_info['urn']}")
-                if dup_info['description']:
-                    report.append(f"- **Description:** {dup_info['description'][:200]}...")
-                report.append("")
-            
-            report.append("---")
-            report.append("")
+        yield from self._iter_stages(records, detection_types, IncrementalRun(store, set()))
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+    
+    def build_similarity_index(self, records: List[AssetRecord]) -> SimilarityIndex:
+        """Build the top-K lookup index (see similarity_index) over ingested records.
         
+        Name signatures restored from a signature store are reused; the others
+        are computed with this detector's name LSH settings.
+        """
+        config = self.config
+        signatures = self.record_name_signatures(records)
+        vectorizer = HashedTfidfVectorizer(
+            n_features=config.description_hash_features,
+            max_df=config.description_max_df
+        )
+        settings = {
+            'name_ngram_size': config.name_ngram_size,
+            'name_minhash_permutations': config.name_minhash_permutations,
+            'lsh_seed': config.lsh_seed,
+            'description_hash_features': config.description_hash_features,
+            'description_max_df': config.description_max_df,
+            'case_sensitive': config.case_sensitive
+        }
+        return SimilarityIndex.build(records, signatures, vectorizer, settings)
+    
+    def index_assets(self, entity_types: List[str] = None,
+                     assets: Optional[Iterable[Dict[str, Any]]] = None) -> SimilarityIndex:
+        """Scan (or read) the catalog once and build the similarity index over it."""
+        self.metrics = DetectionMetrics()
+        if assets is None:
+            logger.info("Searching for assets in DataHub...")
+            assets = self.iter_assets(entity_types, detection_types=list(SIGNALS))
+        with self.metrics.stage("ingest"):
+            records = self.build_records(assets)
+        logger.info(f"Found {len(records)} assets to index")
+        with self.metrics.stage("index"):
+            index = self.build_similarity_index(records)
+        for line in self.metrics.log_lines():
+            logger.info(f"Stage {line}")
+        return index
+    
+    def similar_assets(self, index: SimilarityIndex, urn: str, k: int = 10,
+                       signals: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Look up the k assets most similar to a URN by name, schema and description.
+        
+        Name matches are rescored with this detector's name similarity, so
+        their scores are those the name stage would give. Raises KeyError when
+        the URN is not in the index.
+        """
+        return index.similar(urn, k, self._normalized_name_similarity, signals)
+    
+    def generate_report(self, findings: Iterable[DuplicateFinding], 
+                       output_file: str = None) -> str:
+        """Generate a detailed report of duplicate findings.
+        
+        The report text is returned, and also saved to output_file when given.
+        It is built in memory; use write_report to stream a large run to a file.
+        """
+        findings = list(findings)
+        report = report_header(
+            len(findings),
+            Counter(finding.similarity_type for finding in findings),
+            Counter(finding.confidence for finding in findings)
+        )
+        for finding in findings:
+            report.extend(finding_markdown(finding))
         report_text = "\n".join(report)
         
         if output_file:
@@ -511,36 +2142,43 @@ class DataHubDuplicateDetector:
         
         return report_text
     
-    def export_findings_json(self, findings: List[DuplicateFinding], 
+    def write_report(self, findings: Iterable[DuplicateFinding], output_file: str) -> None:
+        """Write the markdown report to output_file, streaming findings one at a time."""
+        with MarkdownReportWriter(output_file) as writer:
+            for finding in findings:
+                writer.write(finding)
+    
+    def export_findings_json(self, findings: Iterable[DuplicateFinding], 
                            output_file: str) -> None:
-        """Export findings to JSON format."""
-        findings_data = []
-        
-        for finding in findings:
-            finding_data = {
-                'asset_type': finding.asset_type,
-                'similarity_type': finding.similarity_type,
-                'similarity_score': finding.similarity_score,
-                'confidence': finding.confidence,
-                'reason': finding.reason,
-                'primary_asset': self.extract_asset_info(finding.primary_asset),
-                'duplicate_assets': [self.extract_asset_info(asset) for asset in finding.duplicate_assets],
-                'total_duplicates': len(finding.duplicate_assets) + 1
-            }
-            findings_data.append(finding_data)
-        
-        with open(output_file, 'w') as f:
-            json.dump(findings_data, f, indent=2)
-        
-        logger.info(f"Findings exported to {output_file}")
+        """Export findings to JSON format, writing them one at a time."""
+        with JsonArrayWriter(output_file) as writer:
+            for finding in findings:
+                writer.write(finding)
+
+# Shard state of a worker process, set up once by _init_shard_worker
+_worker_shards: Optional[DetectionShards] = None
+
+def _init_shard_worker(config: DetectionConfig, records: List[AssetRecord],
+                       changed: Optional[Set[str]]) -> None:
+    """Set up a worker process with its own detector and stage inputs."""
+    global _worker_shards
+    detector = DataHubDuplicateDetector('', '')
+    detector.config = config
+    _worker_shards = DetectionShards(detector, records, changed)
+
+def _run_shard_task(task: Tuple) -> ShardResult:
+    """Run one (method name, *args) shard task inside a worker process."""
+    method, *args = task
+    return getattr(_worker_shards.detector, method)(_worker_shards, *args)
 
 def main():
     """Main function to run the duplicate detector."""
     # Configuration from environment variables
     datahub_gms_url = os.getenv('DATAHUB_GMS_URL', 'https://test-environment.acryl.io/gms')
     datahub_token = os.getenv('DATAHUB_GMS_TOKEN')
+    snapshot_path = os.getenv('SNAPSHOT_PATH')
     
-    if not datahub_token:
+    if not datahub_token and not snapshot_path:
         logger.error("DATAHUB_GMS_TOKEN environment variable is required")
         return
     
@@ -553,14 +2191,15 @@ def main():
     
     # Run detection
     logger.info("Starting duplicate detection...")
-    findings = detector.detect_duplicates(entity_types, detection_types)
+    assets = detector.iter_snapshot_assets(snapshot_path, entity_types) if snapshot_path else None
+    findings = detector.detect_duplicates(entity_types, detection_types, assets=assets)
     
     # Generate reports
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     report_file = f"duplicate_report_{timestamp}.md"
     json_file = f"duplicate_findings_{timestamp}.json"
     
-    detector.generate_report(findings, report_file)
+    detector.write_report(findings, report_file)
     detector.export_findings_json(findings, json_file)
     
     logger.info(f"Detection completed. Found {len(findings)} duplicate groups.")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+External merge sort of keyed items for the DataHub Duplicate Detector
+
+Items are buffered in memory up to a run size, sorted by key and pickled to
+a temporary run file; the runs are then merged (in several passes when there
+are more runs than can be open at once) into one stream in key order. Items
+with equal keys keep the order they were added in, so blocks read back from
+the sort list their members in scan order.
+"""
+
+import heapq
+import logging
+import os
+import pickle
+import tempfile
+from itertools import groupby
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (sort key, item)
+KeyedItem = Tuple[Any, Any]
+
+def _write_run(path: str, items: Iterable[KeyedItem]) -> int:
+    """Pickle keyed items to a run file one at a time, returning how many were written."""
+    count = 0
+    # Each item is a pickle of its own, so neither side keeps a memo of everything written
+    with open(path, 'wb') as f:
+        for item in items:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+            count += 1
+    return count
+
+def _read_run(path: str) -> Iterator[KeyedItem]:
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def _merge(runs: List[str]) -> Iterator[KeyedItem]:
+    # heapq.merge prefers earlier runs on equal keys, which keeps items in insertion order
+    return heapq.merge(*(_read_run(path) for path in runs), key=lambda item: item[0])
+
+class ExternalSorter:
+    """Sorts more (key, item) pairs than fit in memory through temporary run files.
+    
+    Use as a context manager, or call close, so the run files are removed.
+    Keys must be mutually comparable; items must be picklable.
+    """
+    
+    def __init__(self, run_size: int = 100000, fan_in: int = 64, directory: Optional[str] = None):
+        self.run_size = max(1, run_size)
+        self.fan_in = max(2, fan_in)
+        self._directory = tempfile.TemporaryDirectory(prefix='duplicate_blocks_', dir=directory)
+        self._buffer: List[KeyedItem] = []
+        self._runs: List[str] = []
+        self._run_count = 0
+        self.items = 0
+    
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def _new_run_path(self) -> str:
+        self._run_count += 1
+        return os.path.join(self._directory.name, f"run_{self._run_count:06d}.pkl")
+    
+    def _spill(self) -> None:
+        """Sort the buffer and write it out as one run."""
+        if not self._buffer:
+            return
+        self._buffer.sort(key=lambda item: item[0])
+        path = self._new_run_path()
+        _write_run(path, self._buffer)
+        self._runs.append(path)
+        self._buffer = []
+    
+    def add(self, key: Any, item: Any) -> None:
+        """Add one item under a sort key, spilling a run when the buffer is full."""
+        self._buffer.append((key, item))
+        self.items += 1
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+    
+    @property
+    def spilled_bytes(self) -> int:
+        """Size of the run files currently on disk."""
+        return sum(os.path.getsize(path) for path in self._runs)
+    
+    def sorted_items(self) -> Iterator[KeyedItem]:
+        """Yield every (key, item) in key order; no more items may be added afterwards.
+        
+        Runs are merged fan_in at a time into longer runs until at most fan_in
+        are left, which are then merged while they are read.
+        """
+        self._spill()
+        while len(self._runs) > self.fan_in:
+            merged = []
+            for start in range(0, len(self._runs), self.fan_in):
+                group = self._runs[start:start + self.fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = self._new_run_path()
+                _write_run(path, _merge(group))
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            logger.debug(f"Merged {len(self._runs)} sorted runs into {len(merged)}")
+            self._runs = merged
+        return _merge(self._runs)
+    
+    def blocks(self) -> Iterator[Tuple[Any, List[Any]]]:
+        """Yield (key, items with that key in insertion order), one block at a time, in key order."""
+        for key, block in groupby(self.sorted_items(), key=lambda item: item[0]):
+            yield key, [item for _, item in block]
+    
+    def close(self) -> None:
+        """Remove the run files."""
+        self._buffer = []
+        self._runs = []
+        self._directory.cleanup()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+GraphQL field projection for the DataHub Duplicate Detector
+
+The scroll query only selects what the requested detection types read, per
+entity type: a name-only run fetches urn, name and platform, while
+description, schema, column, lineage, SQL and combined detection each add
+the aspects they need. The same selection sets can project captured entities, so the
+response size of a projection can be compared offline.
+"""
+
+import copy
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Field name -> sub-selection, or None for a scalar field
+Selection = Dict[str, Optional['Selection']]
+
+# Entity type names used in configuration -> GraphQL object type names
+GRAPHQL_TYPE_NAMES = {
+    'dataset': 'Dataset',
+    'chart': 'Chart',
+    'dashboard': 'Dashboard',
+    'dataFlow': 'DataFlow',
+    'dataJob': 'DataJob'
+}
+
+DETECTION_TYPES = ['name', 'schema', 'description', 'sql', 'lineage', 'cross_platform', 'column', 'combined']
+
+# Selected for every entity: findings report the name and platform of each asset
+_BASE_SELECTION: Selection = {'name': None, 'platform': {'name': None}}
+
+# (detection type, entity types it reads, or None for all, fields it reads)
+_REQUIREMENTS = [
+    ('description', None, {'properties': {'description': None}}),
+    ('schema', {'dataset'}, {'schemaMetadata': {'fields': {'fieldPath': None, 'type': None}}}),
+    ('column', {'dataset'}, {'schemaMetadata': {'fields': {
+        'fieldPath': None, 'type': None, 'nativeDataType': None, 'description': None
+    }}}),
+    ('lineage', {'dataset'}, {'upstreamLineage': {'upstreams': {'dataset': {'urn': None}}}}),
+    ('sql', {'dataFlow', 'dataJob'}, {'properties': {'customProperties': {'key': None, 'value': None}}}),
+    ('sql', {'dataJob'}, {'dataTransformLogic': {'transforms': {'queryStatement': {'value': None}}}}),
+    ('combined', None, {'properties': {'description': None}}),
+    ('combined', {'dataset'}, {'schemaMetadata': {'fields': {'fieldPath': None, 'type': None}}})
+]
+
+_DOWNSTREAM_SELECTION: Selection = {'downstreamLineage': {'downstreams': {'dataset': {'urn': None}}}}
+
+def _merge(selection: Selection, fields: Selection) -> None:
+    """Add fields (and their sub-selections) to a selection in place."""
+    for name, sub_selection in fields.items():
+        if sub_selection is None:
+            selection.setdefault(name, None)
+        else:
+            _merge(selection.setdefault(name, {}), sub_selection)
+
+def entity_selection(entity_type: str, detection_types: Optional[Iterable[str]] = None,
+                     include_downstream: bool = False) -> Selection:
+    """Fields to select for one entity type and the given detection types.
+    
+    With no detection types, every field any detection type reads is selected,
+    including downstream lineage, as needed to capture a reusable snapshot.
+    """
+    if detection_types is None:
+        detection_types, include_downstream = DETECTION_TYPES, True
+    detection_types = set(detection_types)
+    selection = copy.deepcopy(_BASE_SELECTION)
+    for detection_type, entity_types, fields in _REQUIREMENTS:
+        if detection_type in detection_types and (entity_types is None or entity_type in entity_types):
+            _merge(selection, fields)
+    if 'lineage' in detection_types and include_downstream and entity_type == 'dataset':
+        _merge(selection, _DOWNSTREAM_SELECTION)
+    return selection
+
+def _render(selection: Selection, indent: int) -> List[str]:
+    lines = []
+    for name, sub_selection in selection.items():
+        if sub_selection is None:
+            lines.append(' ' * indent + name)
+        else:
+            lines.append(' ' * indent + name + ' {')
+            lines.extend(_render(sub_selection, indent + 4))
+            lines.append(' ' * indent + '}')
+    return lines
+
+def scroll_query(entity_types: Iterable[str], detection_types: Optional[Iterable[str]] = None,
+                 include_downstream: bool = False) -> str:
+    """Build the scroll query with one inline fragment per entity type."""
+    detection_types = list(detection_types) if detection_types is not None else None
+    fragments = []
+    for entity_type in entity_types:
+        fragments.append(' ' * 24 + f"... on {GRAPHQL_TYPE_NAMES.get(entity_type, entity_type)} {{")
+        fragments.extend(_render(entity_selection(entity_type, detection_types, include_downstream), 28))
+        fragments.append(' ' * 24 + '}')
+    fragment_text = '\n'.join(fragments)
+    return f"""
+        query scroll($input: ScrollAcrossEntitiesInput!) {{
+            scrollAcrossEntities(input: $input) {{
+                nextScrollId
+                count
+                searchResults {{
+                    entity {{
+                        urn
+                        type
+{fragment_text}
+                    }}
+                }}
+            }}
+        }}
+        """
+
+def project(value: Any, selection: Optional[Selection]) -> Any:
+    """Keep only the selected fields of an entity (or of each item of a list), as GraphQL would return them."""
+    if selection is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, selection) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {name: project(value.get(name), sub_selection) for name, sub_selection in selection.items()}
+
+@lru_cache(maxsize=None)
+def _result_selection(entity_type: str, detection_types: Optional[Tuple[str, ...]],
+                      include_downstream: bool) -> Selection:
+    return {'urn': None, 'type': None, **entity_selection(entity_type, detection_types, include_downstream)}
+
+def projected_bytes(entities: Iterable[Dict[str, Any]], detection_types: Optional[Iterable[str]] = None,
+                    include_downstream: bool = False) -> int:
+    """JSON size of the search results a scroll with this projection would return for the entities."""
+    detection_types = tuple(sorted(detection_types)) if detection_types is not None else None
+    return sum(
+        len(json.dumps({'entity': project(
+            entity, _result_selection(entity.get('type'), detection_types, include_downstream)
+        )}).encode('utf-8'))
+        for entity in entities
+    )
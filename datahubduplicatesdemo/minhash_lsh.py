@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+MinHash signatures and locality-sensitive hashing for the DataHub Duplicate Detector
+"""
+
+import zlib
+from typing import Iterable, Iterator, Optional, Sequence, Set, Tuple
+import numpy as np
+
+# Mersenne prime used by the universal hash family; keeps a * x + b inside uint64
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+# Upper bound on token hashes expanded at once while computing signatures
+_SIGNATURE_BATCH_TOKENS = 1 << 16
+
+def char_ngrams(text: str, n: int = 3) -> Set[str]:
+    """Return the character n-grams of a string padded with start/end markers."""
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+def hash_tokens(tokens: Iterable[str]) -> np.ndarray:
+    """Hash tokens to stable 32-bit integers (identical across processes and runs)."""
+    return np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64)
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of universal hash functions."""
+    
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+    
+    def signature(self, token_hashes: np.ndarray) -> np.ndarray:
+        """Return the MinHash signature of one non-empty set of token hashes."""
+        permuted = (np.outer(token_hashes % _MERSENNE_PRIME, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+    
+    def signatures(self, token_hash_sets: Sequence[np.ndarray]) -> np.ndarray:
+        """Return an (n, num_perm) signature matrix for n non-empty sets of token hashes."""
+        result = np.empty((len(token_hash_sets), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(token_hash_sets):
+            # Expand a batch of sets into one matrix and reduce each set's rows
+            end = start
+            batch_tokens = 0
+            while end < len(token_hash_sets) and (end == start or batch_tokens < _SIGNATURE_BATCH_TOKENS):
+                batch_tokens += len(token_hash_sets[end])
+                end += 1
+            batch = token_hash_sets[start:end]
+            offsets = np.zeros(len(batch), dtype=np.int64)
+            np.cumsum([len(hashes) for hashes in batch[:-1]], out=offsets[1:])
+            stacked = np.concatenate(batch) % _MERSENNE_PRIME
+            permuted = (np.outer(stacked, self._a) + self._b) % _MERSENNE_PRIME
+            result[start:end] = np.minimum.reduceat(permuted, offsets, axis=0)
+            start = end
+        return result
+
+def lsh_neighbors(signatures: np.ndarray, bands: int, row_start: int = 0,
+                  row_end: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (row, later rows sharing at least one LSH band with it) for a signature matrix.
+    
+    Signatures are split into ``bands`` bands of ``num_perm / bands`` rows. Two
+    items become candidates when any band matches exactly, so more bands (fewer
+    rows per band) raise recall at the cost of more candidate pairs. Candidates
+    are produced one anchor row at a time, so memory stays proportional to the
+    number of rows rather than the number of candidate pairs. ``row_start`` and
+    ``row_end`` restrict the anchor rows, so a matrix can be split across workers.
+    """
+    count, num_perm = signatures.shape
+    if bands < 1 or num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a positive multiple of bands ({bands})")
+    rows = num_perm // bands
+    
+    # For each band, bucket rows by their band value and keep members sorted by row
+    band_buckets = []
+    for band in range(bands):
+        band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = band_values.view(np.dtype((np.void, band_values.dtype.itemsize * rows))).ravel()
+        _, bucket_of_row = np.unique(keys, return_inverse=True)
+        bucket_of_row = bucket_of_row.ravel()
+        members = np.argsort(bucket_of_row, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(np.bincount(bucket_of_row))))
+        band_buckets.append((bucket_of_row, members, starts))
+    
+    for row in range(row_start, count if row_end is None else min(row_end, count)):
+        shared = []
+        for bucket_of_row, members, starts in band_buckets:
+            bucket = bucket_of_row[row]
+            start, end = starts[bucket], starts[bucket + 1]
+            if end - start > 1:
+                bucket_members = members[start:end]
+                later = bucket_members[np.searchsorted(bucket_members, row, side='right'):]
+                if len(later):
+                    shared.append(later)
+        if shared:
+            yield row, np.unique(np.concatenate(shared))
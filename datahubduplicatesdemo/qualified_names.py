@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Qualified dataset names for cross-platform duplicate detection
+
+The same table copied between platforms (mssql into Snowflake by Fivetran,
+Postgres into BigQuery, ...) keeps its table name but changes case, quoting
+and often its database and schema. Names are split into their parts with
+platform quoting removed, so that copies can be joined on their table part.
+"""
+
+import re
+from typing import List, Sequence
+
+# One dot-separated identifier: [mssql], "ansi" (with "" escapes), `mysql/bigquery`, or bare
+_IDENTIFIER = re.compile(r'\[([^\]]*)\]|"((?:[^"]|"")*)"|`([^`]*)`|([^.]+)')
+
+def split_qualified_name(name: str) -> List[str]:
+    """Split a qualified name into lowercase parts with quoting removed.
+    
+    ``[Sales].[dbo].[Orders]``, ``"SALES"."DBO"."ORDERS"`` and
+    ``sales.dbo.orders`` all give ``['sales', 'dbo', 'orders']``. Dots inside
+    quoted identifiers do not split.
+    """
+    parts = []
+    position = 0
+    while position < len(name):
+        match = _IDENTIFIER.match(name, position)
+        if match is None:
+            position += 1
+            continue
+        bracketed, double_quoted, backticked, bare = match.groups()
+        if double_quoted is not None:
+            part = double_quoted.replace('""', '"')
+        else:
+            part = next(group for group in (bracketed, backticked, bare) if group is not None)
+        part = part.strip().lower()
+        if part:
+            parts.append(part)
+        position = match.end() + 1
+    return parts
+
+def schemas_match(schema1: str, schema2: str) -> bool:
+    """Whether two schema parts name the same source schema.
+    
+    Replication tools prefix the source schema with their connector name
+    (Fivetran lands ``dbo`` as ``<connector>_dbo``), so a schema also matches
+    one that ends in ``_`` plus it.
+    """
+    return schema1 == schema2 or schema1.endswith('_' + schema2) or schema2.endswith('_' + schema1)
+
+def name_agreement(parts1: Sequence[str], parts2: Sequence[str]) -> float:
+    """Share of the right-aligned name parts two names have in common, given equal table parts.
+    
+    Only as many parts as the shorter name has are compared, so ``dbo.orders``
+    against ``sales.dbo.orders`` agrees fully.
+    """
+    compared = min(len(parts1), len(parts2))
+    if compared == 0:
+        return 0.0
+    agreeing = 1
+    if compared >= 2 and schemas_match(parts1[-2], parts2[-2]):
+        agreeing += 1
+    if compared >= 3:
+        agreeing += sum(1 for part1, part2 in zip(parts1[-compared:-2], parts2[-compared:-2]) if part1 == part2)
+    return agreeing / compared
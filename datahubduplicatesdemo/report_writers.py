@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Streaming writers for duplicate findings: markdown, JSON, JSON Lines and Parquet
+"""
+
+import json
+import logging
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, TextIO
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+def finding_to_dict(finding) -> Dict[str, Any]:
+    """Return the JSON representation of a finding."""
+    return {
+        'asset_type': finding.asset_type,
+        'similarity_type': finding.similarity_type,
+        'similarity_score': finding.similarity_score,
+        'confidence': finding.confidence,
+        'reason': finding.reason,
+        'primary_asset': finding.primary_asset.to_dict(),
+        'duplicate_assets': [record.to_dict() for record in finding.duplicate_assets],
+        'total_duplicates': len(finding.duplicate_assets) + 1,
+        'pair_scores': [
+            {'urn1': urn1, 'urn2': urn2, 'score': score} for urn1, urn2, score in finding.pair_scores
+        ]
+    }
+
+def _asset_markdown(asset) -> List[str]:
+    lines = [
+        f"- **Name:** {asset.name}",
+        f"- **Type:** {asset.type}",
+        f"- **Platform:** {asset.platform}",
+        f"- **URN:** {asset.urn}"
+    ]
+    if asset.description:
+        lines.append(f"- **Description:** {asset.description[:200]}...")
+    return lines
+
+def finding_markdown(finding) -> List[str]:
+    """Return the markdown lines describing one finding."""
+    lines = [
+        f"## {finding.similarity_type.replace('_', '-').title()} Duplicate - {finding.confidence.upper()} Confidence",
+        f"**Similarity Score:** {finding.similarity_score:.2%}",
+        f"**Reason:** {finding.reason}",
+        "",
+        "### Primary Asset"
+    ]
+    lines.extend(_asset_markdown(finding.primary_asset))
+    lines.append("")
+    
+    lines.append(f"### Duplicate Assets ({len(finding.duplicate_assets)})")
+    for i, duplicate in enumerate(finding.duplicate_assets, 1):
+        lines.append(f"#### Duplicate {i}")
+        lines.extend(_asset_markdown(duplicate))
+        lines.append("")
+    
+    # Scores of the matched pairs that make up the cluster
+    if finding.pair_scores:
+        lines.append(f"### Pair Scores ({len(finding.pair_scores)})")
+        for urn1, urn2, score in finding.pair_scores:
+            lines.append(f"- {urn1} vs {urn2}: {score:.2%}")
+        lines.append("")
+    
+    lines.append("---")
+    lines.append("")
+    return lines
+
+def report_header(total: int, by_type: Counter, by_confidence: Counter) -> List[str]:
+    """Return the markdown report title and summary lines."""
+    return [
+        "# DataHub Duplicate Asset Detection Report",
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Total Findings: {total}",
+        "",
+        "## Summary",
+        f"- Name-based duplicates: {by_type['name']}",
+        f"- Schema-based duplicates: {by_type['schema']}",
+        f"- Description-based duplicates: {by_type['description']}",
+        f"- SQL-body duplicates: {by_type['sql']}",
+        f"- Combined-signal duplicates: {by_type['combined']}",
+        f"- Lineage-based duplicates: {by_type['lineage']}",
+        f"- Cross-platform duplicates: {by_type['cross_platform']}",
+        f"- Column duplicates: {by_type['column']}",
+        "",
+        f"- High confidence: {by_confidence['high']}",
+        f"- Medium confidence: {by_confidence['medium']}",
+        f"- Low confidence: {by_confidence['low']}",
+        ""
+    ]
+
+class FindingsWriter:
+    """Writes findings to a file one at a time, so they never have to be held in memory."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+    
+    def __enter__(self) -> 'FindingsWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def write(self, finding) -> None:
+        self._write(finding)
+        self.count += 1
+    
+    def _write(self, finding) -> None:
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        raise NotImplementedError
+
+class MarkdownReportWriter(FindingsWriter):
+    """Streams the markdown report.
+    
+    Finding sections go to a temporary file next to the report while summary
+    counts are kept; on close the header and summary are written and the
+    sections are copied after them.
+    """
+    
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._body_path = f"{path}.part"
+        self._body: Optional[TextIO] = open(self._body_path, 'w')
+        self._by_type = Counter()
+        self._by_confidence = Counter()
+    
+    def _write(self, finding) -> None:
+        self._by_type[finding.similarity_type] += 1
+        self._by_confidence[finding.confidence] += 1
+        self._body.write("\n".join(finding_markdown(finding)))
+        self._body.write("\n")
+    
+    def close(self) -> None:
+        if self._body is None:
+            return
+        self._body.close()
+        self._body = None
+        with open(self.path, 'w') as report, open(self._body_path) as body:
+            report.write("\n".join(report_header(self.count, self._by_type, self._by_confidence)))
+            report.write("\n")
+            shutil.copyfileobj(body, report)
+        os.remove(self._body_path)
+        logger.info(f"Report saved to {self.path}")
+
+class JsonArrayWriter(FindingsWriter):
+    """Streams findings as one indented JSON array, the format of export_findings_json."""
+    
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file: Optional[TextIO] = open(path, 'w')
+        self._file.write("[")
+    
+    def _write(self, finding) -> None:
+        text = json.dumps(finding_to_dict(finding), indent=2).replace("\n", "\n  ")
+        self._file.write(f"{',' if self.count else ''}\n  {text}")
+    
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        self._file = None
+        logger.info(f"Findings exported to {self.path}")
+
+class JsonLinesWriter(FindingsWriter):
+    """Writes one compact JSON object per finding per line."""
+    
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file: Optional[TextIO] = open(path, 'w')
+    
+    def _write(self, finding) -> None:
+        self._file.write(json.dumps(finding_to_dict(finding)))
+        self._file.write("\n")
+    
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        logger.info(f"Findings exported to {self.path}")
+
+class ParquetFindingsWriter(FindingsWriter):
+    """Writes findings to a Parquet file in row groups of batch_size findings.
+    
+    Each row holds the finding fields, the primary asset's fields and list
+    columns for the duplicate assets and pair scores. Requires pyarrow.
+    """
+    
+    def __init__(self, path: str, batch_size: int = 10000):
+        if pa is None:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        super().__init__(path)
+        self.batch_size = batch_size
+        self._schema = pa.schema([
+            ('asset_type', pa.string()),
+            ('similarity_type', pa.string()),
+            ('similarity_score', pa.float64()),
+            ('confidence', pa.string()),
+            ('reason', pa.string()),
+            ('primary_urn', pa.string()),
+            ('primary_name', pa.string()),
+            ('primary_platform', pa.string()),
+            ('duplicate_urns', pa.list_(pa.string())),
+            ('duplicate_names', pa.list_(pa.string())),
+            ('total_duplicates', pa.int32()),
+            ('pair_scores', pa.list_(pa.struct([
+                ('urn1', pa.string()), ('urn2', pa.string()), ('score', pa.float64())
+            ])))
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._batch: List[Dict[str, Any]] = []
+    
+    def _write(self, finding) -> None:
+        primary = finding.primary_asset
+        self._batch.append({
+            'asset_type': finding.asset_type,
+            'similarity_type': finding.similarity_type,
+            'similarity_score': finding.similarity_score,
+            'confidence': finding.confidence,
+            'reason': finding.reason,
+            'primary_urn': primary.urn,
+            'primary_name': primary.name,
+            'primary_platform': primary.platform,
+            'duplicate_urns': [record.urn for record in finding.duplicate_assets],
+            'duplicate_names': [record.name for record in finding.duplicate_assets],
+            'total_duplicates': len(finding.duplicate_assets) + 1,
+            'pair_scores': [
+                {'urn1': urn1, 'urn2': urn2, 'score': score} for urn1, urn2, score in finding.pair_scores
+            ]
+        })
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        if self._batch:
+            self._writer.write_table(pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+    
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._writer = None
+        logger.info(f"Findings exported to {self.path}")
+
+# Output format name -> (writer class, file name pattern)
+WRITER_FORMATS = {
+    'markdown': (MarkdownReportWriter, "duplicate_report_{timestamp}.md"),
+    'json': (JsonArrayWriter, "duplicate_findings_{timestamp}.json"),
+    'jsonl': (JsonLinesWriter, "duplicate_findings_{timestamp}.jsonl"),
+    'parquet': (ParquetFindingsWriter, "duplicate_findings_{timestamp}.parquet")
+}
+
+def open_writers(formats: List[str], output_dir: str, timestamp: str) -> List[FindingsWriter]:
+    """Open one writer per requested format inside output_dir."""
+    writers = []
+    try:
+        for output_format in formats:
+            writer_class, file_pattern = WRITER_FORMATS[output_format]
+            writers.append(writer_class(os.path.join(output_dir, file_pattern.format(timestamp=timestamp))))
+    except Exception:
+        for writer in writers:
+            writer.close()
+        raise
+    return writers
@@ -7,9 +7,13 @@ import os
 import sys
 import logging
 import argparse
+import json
 from datetime import datetime
 from dotenv import load_dotenv
 from duplicate_detector import DataHubDuplicateDetector
+from report_writers import WRITER_FORMATS, open_writers
+from signature_store import SignatureStore
+from snapshot import SnapshotWriter
 from config import get_config
 
 # Load environment variables
@@ -28,7 +32,9 @@ def parse_arguments():
                        default='dataset,chart,dashboard')
     
     parser.add_argument('--detection-types',
-                       help='Comma-separated list of detection types (default: name,schema,description)',
+                       help='Comma-separated list of detection types: name, schema, description, sql, lineage, '
+                            'cross_platform, column, combined '
+                            '(default: name,schema,description)',
                        default='name,schema,description')
     
     parser.add_argument('--name-threshold',
@@ -41,18 +47,80 @@ def parse_arguments():
                        help='Schema similarity threshold (default: 0.7)',
                        default=0.7)
     
+    parser.add_argument('--content-threshold',
+                       type=float,
+                       help='Description similarity threshold (default: 0.9)',
+                       default=0.9)
+    
     parser.add_argument('--min-assets',
                        type=int,
                        help='Minimum number of assets to consider a duplicate group (default: 2)',
                        default=2)
     
+    parser.add_argument('--workers',
+                       type=int,
+                       help='Worker processes used for detection; 1 runs in-process (default: DETECTOR_WORKERS or 1)',
+                       default=None)
+    
+    parser.add_argument('--store',
+                       help='SQLite signature store for incremental runs; only new or changed assets are '
+                            're-compared (default: SIGNATURE_STORE_PATH, unset = full run)',
+                       default=None)
+    
+    parser.add_argument('--snapshot',
+                       help='Read assets from a local snapshot (JSONL search results or an MCP/MCE file) '
+                            'instead of DataHub (default: SNAPSHOT_PATH, unset = live scan)',
+                       default=None)
+    
+    parser.add_argument('--external-blocking',
+                       action='store_true',
+                       help='Spill asset records to disk sorted by blocking key and compare one block at a time, '
+                            'for catalogs that do not fit in memory (default: EXTERNAL_BLOCKING)')
+    
+    parser.add_argument('--spill-dir',
+                       help='Directory for the sorted runs of --external-blocking '
+                            '(default: SPILL_DIR, unset = system temporary directory)',
+                       default=None)
+    
+    parser.add_argument('--capture-snapshot',
+                       help='Save the assets scanned from DataHub to this JSONL snapshot for later offline runs',
+                       default=None)
+    
+    parser.add_argument('--sweep-name-thresholds',
+                       help='Comma-separated name thresholds to sweep in one scoring pass, e.g. 0.7,0.8,0.9; '
+                            'prints finding counts per threshold instead of writing findings',
+                       default=None)
+    
+    parser.add_argument('--sweep-schema-thresholds',
+                       help='Comma-separated schema thresholds to sweep in one scoring pass',
+                       default=None)
+    
+    parser.add_argument('--sweep-content-thresholds',
+                       help='Comma-separated description thresholds to sweep in one scoring pass',
+                       default=None)
+    
+    parser.add_argument('--estimate',
+                       action='store_true',
+                       help='Estimate duplicated assets and clusters per platform/type from a sample of anchors, '
+                            'with confidence intervals, instead of writing findings')
+    
+    parser.add_argument('--estimate-sample-size',
+                       type=int,
+                       help='Assets sampled per platform/type for --estimate (default: 200)',
+                       default=200)
+    
+    parser.add_argument('--estimate-confidence',
+                       type=float,
+                       help='Confidence level of the --estimate intervals (default: 0.95)',
+                       default=0.95)
+    
     parser.add_argument('--output-dir',
                        help='Output directory for reports (default: ./reports)',
                        default='./reports')
     
     parser.add_argument('--format',
-                       choices=['markdown', 'json', 'both'],
-                       help='Output format (default: both)',
+                       help='Comma-separated output formats: markdown, json, jsonl, parquet, '
+                            'or both for markdown,json (default: both)',
                        default='both')
     
     parser.add_argument('--verbose', '-v',
@@ -71,6 +139,102 @@ def setup_output_directory(output_dir: str):
         os.makedirs(output_dir)
         logger.info(f"Created output directory: {output_dir}")
 
+def parse_sweep_thresholds(args) -> dict:
+    """Thresholds to sweep per similarity type from the --sweep-*-thresholds options."""
+    thresholds = {}
+    for similarity_type, value in (('name', args.sweep_name_thresholds),
+                                   ('schema', args.sweep_schema_thresholds),
+                                   ('description', args.sweep_content_thresholds)):
+        if not value:
+            continue
+        values = [float(threshold) for threshold in value.split(',') if threshold.strip()]
+        if not values or any(not 0 <= threshold <= 1 for threshold in values):
+            raise ValueError(f"{similarity_type} sweep thresholds must be between 0 and 1: {value}")
+        thresholds[similarity_type] = values
+    return thresholds
+
+def run_sweep(args, config, detector, thresholds: dict, assets) -> bool:
+    """Sweep thresholds in one scoring pass per stage and report finding counts per threshold."""
+    if config.signature_store_path:
+        logger.info("Threshold sweeps always score the full catalog; the signature store is not used")
+    logger.info(f"Sweeping thresholds: {thresholds}")
+    results = detector.sweep_duplicates(config.entity_types, thresholds, assets)
+    
+    print("\n" + "="*60)
+    print("THRESHOLD SWEEP")
+    print("="*60)
+    for similarity_type, rows in results.items():
+        print(f"\n{similarity_type.title()} similarity")
+        print(f"  {'Threshold':>9}  {'Pairs':>9}  {'Findings':>8}  {'Assets':>8}  {'Largest':>7}  "
+              f"{'High':>6}  {'Medium':>6}  {'Low':>6}")
+        for row in rows:
+            confidence = row['confidence']
+            print(f"  {row['threshold']:>9.3f}  {row['pairs']:>9}  {row['findings']:>8}  "
+                  f"{row['clustered_assets']:>8}  {row['largest_cluster']:>7}  "
+                  f"{confidence['high']:>6}  {confidence['medium']:>6}  {confidence['low']:>6}")
+    
+    if args.dry_run:
+        logger.info("Dry run mode - no reports generated")
+        return True
+    setup_output_directory(args.output_dir)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    sweep_file = os.path.join(args.output_dir, f"threshold_sweep_{timestamp}.json")
+    with open(sweep_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    prometheus_file = os.path.join(args.output_dir, "duplicate_metrics.prom")
+    summary_file = os.path.join(args.output_dir, f"duplicate_metrics_{timestamp}.json")
+    detector.metrics.write_prometheus(prometheus_file)
+    detector.metrics.write_json(summary_file)
+    logger.info(f"Threshold sweep written to: {sweep_file}")
+    logger.info(f"Stage metrics written to: {prometheus_file}, {summary_file}")
+    return True
+
+def run_estimate(args, config, detector, assets) -> bool:
+    """Estimate duplicate counts per platform/type from a sample and report them with intervals."""
+    if config.signature_store_path:
+        logger.info("Estimates always sample the full catalog; the signature store is not used")
+    detector.config.estimate_sample_size = args.estimate_sample_size
+    detector.config.estimate_confidence = args.estimate_confidence
+    logger.info(f"Estimating from up to {args.estimate_sample_size} assets per platform/type "
+                f"at {args.estimate_confidence:.0%} confidence")
+    results = detector.estimate_duplicates(config.entity_types, config.detection_types, assets)
+    
+    print("\n" + "="*60)
+    print(f"DUPLICATE ESTIMATE ({args.estimate_confidence:.0%} intervals)")
+    print("="*60)
+    for similarity_type, estimates in results.items():
+        exact = " (counted on every asset)" if estimates[-1].exact else ""
+        print(f"\n{similarity_type.title()} similarity{exact}")
+        print(f"  {'Platform/type':<28}  {'Assets':>8}  {'Sampled':>7}  {'Clusters':>8}  {'Interval':>17}  "
+              f"{'Duplicated':>10}  {'Interval':>17}")
+        for estimate in estimates:
+            clusters_low, clusters_high = estimate.clusters_interval
+            duplicated_low, duplicated_high = estimate.duplicated_assets_interval
+            print(f"  {estimate.stratum:<28}  {estimate.assets:>8}  {estimate.sampled:>7}  "
+                  f"{estimate.clusters:>8.0f}  {f'{clusters_low:.0f}-{clusters_high:.0f}':>17}  "
+                  f"{estimate.duplicated_assets:>10.0f}  {f'{duplicated_low:.0f}-{duplicated_high:.0f}':>17}")
+    
+    if args.dry_run:
+        logger.info("Dry run mode - no reports generated")
+        return True
+    setup_output_directory(args.output_dir)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    estimate_file = os.path.join(args.output_dir, f"duplicate_estimate_{timestamp}.json")
+    with open(estimate_file, 'w') as f:
+        json.dump({
+            'sample_size': args.estimate_sample_size,
+            'confidence': args.estimate_confidence,
+            'estimates': {similarity_type: [estimate.to_dict() for estimate in estimates]
+                          for similarity_type, estimates in results.items()}
+        }, f, indent=2)
+    prometheus_file = os.path.join(args.output_dir, "duplicate_metrics.prom")
+    summary_file = os.path.join(args.output_dir, f"duplicate_metrics_{timestamp}.json")
+    detector.metrics.write_prometheus(prometheus_file)
+    detector.metrics.write_json(summary_file)
+    logger.info(f"Duplicate estimate written to: {estimate_file}")
+    logger.info(f"Stage metrics written to: {prometheus_file}, {summary_file}")
+    return True
+
 def run_detection(args):
     """Run the duplicate detection process."""
     try:
@@ -82,10 +246,35 @@ def run_detection(args):
         config.detection_types = [t.strip() for t in args.detection_types.split(',')]
         config.name_similarity_threshold = args.name_threshold
         config.schema_similarity_threshold = args.schema_threshold
+        config.content_similarity_threshold = args.content_threshold
         config.min_assets_for_duplicate = args.min_assets
+        if args.workers is not None:
+            config.workers = args.workers
+        if args.store is not None:
+            config.signature_store_path = args.store
+        if args.snapshot is not None:
+            config.snapshot_path = args.snapshot
+        if args.external_blocking:
+            config.external_blocking = True
+        if args.spill_dir is not None:
+            config.spill_dir = args.spill_dir
         
         # Validate configuration
         errors = config.validate()
+        if config.snapshot_path and args.capture_snapshot:
+            errors.append("--capture-snapshot needs a live scan and cannot be combined with a snapshot")
+        if args.estimate_sample_size < 1:
+            errors.append("--estimate-sample-size must be at least 1")
+        if not 0 < args.estimate_confidence < 1:
+            errors.append("--estimate-confidence must be between 0 and 1")
+        try:
+            sweep_thresholds = parse_sweep_thresholds(args)
+        except ValueError as e:
+            errors.append(str(e))
+        if args.estimate and sweep_thresholds:
+            errors.append("--estimate cannot be combined with threshold sweeps")
+        if config.external_blocking and (args.estimate or sweep_thresholds):
+            errors.append("--external-blocking only applies to detection runs, not to estimates or sweeps")
         if errors:
             logger.error("Configuration errors:")
             for error in errors:
@@ -98,61 +287,114 @@ def run_detection(args):
         # Override detector config
         detector.config.name_similarity_threshold = config.name_similarity_threshold
         detector.config.schema_similarity_threshold = config.schema_similarity_threshold
+        detector.config.content_similarity_threshold = config.content_similarity_threshold
         detector.config.min_assets_for_duplicate = config.min_assets_for_duplicate
+        detector.config.page_size = config.page_size
+        detector.config.fetch_workers = config.fetch_workers
+        detector.config.fetch_retries = config.fetch_retries
+        detector.config.workers = config.workers
+        detector.config.lineage_include_downstream = config.lineage_include_downstream
         
         logger.info("Starting duplicate detection...")
         logger.info(f"Entity types: {config.entity_types}")
         logger.info(f"Detection types: {config.detection_types}")
         logger.info(f"Name similarity threshold: {config.name_similarity_threshold}")
         logger.info(f"Schema similarity threshold: {config.schema_similarity_threshold}")
+        logger.info(f"Description similarity threshold: {config.content_similarity_threshold}")
         logger.info(f"Minimum assets for duplicate: {config.min_assets_for_duplicate}")
+        logger.info(f"Detection workers: {config.workers}")
+        if config.snapshot_path:
+            logger.info(f"Offline mode reading snapshot: {config.snapshot_path}")
+        
+        assets = None
+        if config.snapshot_path:
+            assets = detector.iter_snapshot_assets(config.snapshot_path, config.entity_types)
+        elif args.capture_snapshot:
+            logger.info(f"Capturing scanned assets to snapshot: {args.capture_snapshot}")
+            assets = SnapshotWriter(args.capture_snapshot).capture(detector.iter_assets(config.entity_types))
         
-        # Run detection
-        findings = detector.detect_duplicates(config.entity_types, config.detection_types)
+        if sweep_thresholds:
+            return run_sweep(args, config, detector, sweep_thresholds, assets)
+        if args.estimate:
+            return run_estimate(args, config, detector, assets)
         
-        logger.info(f"Detection completed. Found {len(findings)} duplicate groups.")
+        # Output formats; findings are written as the detectors produce them
+        formats = []
+        for output_format in args.format.split(','):
+            output_format = output_format.strip()
+            for name in (['markdown', 'json'] if output_format == 'both' else [output_format]):
+                if name not in WRITER_FORMATS:
+                    logger.error(f"Unknown output format: {name} (choose from {', '.join(WRITER_FORMATS)} or both)")
+                    return False
+                if name not in formats:
+                    formats.append(name)
         
+        writers = []
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         if args.dry_run:
             logger.info("Dry run mode - no reports generated")
-            return True
+        else:
+            setup_output_directory(args.output_dir)
+            writers = open_writers(formats, args.output_dir, timestamp)
         
-        # Generate reports
-        setup_output_directory(args.output_dir)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Run detection, keeping only summary counts and the first findings in memory
+        by_type = {}
+        by_confidence = {}
+        top_findings = []
+        total_findings = 0
+        store = SignatureStore(config.signature_store_path) if config.signature_store_path else None
+        if store is not None:
+            logger.info(f"Incremental mode using signature store: {config.signature_store_path}")
+        if config.external_blocking:
+            logger.info("Disk-backed mode comparing one block of records at a time")
+            findings = detector.iter_duplicates_external(config.entity_types, config.detection_types, assets,
+                                                         config.spill_dir or None)
+        else:
+            findings = detector.iter_duplicates(config.entity_types, config.detection_types, store, assets)
+        try:
+            for finding in findings:
+                for writer in writers:
+                    writer.write(finding)
+                total_findings += 1
+                by_type[finding.similarity_type] = by_type.get(finding.similarity_type, 0) + 1
+                by_confidence[finding.confidence] = by_confidence.get(finding.confidence, 0) + 1
+                if len(top_findings) < 5:
+                    top_findings.append(finding)
+        finally:
+            for writer in writers:
+                writer.close()
+            if store is not None:
+                store.close()
         
-        if args.format in ['markdown', 'both']:
-            report_file = os.path.join(args.output_dir, f"duplicate_report_{timestamp}.md")
-            detector.generate_report(findings, report_file)
-            logger.info(f"Markdown report saved to: {report_file}")
+        logger.info(f"Detection completed. Found {total_findings} duplicate groups.")
+        for writer in writers:
+            logger.info(f"{type(writer).__name__} wrote {writer.count} findings to: {writer.path}")
         
-        if args.format in ['json', 'both']:
-            json_file = os.path.join(args.output_dir, f"duplicate_findings_{timestamp}.json")
-            detector.export_findings_json(findings, json_file)
-            logger.info(f"JSON report saved to: {json_file}")
+        # Stage metrics: a fixed-name Prometheus textfile for the node_exporter
+        # textfile collector, and a JSON summary per run
+        if not args.dry_run:
+            prometheus_file = os.path.join(args.output_dir, "duplicate_metrics.prom")
+            summary_file = os.path.join(args.output_dir, f"duplicate_metrics_{timestamp}.json")
+            detector.metrics.write_prometheus(prometheus_file)
+            detector.metrics.write_json(summary_file)
+            logger.info(f"Stage metrics written to: {prometheus_file}, {summary_file}")
         
         # Print summary
-        if findings:
+        if total_findings:
             print("\n" + "="*60)
             print("DUPLICATE DETECTION SUMMARY")
             print("="*60)
             
-            by_type = {}
-            by_confidence = {}
-            
-            for finding in findings:
-                by_type[finding.similarity_type] = by_type.get(finding.similarity_type, 0) + 1
-                by_confidence[finding.confidence] = by_confidence.get(finding.confidence, 0) + 1
-            
-            print(f"Total duplicate groups found: {len(findings)}")
+            print(f"Total duplicate groups found: {total_findings}")
             print(f"By type: {by_type}")
             print(f"By confidence: {by_confidence}")
             
             # Show top findings
             print("\nTop findings:")
-            for i, finding in enumerate(findings[:5], 1):
-                primary_info = detector.extract_asset_info(finding.primary_asset)
+            for i, finding in enumerate(top_findings, 1):
+                primary = finding.primary_asset
                 print(f"  {i}. {finding.similarity_type.title()} - {finding.confidence.upper()} confidence")
-                print(f"     Primary: {primary_info['name']} ({primary_info['type']})")
+                print(f"     Primary: {primary.name} ({primary.type})")
                 print(f"     Duplicates: {len(finding.duplicate_assets)}")
                 print(f"     Similarity: {finding.similarity_score:.2%}")
                 print()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Sample-based duplicate estimates for the DataHub Duplicate Detector
+
+Instead of anchoring on every asset, a stage anchors only on a random sample
+of each platform/type stratum and compares those anchors against every asset
+they could match. Each sampled anchor then tells whether it is duplicated
+(it has at least min_assets - 1 matches) and, counting itself and its
+matches as its cluster, what share of one cluster it is. Scaling the sample
+means up to the stratum size estimates the number of duplicated assets and
+of duplicate clusters, with intervals from the sampling error.
+"""
+
+import math
+from dataclasses import asdict, dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Share of an asset in its cluster assumed when a stratum's sample has no duplicates
+_UNOBSERVED_CLUSTER_SHARE = 0.5
+
+@dataclass
+class StratumEstimate:
+    """Estimated duplication of one stage in one stratum, or of a whole stage."""
+    stratum: str
+    assets: int
+    sampled: int
+    duplicated_assets: float
+    duplicated_assets_interval: Tuple[float, float]
+    clusters: float
+    clusters_interval: Tuple[float, float]
+    # Counted on every asset, not estimated
+    exact: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def z_score(confidence: float) -> float:
+    """Two-sided standard normal quantile of a confidence level, e.g. 1.96 for 0.95."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+def wilson_interval(successes: int, sampled: int, population: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval of a proportion, sampled without replacement from a finite population.
+    
+    The finite population correction is applied by widening the sample to the
+    effective size sampled / (1 - sampled / population); a full census gives
+    the observed proportion exactly.
+    """
+    if sampled == 0:
+        return (0.0, 1.0)
+    proportion = successes / sampled
+    remaining = 1 - sampled / population if population > 1 else 0.0
+    if remaining <= 0:
+        return (proportion, proportion)
+    n = sampled / remaining
+    centre = (proportion + z * z / (2 * n)) / (1 + z * z / n)
+    half_width = z * math.sqrt(proportion * (1 - proportion) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return (max(0.0, centre - half_width), min(1.0, centre + half_width))
+
+def estimate_stratum(stratum: str, population: int, match_counts: Sequence[int],
+                     min_assets: int, z: float) -> StratumEstimate:
+    """Estimate a stratum's duplication from the match counts of its sampled anchors.
+    
+    The duplicated-asset interval is a Wilson interval; the cluster interval
+    scales it by the observed clusters per duplicated asset (one half when
+    the sample found no duplicates). Counting only an anchor's direct
+    matches as its cluster understates the size of chained clusters, so
+    cluster estimates lean high.
+    """
+    sampled = len(match_counts)
+    duplicated = [count for count in match_counts if count + 1 >= min_assets]
+    if not sampled:
+        return StratumEstimate(stratum, population, 0, 0.0, (0.0, float(population)),
+                               0.0, (0.0, population * _UNOBSERVED_CLUSTER_SHARE))
+    share = sum(1 / (count + 1) for count in duplicated) / len(duplicated) if duplicated \
+        else _UNOBSERVED_CLUSTER_SHARE
+    low, high = wilson_interval(len(duplicated), sampled, population, z)
+    duplicated_assets = population * len(duplicated) / sampled
+    return StratumEstimate(
+        stratum=stratum,
+        assets=population,
+        sampled=sampled,
+        duplicated_assets=duplicated_assets,
+        duplicated_assets_interval=(population * low, population * high),
+        clusters=duplicated_assets * share,
+        clusters_interval=(population * low * share, population * high * share),
+        exact=sampled == population
+    )
+
+def exact_stratum(stratum: str, population: int, duplicated_assets: int, clusters: float) -> StratumEstimate:
+    """A stratum counted on every asset, with zero-width intervals."""
+    return StratumEstimate(stratum, population, population, float(duplicated_assets),
+                           (float(duplicated_assets), float(duplicated_assets)),
+                           clusters, (clusters, clusters), exact=True)
+
+def _combined_interval(estimates: Iterable[Tuple[float, Tuple[float, float]]]) -> Tuple[float, Tuple[float, float]]:
+    """Sum of independent estimates; each side's half-widths are added in quadrature."""
+    total, below, above = 0.0, 0.0, 0.0
+    for value, (low, high) in estimates:
+        total += value
+        below += (value - low) ** 2
+        above += (high - value) ** 2
+    return total, (max(0.0, total - math.sqrt(below)), total + math.sqrt(above))
+
+def total_estimate(label: str, strata: List[StratumEstimate]) -> StratumEstimate:
+    """Combine the strata of one stage (sampled independently) into a stage total."""
+    duplicated, duplicated_interval = _combined_interval(
+        (stratum.duplicated_assets, stratum.duplicated_assets_interval) for stratum in strata)
+    clusters, clusters_interval = _combined_interval(
+        (stratum.clusters, stratum.clusters_interval) for stratum in strata)
+    return StratumEstimate(
+        stratum=label,
+        assets=sum(stratum.assets for stratum in strata),
+        sampled=sum(stratum.sampled for stratum in strata),
+        duplicated_assets=duplicated,
+        duplicated_assets_interval=duplicated_interval,
+        clusters=clusters,
+        clusters_interval=clusters_interval,
+        exact=all(stratum.exact for stratum in strata)
+    )
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Inverted index and sparse-matrix Jaccard similarity over dataset schemas
+"""
+
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from sparse_pairs import pair_products
+
+
+class SchemaTokenIndex:
+    """Integer-coded schema tokens with an inverted index from token to datasets.
+    
+    Each distinct token (a (fieldPath, type) pair) gets an integer ID, ordered
+    from rarest to most common. Row i of ``matrix`` is the token set of dataset
+    i, and ``postings`` (its column-major transpose) lists the datasets holding
+    each token.
+    """
+    
+    def __init__(self, token_sets: Sequence[Iterable[Hashable]]):
+        # First pass: provisional IDs and document frequencies
+        provisional: Dict[Hashable, int] = {}
+        rows = []
+        for tokens in token_sets:
+            rows.append({provisional.setdefault(token, len(provisional)) for token in tokens})
+        frequencies = np.zeros(len(provisional), dtype=np.int64)
+        for ids in rows:
+            frequencies[list(ids)] += 1
+        
+        # Renumber so that rarer tokens get smaller IDs (needed for prefix filtering)
+        rank = np.empty(len(provisional), dtype=np.int64)
+        rank[np.argsort(frequencies, kind='stable')] = np.arange(len(provisional))
+        self.vocabulary = {token: int(rank[token_id]) for token, token_id in provisional.items()}
+        self.frequencies = np.sort(frequencies, kind='stable')
+        
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(ids) for ids in rows])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        for row, ids in enumerate(rows):
+            indices[indptr[row]:indptr[row + 1]] = np.sort(rank[list(ids)])
+        data = np.ones(len(indices), dtype=np.int32)
+        self.matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(provisional)))
+        self.sizes = np.diff(indptr)
+        self.postings = self.matrix.tocsc()
+    
+    def datasets_with_token(self, token: Hashable) -> np.ndarray:
+        """Return the row numbers of the datasets holding a token."""
+        token_id = self.vocabulary.get(token)
+        if token_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self.postings.indices[self.postings.indptr[token_id]:self.postings.indptr[token_id + 1]]
+    
+    def _prefix_matrix(self, threshold: float) -> sparse.csr_matrix:
+        """Keep only each row's rarest tokens that any pair above threshold must share.
+        
+        With tokens ordered rarest first, two sets with Jaccard >= t always
+        share a token within their first |A| - ceil(t * |A|) + 1 tokens.
+        """
+        prefix_lengths = self.sizes - np.ceil(threshold * self.sizes - 1e-9).astype(np.int64) + 1
+        prefix_lengths = np.minimum(np.maximum(prefix_lengths, 0), self.sizes)
+        keep = np.arange(len(self.matrix.indices)) - np.repeat(self.matrix.indptr[:-1], self.sizes)
+        keep = keep < np.repeat(prefix_lengths, self.sizes)
+        indptr = np.zeros(len(self.sizes) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(prefix_lengths)
+        return sparse.csr_matrix(
+            (self.matrix.data[keep], self.matrix.indices[keep], indptr), shape=self.matrix.shape
+        )
+    
+    def similar_pairs(self, threshold: float, block_size: int = 4096, row_start: int = 0,
+                      row_end: Optional[int] = None, stats: Optional[Dict[str, int]] = None
+                      ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """Yield (i, js, scores) for every row i with later rows at Jaccard >= threshold.
+        
+        Candidate pairs come from a prefix-filtered sparse product, so only rows
+        sharing one of their rarest tokens are considered. Intersections for all
+        candidates of a block of rows are then computed in one sparse product.
+        Rows are yielded in ascending order, each with its matches sorted by row;
+        ``row_start`` and ``row_end`` restrict the anchor rows considered. The
+        number of candidate pairs scored is added to ``stats['scored_pairs']``.
+        """
+        threshold = max(threshold, 1e-9)
+        prefixes = self._prefix_matrix(threshold)
+        prefixes_t = prefixes.T.tocsr()
+        
+        row_end = len(self.sizes) if row_end is None else min(row_end, len(self.sizes))
+        for block_start in range(row_start, row_end, block_size):
+            block_end = min(block_start + block_size, row_end)
+            candidates = (prefixes[block_start:block_end] @ prefixes_t).tocoo()
+            rows = candidates.row.astype(np.int64) + block_start
+            cols = candidates.col.astype(np.int64)
+            
+            # Only later rows whose sizes allow the threshold to be reached
+            size_rows, size_cols = self.sizes[rows], self.sizes[cols]
+            keep = (cols > rows) & (size_cols >= threshold * size_rows) & (size_rows >= threshold * size_cols)
+            rows, cols = rows[keep], cols[keep]
+            if not len(rows):
+                continue
+            
+            order = np.lexsort((cols, rows))
+            rows, cols = rows[order], cols[order]
+            intersections = pair_products(self.matrix, rows, cols, stats)
+            scores = intersections / (self.sizes[rows] + self.sizes[cols] - intersections)
+            
+            matched = scores >= threshold
+            rows, cols, scores = rows[matched], cols[matched], scores[matched]
+            boundaries = np.flatnonzero(np.diff(rows)) + 1
+            for row_rows, row_cols, row_scores in zip(np.split(rows, boundaries), np.split(cols, boundaries),
+                                                      np.split(scores, boundaries)):
+                if len(row_rows):
+                    yield int(row_rows[0]), row_cols, row_scores
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Sharded duplicate detection for the DataHub Duplicate Detector
+
+Splits one snapshot's detection across independent workers, which can run
+as local processes or on separate nodes sharing the plan directory:
+
+    python shard_detector.py plan --snapshot catalog.jsonl --shards 8 --plan-dir ./shards
+    python shard_detector.py work --plan-dir ./shards --shard 3       # on each node, one shard each
+    python shard_detector.py work --plan-dir ./shards --processes 4   # or every shard locally
+    python shard_detector.py merge --plan-dir ./shards --output-dir ./reports
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from dotenv import load_dotenv
+from duplicate_detector import DataHubDuplicateDetector, DetectionConfig
+from report_writers import WRITER_FORMATS, open_writers
+from sharding import ShardPlan, read_pairs, write_pairs
+from signature_store import SignatureStore
+from config import get_config
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='DataHub Sharded Duplicate Detection')
+    parser.add_argument('--plan-dir', default='./shards',
+                        help='Directory holding the plan, shard files and pair files (default: ./shards)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Enable verbose logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    plan = commands.add_parser('plan', help='Partition a snapshot into shard files')
+    plan.add_argument('--snapshot',
+                      help='Snapshot to partition (default: SNAPSHOT_PATH)')
+    plan.add_argument('--shards', type=int, required=True,
+                      help='Number of shard files')
+    plan.add_argument('--entity-types',
+                      default='dataset,chart,dashboard,dataFlow,dataJob',
+                      help='Comma-separated list of entity types to analyze')
+    plan.add_argument('--detection-types',
+                      default='name,schema,description',
+                      help='Comma-separated list of detection types')
+    plan.add_argument('--name-threshold', type=float, default=0.8,
+                      help='Name similarity threshold (0-1)')
+    plan.add_argument('--schema-threshold', type=float, default=0.7,
+                      help='Schema similarity threshold (0-1)')
+    plan.add_argument('--content-threshold', type=float, default=0.9,
+                      help='Description similarity threshold (0-1)')
+    plan.add_argument('--min-assets', type=int, default=2,
+                      help='Minimum number of assets to consider as duplicates')
+    plan.add_argument('--split-block-size', type=int, default=20000,
+                      help='Blocks with more assets are spread over all shards (default: 20000)')
+    
+    work = commands.add_parser('work', help='Score the pairs of one or more shards')
+    work.add_argument('--shard', type=int, action='append',
+                      help='Shard to score; repeat for several (default: every shard without a pair file)')
+    work.add_argument('--processes', type=int, default=1,
+                      help='Shards scored at once, each in its own process (default: 1)')
+    work.add_argument('--workers', type=int, default=None,
+                      help='Worker processes each shard uses for detection (default: as planned)')
+    
+    merge = commands.add_parser('merge', help='Cluster the pairs of every shard and write the reports')
+    merge.add_argument('--snapshot',
+                       help='Snapshot the plan was made from, if it has moved (default: as planned)')
+    merge.add_argument('--output-dir', default='./reports',
+                       help='Output directory for reports (default: ./reports)')
+    merge.add_argument('--format', default='both',
+                       help='Comma-separated output formats: markdown, json, jsonl, parquet, '
+                            'or both for markdown,json (default: both)')
+    
+    return parser.parse_args()
+
+def create_detector(config: DetectionConfig = None) -> DataHubDuplicateDetector:
+    """Offline detector, with the detection settings of a plan when given."""
+    detector = DataHubDuplicateDetector(get_config().datahub_gms_url, '')
+    if config is not None:
+        detector.config = config
+    return detector
+
+def plan_shards(args) -> bool:
+    """Partition the snapshot and write the plan."""
+    snapshot_path = args.snapshot or get_config().snapshot_path
+    if not snapshot_path or not os.path.isfile(snapshot_path):
+        logger.error("plan needs an existing snapshot: pass --snapshot or set SNAPSHOT_PATH")
+        return False
+    if args.shards < 1 or args.split_block_size < 1:
+        logger.error("--shards and --split-block-size must be at least 1")
+        return False
+    detector = create_detector()
+    detector.config.name_similarity_threshold = args.name_threshold
+    detector.config.schema_similarity_threshold = args.schema_threshold
+    detector.config.content_similarity_threshold = args.content_threshold
+    detector.config.min_assets_for_duplicate = args.min_assets
+    detector.config.case_sensitive = get_config().case_sensitive
+    detector.config.lineage_include_downstream = get_config().lineage_include_downstream
+    detector.plan_shards(
+        snapshot_path, args.plan_dir, args.shards,
+        [t.strip() for t in args.entity_types.split(',')],
+        [t.strip() for t in args.detection_types.split(',')],
+        args.split_block_size
+    )
+    return True
+
+def score_shard(plan_dir: str, shard: int, workers: int = None) -> int:
+    """Score one shard's pairs into its pair file; returns the number of pairs."""
+    plan = ShardPlan.load(plan_dir)
+    detector = create_detector(DetectionConfig(**plan.config))
+    if workers is not None:
+        detector.config.workers = workers
+    logger.info(f"Scoring shard {shard} of {plan.shard_count}")
+    assets = detector.iter_snapshot_assets(plan.shard_path(shard), plan.entity_types)
+    count = write_pairs(plan.pairs_path(shard), detector.shard_pairs(assets, plan.detection_types))
+    logger.info(f"Wrote {count} pairs to {plan.pairs_path(shard)}")
+    return count
+
+def work_shards(args) -> bool:
+    """Score the requested shards, in parallel processes when asked to."""
+    plan = ShardPlan.load(args.plan_dir)
+    shards = args.shard if args.shard is not None else plan.missing_pairs()
+    invalid = [shard for shard in shards if not 0 <= shard < plan.shard_count]
+    if invalid:
+        logger.error(f"No such shards: {invalid} (the plan has {plan.shard_count})")
+        return False
+    if args.processes <= 1 or len(shards) <= 1:
+        for shard in shards:
+            score_shard(args.plan_dir, shard, args.workers)
+        return True
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        list(pool.map(score_shard, [args.plan_dir] * len(shards), shards, [args.workers] * len(shards)))
+    return True
+
+def merge_shards(args) -> bool:
+    """Merge the pairs of every shard into findings and write the standard reports."""
+    plan = ShardPlan.load(args.plan_dir)
+    missing = plan.missing_pairs()
+    if missing:
+        logger.error(f"Shards without a pair file yet: {missing}")
+        return False
+    
+    formats = []
+    for output_format in args.format.split(','):
+        output_format = output_format.strip()
+        for name in (['markdown', 'json'] if output_format == 'both' else [output_format]):
+            if name not in WRITER_FORMATS:
+                logger.error(f"Unknown output format: {name} (choose from {', '.join(WRITER_FORMATS)} or both)")
+                return False
+            if name not in formats:
+                formats.append(name)
+    
+    detector = create_detector(DetectionConfig(**plan.config))
+    snapshot_path = args.snapshot or plan.snapshot_path
+    with tempfile.TemporaryDirectory(prefix='duplicate_merge_') as directory:
+        store = SignatureStore(os.path.join(directory, 'pairs.db'))
+        try:
+            for shard in range(plan.shard_count):
+                by_type = {}
+                for similarity_type, urn_a, urn_b, score in read_pairs(plan.pairs_path(shard)):
+                    by_type.setdefault(similarity_type, []).append((urn_a, urn_b, score))
+                for similarity_type, pairs in by_type.items():
+                    store.add_pairs(similarity_type, pairs)
+            store.commit()
+            
+            os.makedirs(args.output_dir, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            writers = open_writers(formats, args.output_dir, timestamp)
+            try:
+                assets = detector.iter_snapshot_assets(snapshot_path, plan.entity_types)
+                for finding in detector.iter_merged_duplicates(store, plan.detection_types, assets):
+                    for writer in writers:
+                        writer.write(finding)
+            finally:
+                for writer in writers:
+                    writer.close()
+        finally:
+            store.close()
+    
+    for writer in writers:
+        logger.info(f"{type(writer).__name__} wrote {writer.count} findings to: {writer.path}")
+    prometheus_file = os.path.join(args.output_dir, "duplicate_metrics.prom")
+    summary_file = os.path.join(args.output_dir, f"duplicate_metrics_{timestamp}.json")
+    detector.metrics.write_prometheus(prometheus_file)
+    detector.metrics.write_json(summary_file)
+    logger.info(f"Stage metrics written to: {prometheus_file}, {summary_file}")
+    return True
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    
+    commands = {'plan': plan_shards, 'work': work_shards, 'merge': merge_shards}
+    try:
+        success = commands[args.command](args)
+    except (OSError, ValueError) as e:
+        logger.error(f"Shard {args.command} failed: {str(e)}")
+        success = False
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Shard plans for multi-node duplicate detection
+
+A plan splits the work of the pairwise-scored stages of one snapshot into N
+shard files that independent workers score on their own:
+
+- every block a stage compares within (see block_key) is hashed to one
+  shard, where all of its assets are anchors
+- blocks larger than the plan's split size are spread instead: each asset
+  anchors in the shard its URN hashes to, and is copied to every other shard
+  as a comparison target, so every pair is scored where one of its assets
+  anchors
+
+Shard files are snapshots (JSON Lines search results) whose entities carry a
+``shardRoles`` map of stage -> "anchor" or "target". Workers write the pairs
+they score to one pair file per shard, and the merge step clusters the pairs
+of all shards over the whole snapshot.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the plan or pair file layout changes
+_PLAN_VERSION = '1'
+
+PLAN_FILE = 'shard_plan.json'
+
+# (similarity type, URN, URN, score)
+ShardPair = Tuple[str, str, str, float]
+
+def shard_of(key: str, shard_count: int) -> int:
+    """Shard a key hashes to; stable across processes and machines, unlike hash()."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+@dataclass
+class ShardPlan:
+    """Where the shard and pair files of one plan are, and what they were planned for."""
+    directory: str
+    snapshot_path: str
+    shard_count: int
+    entity_types: List[str]
+    detection_types: List[str]
+    # DetectionConfig the plan was made with; workers and the merge use it too
+    config: Dict[str, Any]
+    # Assets written to each shard file, anchors and targets
+    shard_assets: List[int] = field(default_factory=list)
+    # (stage, block key, assets) of every block spread over all shards
+    split_blocks: List[Tuple[str, str, int]] = field(default_factory=list)
+    
+    def shard_path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"shard_{shard:04d}.jsonl")
+    
+    def pairs_path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"pairs_{shard:04d}.jsonl")
+    
+    def missing_pairs(self) -> List[int]:
+        """Shards whose workers have not finished writing their pairs."""
+        return [shard for shard in range(self.shard_count) if not os.path.isfile(self.pairs_path(shard))]
+    
+    def save(self) -> None:
+        with open(os.path.join(self.directory, PLAN_FILE), 'w') as f:
+            json.dump({'version': _PLAN_VERSION, **asdict(self)}, f, indent=2)
+    
+    @classmethod
+    def load(cls, directory: str) -> 'ShardPlan':
+        """Read the plan of a plan directory; raises ValueError for a plan of another version."""
+        with open(os.path.join(directory, PLAN_FILE)) as f:
+            plan = json.load(f)
+        if plan.pop('version', None) != _PLAN_VERSION:
+            raise ValueError(f"Shard plan in {directory} was written by another version; plan again")
+        plan['directory'] = directory
+        plan['split_blocks'] = [tuple(block) for block in plan['split_blocks']]
+        return cls(**plan)
+
+def write_pairs(path: str, pairs: Iterable[ShardPair]) -> int:
+    """Write scored pairs as JSON Lines, publishing the file only once all are written."""
+    part_path = f"{path}.part"
+    count = 0
+    try:
+        with open(part_path, 'w') as f:
+            for pair in pairs:
+                f.write(json.dumps(pair))
+                f.write("\n")
+                count += 1
+    except BaseException:
+        os.remove(part_path)
+        raise
+    os.replace(part_path, path)
+    return count
+
+def read_pairs(path: str) -> Iterator[ShardPair]:
+    with open(path) as f:
+        for line in f:
+            similarity_type, urn_a, urn_b, score = json.loads(line)
+            yield similarity_type, urn_a, urn_b, score
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite store of asset signatures and pairwise matches for incremental runs
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import numpy as np
+from asset_records import AssetCatalog, AssetRecord
+
+logger = logging.getLogger(__name__)
+
+# (urn_a, urn_b, similarity score) with urn_a < urn_b
+StoredPair = Tuple[str, str, float]
+
+# Bumped whenever the tables change; older stores are dropped and rebuilt
+_STORE_VERSION = '4'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    urn TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    description TEXT NOT NULL,
+    normalized_name TEXT NOT NULL,
+    schema_fields TEXT NOT NULL,
+    description_indices BLOB,
+    description_counts BLOB,
+    name_signature BLOB,
+    lineage TEXT,
+    columns TEXT NOT NULL,
+    sql_signature BLOB
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    similarity_type TEXT NOT NULL,
+    urn_a TEXT NOT NULL,
+    urn_b TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (similarity_type, urn_a, urn_b)
+);
+CREATE INDEX IF NOT EXISTS pairs_by_urn_b ON pairs (similarity_type, urn_b);
+"""
+
+def content_hash(info: Dict[str, Any]) -> str:
+    """Return a stable digest of an asset's extracted fields."""
+    return hashlib.sha1(json.dumps(info, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+@dataclass
+class IncrementalRun:
+    """State shared by the detection stages of one incremental run."""
+    store: 'SignatureStore'
+    # URNs whose stored pairs are stale: new, changed and removed assets
+    changed: Set[str]
+    
+    def search_order(self, records: List[AssetRecord]) -> List[AssetRecord]:
+        """Put changed records first so that anchoring on them covers every pair they are in."""
+        return ([record for record in records if record.urn in self.changed] +
+                [record for record in records if record.urn not in self.changed])
+
+class SignatureStore:
+    """SQLite file holding each asset's content hash, precomputed signatures and matches.
+    
+    A store is tied to one detector configuration (thresholds, signature
+    settings, entity and detection types) through a fingerprint; when the
+    fingerprint changes, the store is emptied and the next run starts over.
+    Changes are only committed once a run has finished all of its stages.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+        self._upgrade()
+        self._connection.execute("CREATE TEMP TABLE stale_urns (urn TEXT PRIMARY KEY)")
+    
+    def __enter__(self) -> 'SignatureStore':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def commit(self) -> None:
+        self._connection.commit()
+    
+    def close(self) -> None:
+        self._connection.close()
+    
+    def _upgrade(self) -> None:
+        """Rebuild the tables of a store written by an older version of the detector."""
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] == _STORE_VERSION:
+            return
+        if row is not None or self._connection.execute("SELECT 1 FROM assets LIMIT 1").fetchone():
+            logger.info(f"Rebuilding signature store {self.path} for store version {_STORE_VERSION}")
+        self._connection.executescript("DROP TABLE assets; DROP TABLE pairs; DROP TABLE meta;")
+        self._connection.executescript(_SCHEMA)
+        self._connection.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (_STORE_VERSION,))
+        self._connection.commit()
+    
+    def use_fingerprint(self, fingerprint: str) -> bool:
+        """Bind the store to a configuration fingerprint; return False if it had to be reset."""
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is not None and row[0] == fingerprint:
+            return True
+        if row is not None:
+            logger.info(f"Detector configuration changed; resetting signature store {self.path}")
+        self._connection.execute("DELETE FROM assets")
+        self._connection.execute("DELETE FROM pairs")
+        self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        return False
+    
+    def content_hashes(self) -> Dict[str, str]:
+        """Return the stored content hash of every asset by URN."""
+        return dict(self._connection.execute("SELECT urn, content_hash FROM assets"))
+    
+    def load_records(self, urns: Set[str], catalog: AssetCatalog) -> Dict[str, AssetRecord]:
+        """Restore the stored records of the given URNs into a catalog's vocabulary."""
+        records = {}
+        for (urn, asset_type, name, platform, description, normalized_name, schema_fields,
+             description_indices, description_counts, name_signature, lineage, columns,
+             sql_signature) in self._connection.execute(
+                "SELECT urn, type, name, platform, description, normalized_name, schema_fields, "
+                "description_indices, description_counts, name_signature, lineage, columns, "
+                "sql_signature FROM assets"):
+            if urn not in urns:
+                continue
+            description_terms = None
+            if description_indices is not None:
+                description_terms = (np.frombuffer(description_indices, dtype=np.int32),
+                                     np.frombuffer(description_counts, dtype=np.float32))
+            records[urn] = catalog.restore(
+                urn=urn,
+                asset_type=asset_type,
+                name=name,
+                platform=platform,
+                description=description,
+                normalized_name=normalized_name,
+                schema_fields=[tuple(field) for field in json.loads(schema_fields)],
+                description_terms=description_terms,
+                name_signature=np.frombuffer(name_signature, dtype=np.uint32) if name_signature else None,
+                lineage=tuple(json.loads(lineage)) if lineage else None,
+                columns=[tuple(column) for column in json.loads(columns)],
+                sql_signature=np.frombuffer(sql_signature, dtype=np.uint32) if sql_signature else None
+            )
+        return records
+    
+    def save_records(self, records: Iterable[AssetRecord], hashes: Dict[str, str],
+                     catalog: AssetCatalog) -> None:
+        """Insert or replace new and changed records with their content hashes."""
+        fields_by_token = {token_id: field for field, token_id in catalog.schema_vocabulary.items()}
+        columns_by_token = {token_id: column for column, token_id in catalog.column_vocabulary.items()}
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    record.urn, hashes[record.urn], record.type, record.name, record.platform,
+                    record.description, record.normalized_name,
+                    json.dumps([fields_by_token[token_id] for token_id in record.schema_tokens.tolist()]),
+                    record.description_terms[0].tobytes() if record.description_terms is not None else None,
+                    record.description_terms[1].tobytes() if record.description_terms is not None else None,
+                    record.name_signature.tobytes() if record.name_signature is not None else None,
+                    json.dumps(record.lineage) if record.lineage is not None else None,
+                    json.dumps([columns_by_token[token_id] for token_id in record.column_tokens.tolist()]),
+                    record.sql_signature.tobytes() if record.sql_signature is not None else None
+                )
+                for record in records
+            )
+        )
+    
+    def delete_records(self, urns: Iterable[str]) -> None:
+        """Forget assets that are no longer in the catalog."""
+        self._connection.executemany("DELETE FROM assets WHERE urn = ?", ((urn,) for urn in urns))
+    
+    def add_pairs(self, similarity_type: str, pairs: Iterable[StoredPair]) -> None:
+        """Store scored pairs; a pair stored again (in either order) keeps its latest score."""
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?)",
+            ((similarity_type, min(urn_a, urn_b), max(urn_a, urn_b), score) for urn_a, urn_b, score in pairs)
+        )
+    
+    def set_pairs(self, similarity_type: str, pairs: Iterable[StoredPair]) -> None:
+        """Replace every stored pair of a similarity type."""
+        self._connection.execute("DELETE FROM pairs WHERE similarity_type = ?", (similarity_type,))
+        self.add_pairs(similarity_type, pairs)
+    
+    def replace_pairs(self, similarity_type: str, stale_urns: Set[str],
+                      pairs: Iterable[StoredPair]) -> List[StoredPair]:
+        """Drop pairs involving stale URNs, add freshly scored pairs and return all current pairs.
+        
+        Pairs between two unchanged assets are carried forward as stored.
+        """
+        connection = self._connection
+        connection.execute("DELETE FROM stale_urns")
+        connection.executemany("INSERT OR IGNORE INTO stale_urns VALUES (?)", ((urn,) for urn in stale_urns))
+        connection.execute(
+            "DELETE FROM pairs WHERE similarity_type = ? AND "
+            "(urn_a IN (SELECT urn FROM stale_urns) OR urn_b IN (SELECT urn FROM stale_urns))",
+            (similarity_type,)
+        )
+        self.add_pairs(similarity_type, pairs)
+        return list(connection.execute(
+            "SELECT urn_a, urn_b, score FROM pairs WHERE similarity_type = ?", (similarity_type,)
+        ))
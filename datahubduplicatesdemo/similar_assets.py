@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Similar-asset lookups for the DataHub Duplicate Detector
+
+Builds a persisted similarity index from one catalog scan (or snapshot) and
+answers "which assets are most like this URN?" from it, either once on the
+command line or over a small local HTTP endpoint:
+
+    python similar_assets.py build --index catalog_index.npz
+    python similar_assets.py query --index catalog_index.npz "urn:li:dataset:(...)" -k 5
+    python similar_assets.py serve --index catalog_index.npz --port 8765
+    curl "http://127.0.0.1:8765/similar?urn=urn:li:dataset:(...)&k=5"
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+from duplicate_detector import DataHubDuplicateDetector
+from similarity_index import SIGNALS, SimilarityIndex
+from config import get_config
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Largest k accepted over HTTP
+MAX_K = 1000
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='DataHub Similar Asset Lookup')
+    parser.add_argument('--index', default='similarity_index.npz',
+                        help='Similarity index file (default: similarity_index.npz)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Enable verbose logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    build = commands.add_parser('build', help='Scan the catalog (or read a snapshot) and write the index')
+    build.add_argument('--entity-types',
+                       default='dataset,chart,dashboard,dataFlow,dataJob',
+                       help='Comma-separated list of entity types to index')
+    build.add_argument('--snapshot',
+                       help='Build from a snapshot file instead of scanning DataHub')
+    
+    query = commands.add_parser('query', help='Print the assets most similar to one URN')
+    query.add_argument('urn', help='URN of the asset to look up')
+    query.add_argument('-k', type=int, default=10,
+                       help='Matches to return per signal (default: 10)')
+    query.add_argument('--signals', default=','.join(SIGNALS),
+                       help=f"Comma-separated signals to rank by (default: {','.join(SIGNALS)})")
+    query.add_argument('--json', action='store_true',
+                       help='Print the result as JSON')
+    
+    serve = commands.add_parser('serve', help='Answer lookups over HTTP: GET /similar?urn=...&k=...&signals=...')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='Address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8765,
+                       help='Port to listen on (default: 8765)')
+    
+    return parser.parse_args()
+
+def create_detector() -> DataHubDuplicateDetector:
+    """Detector configured from the environment, as run_detector.py sets it up."""
+    config = get_config()
+    detector = DataHubDuplicateDetector(config.datahub_gms_url, config.datahub_token)
+    detector.config.case_sensitive = config.case_sensitive
+    detector.config.page_size = config.page_size
+    detector.config.fetch_workers = config.fetch_workers
+    return detector
+
+def build_index(args) -> bool:
+    """Build and write the similarity index."""
+    detector = create_detector()
+    entity_types = [t.strip() for t in args.entity_types.split(',')]
+    snapshot_path = args.snapshot or get_config().snapshot_path
+    assets = None
+    if snapshot_path:
+        logger.info(f"Offline mode reading snapshot: {snapshot_path}")
+        assets = detector.iter_snapshot_assets(snapshot_path, entity_types)
+    detector.index_assets(entity_types, assets).save(args.index)
+    return True
+
+def print_result(result: dict) -> None:
+    """Print a lookup result as one table per signal."""
+    asset = result['asset']
+    print(f"\n{asset['name']} ({asset['platform']} {asset['type']})")
+    print(asset['urn'])
+    for signal, matches in result['matches'].items():
+        print(f"\nBy {signal}:")
+        if not matches:
+            print("  (no matches)")
+        for match in matches:
+            print(f"  {match['score']:.3f}  {match['name']} ({match['platform']})  {match['urn']}")
+
+def query_index(args) -> bool:
+    """Answer one lookup from the index."""
+    if args.k < 1:
+        logger.error("-k must be at least 1")
+        return False
+    signals = [s.strip() for s in args.signals.split(',') if s.strip()]
+    index = SimilarityIndex.load(args.index)
+    started = time.perf_counter()
+    try:
+        result = create_detector().similar_assets(index, args.urn, args.k, signals)
+    except KeyError:
+        logger.error(f"URN not in the similarity index: {args.urn}")
+        return False
+    logger.debug(f"Lookup took {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_result(result)
+    return True
+
+def make_handler(detector: DataHubDuplicateDetector, index: SimilarityIndex):
+    """Request handler class answering GET /similar from one loaded index."""
+    class SimilarAssetsHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/similar':
+                self._send_json(404, {'error': f"Unknown path: {url.path}; use /similar?urn=..."})
+                return
+            params = parse_qs(url.query)
+            urn = (params.get('urn') or [''])[0]
+            try:
+                k = int((params.get('k') or ['10'])[0])
+                if not 1 <= k <= MAX_K:
+                    raise ValueError
+            except ValueError:
+                self._send_json(400, {'error': f"k must be an integer between 1 and {MAX_K}"})
+                return
+            signals = [s for s in (params.get('signals') or [','.join(SIGNALS)])[0].split(',') if s]
+            if not urn:
+                self._send_json(400, {'error': "Missing urn parameter"})
+                return
+            started = time.perf_counter()
+            try:
+                result = detector.similar_assets(index, urn, k, signals)
+            except KeyError:
+                self._send_json(404, {'error': f"URN not in the similarity index: {urn}"})
+                return
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            self._send_json(200, result)
+        
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+    
+    return SimilarAssetsHandler
+
+def serve_index(args) -> bool:
+    """Serve lookups over HTTP until interrupted."""
+    index = SimilarityIndex.load(args.index)
+    logger.info(f"Loaded similarity index of {len(index)} assets from {args.index}")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(create_detector(), index))
+    logger.info(f"Serving similar-asset lookups on http://{args.host}:{args.port}/similar?urn=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return True
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    
+    commands = {'build': build_index, 'query': query_index, 'serve': serve_index}
+    try:
+        success = commands[args.command](args)
+    except (OSError, ValueError) as e:
+        logger.error(f"Similar-asset {args.command} failed: {str(e)}")
+        success = False
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Persisted top-K similarity index for single-asset lookups
+
+The batch detector compares the whole catalog at once. To answer "is this
+asset a duplicate of anything?" for one URN, the index keeps what the name,
+schema and description stages score, precomputed for every asset:
+
+- name MinHash signatures, whose agreement with the looked-up asset ranks
+  candidates that are then rescored with the exact name similarity
+- schema token rows and their postings, so a lookup only touches datasets
+  sharing a field with the looked-up one
+- TF-IDF description rows (weighted per type, as in the description stage)
+  and their postings
+
+Everything is stored in one uncompressed .npz file that loads without
+pickling; a lookup is a few vectorized products and a top-K selection.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from scipy import sparse
+from asset_records import AssetRecord
+from text_vectors import HashedTfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the stored arrays change; older index files must be rebuilt
+_INDEX_VERSION = '1'
+
+SIGNALS = ('name', 'schema', 'description')
+
+# Name candidates (by MinHash agreement) rescored exactly per lookup, at least
+_NAME_CANDIDATES = 200
+
+def _csr_arrays(prefix: str, matrix: sparse.csr_matrix) -> Dict[str, np.ndarray]:
+    return {
+        f'{prefix}_data': matrix.data,
+        f'{prefix}_indices': matrix.indices,
+        f'{prefix}_indptr': matrix.indptr,
+        f'{prefix}_shape': np.array(matrix.shape, dtype=np.int64)
+    }
+
+def _load_csr(arrays, prefix: str) -> sparse.csr_matrix:
+    return sparse.csr_matrix(
+        (arrays[f'{prefix}_data'], arrays[f'{prefix}_indices'], arrays[f'{prefix}_indptr']),
+        shape=tuple(arrays[f'{prefix}_shape'])
+    )
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> List[tuple]:
+    """The k highest-scoring (row, score) pairs with a positive score, best first."""
+    keep = scores > 0
+    rows, scores = rows[keep], scores[keep]
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.lexsort((rows, -scores))
+    return list(zip(rows[order].tolist(), scores[order].tolist()))
+
+class SimilarityIndex:
+    """Name, schema and description signals of every asset of one scan, for top-K lookups.
+    
+    Row i of every matrix describes ``assets[i]`` (its URN, type, name and
+    platform); rows are looked up by URN. Schema rows are empty for
+    non-datasets and description rows for assets without a description. The
+    description postings are stored alongside the rows, since transposing a
+    matrix over all hashed features costs more than reading it.
+    """
+    
+    def __init__(self, assets: List[Dict[str, Any]], normalized_names: List[str],
+                 name_signatures: np.ndarray, schema_matrix: sparse.csr_matrix,
+                 description_matrix: sparse.csr_matrix, settings: Dict[str, Any],
+                 description_postings: Optional[sparse.csr_matrix] = None):
+        self.assets = assets
+        self.normalized_names = normalized_names
+        self.name_signatures = name_signatures
+        self.schema_matrix = schema_matrix
+        self.description_matrix = description_matrix
+        # Signature and vectorizer settings the index was built with
+        self.settings = settings
+        self.rows = {asset['urn']: row for row, asset in enumerate(assets)}
+        self.types = np.array([asset['type'] for asset in assets])
+        self.schema_sizes = np.diff(schema_matrix.indptr)
+        self._schema_postings = schema_matrix.T.tocsr()
+        if description_postings is None:
+            description_postings = description_matrix.T.tocsr()
+        self.description_postings = description_postings
+    
+    @classmethod
+    def build(cls, records: Sequence[AssetRecord], name_signatures: np.ndarray,
+              vectorizer: HashedTfidfVectorizer, settings: Dict[str, Any]) -> 'SimilarityIndex':
+        """Index records, given their name signatures (one row per record)."""
+        vocabulary_size = 1 + max((int(record.schema_tokens[-1]) for record in records
+                                   if len(record.schema_tokens)), default=-1)
+        indptr = np.zeros(len(records) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(record.schema_tokens) for record in records])
+        indices = (np.concatenate([record.schema_tokens for record in records])
+                   if records else np.empty(0, dtype=np.int32))
+        schema_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(records), vocabulary_size)
+        )
+        
+        # TF-IDF is weighted within each type, as the description stage does
+        by_type: Dict[str, List[int]] = {}
+        for row, record in enumerate(records):
+            if record.description_terms is not None:
+                by_type.setdefault(record.type, []).append(row)
+        blocks, block_rows = [], []
+        for rows in by_type.values():
+            blocks.append(vectorizer.transform_counts([records[row].description_terms for row in rows]))
+            block_rows.extend(rows)
+        description_matrix = sparse.csr_matrix((len(records), vectorizer.n_features), dtype=np.float32)
+        if blocks:
+            # Scatter the stacked type blocks back to record order; rows without a description stay empty
+            stacked = sparse.vstack(blocks, format='csr')
+            placement = sparse.csr_matrix(
+                (np.ones(len(block_rows), dtype=np.float32), (block_rows, np.arange(len(block_rows)))),
+                shape=(len(records), len(block_rows))
+            )
+            description_matrix = sparse.csr_matrix(placement @ stacked, dtype=np.float32)
+        
+        return cls(
+            assets=[{'urn': record.urn, 'type': record.type, 'name': record.name, 'platform': record.platform}
+                    for record in records],
+            normalized_names=[record.normalized_name for record in records],
+            name_signatures=np.asarray(name_signatures, dtype=np.uint32),
+            schema_matrix=schema_matrix,
+            description_matrix=description_matrix,
+            settings=settings
+        )
+    
+    def __len__(self) -> int:
+        return len(self.assets)
+    
+    def save(self, path: str) -> None:
+        """Write the index to an .npz file."""
+        metadata = {
+            'version': _INDEX_VERSION,
+            'settings': self.settings,
+            'assets': self.assets,
+            'normalized_names': self.normalized_names
+        }
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                metadata=np.frombuffer(json.dumps(metadata).encode('utf-8'), dtype=np.uint8),
+                name_signatures=self.name_signatures,
+                **_csr_arrays('schema', self.schema_matrix),
+                **_csr_arrays('description', self.description_matrix),
+                **_csr_arrays('description_postings', self.description_postings)
+            )
+        logger.info(f"Wrote similarity index of {len(self)} assets to {path}")
+    
+    @classmethod
+    def load(cls, path: str) -> 'SimilarityIndex':
+        """Read an index written by save; raises ValueError for an index of another version."""
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(arrays['metadata'].tobytes().decode('utf-8'))
+            if metadata.get('version') != _INDEX_VERSION:
+                raise ValueError(f"Similarity index {path} has version {metadata.get('version')}, "
+                                 f"expected {_INDEX_VERSION}; rebuild it")
+            return cls(
+                assets=metadata['assets'],
+                normalized_names=metadata['normalized_names'],
+                name_signatures=arrays['name_signatures'],
+                schema_matrix=_load_csr(arrays, 'schema'),
+                description_matrix=_load_csr(arrays, 'description'),
+                settings=metadata['settings'],
+                description_postings=_load_csr(arrays, 'description_postings')
+            )
+    
+    def _same_type(self, row: int) -> np.ndarray:
+        return self.types == self.types[row]
+    
+    def similar_names(self, row: int, k: int, name_similarity: Callable[[str, str], float]) -> List[tuple]:
+        """Top k same-type assets by name similarity to a row.
+        
+        Rows are ranked by the share of name signature values they agree on
+        (an estimate of n-gram Jaccard similarity), and the best candidates
+        are rescored with the exact name similarity.
+        """
+        agreement = (self.name_signatures == self.name_signatures[row]).sum(axis=1, dtype=np.uint16)
+        agreement[~self._same_type(row)] = 0
+        agreement[row] = 0
+        best = _top_k(np.arange(len(agreement)), agreement, max(_NAME_CANDIDATES, k))
+        anchor = self.normalized_names[row]
+        scored = np.array([name_similarity(anchor, self.normalized_names[j]) for j, _ in best])
+        return _top_k(np.array([j for j, _ in best], dtype=np.int64), scored, k) if best else []
+    
+    def similar_schemas(self, row: int, k: int) -> List[tuple]:
+        """Top k datasets by Jaccard similarity of their (fieldPath, type) sets to a row."""
+        if not self.schema_sizes[row]:
+            return []
+        overlaps = (self.schema_matrix[row] @ self._schema_postings).tocoo()
+        rows = overlaps.col.astype(np.int64)
+        intersections = overlaps.data
+        keep = rows != row
+        rows, intersections = rows[keep], intersections[keep]
+        scores = intersections / (self.schema_sizes[row] + self.schema_sizes[rows] - intersections)
+        return _top_k(rows, scores.astype(np.float64), k)
+    
+    def similar_descriptions(self, row: int, k: int) -> List[tuple]:
+        """Top k same-type assets by TF-IDF cosine similarity of their descriptions to a row."""
+        products = (self.description_matrix[row] @ self.description_postings).tocoo()
+        rows = products.col.astype(np.int64)
+        keep = (rows != row) & self._same_type(row)[rows]
+        return _top_k(rows[keep], np.minimum(products.data[keep], 1.0).astype(np.float64), k)
+    
+    def similar(self, urn: str, k: int, name_similarity: Callable[[str, str], float],
+                signals: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """The k most similar assets to a URN per signal; raises KeyError for an unknown URN."""
+        row = self.rows[urn]
+        signals = SIGNALS if signals is None else signals
+        matches = {}
+        for signal in signals:
+            if signal == 'name':
+                ranked = self.similar_names(row, k, name_similarity)
+            elif signal == 'schema':
+                ranked = self.similar_schemas(row, k)
+            elif signal == 'description':
+                ranked = self.similar_descriptions(row, k)
+            else:
+                raise ValueError(f"Unknown signal: {signal} (choose from {', '.join(SIGNALS)})")
+            matches[signal] = [{**self.assets[j], 'score': round(score, 4)} for j, score in ranked]
+        return {'asset': self.assets[row], 'matches': matches}
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Offline catalog snapshots for the DataHub Duplicate Detector
+
+A snapshot is a local file of assets that detection can run on instead of
+scrolling a live GMS. Two layouts are read, in either a JSON array or one
+value per line (JSON Lines):
+
+- search results, as written by SnapshotWriter: one GraphQL entity per
+  value, optionally wrapped in a search result (``{"entity": {...}}``)
+- metadata change proposals and events (MCP/MCE), as produced by
+  metadata_generator or a DataHub file sink; aspects are merged per URN into
+  entities shaped like the search results
+
+Files are memory-mapped and decoded a chunk at a time, so a large snapshot
+is never read into memory as a whole.
+"""
+
+import codecs
+import json
+import logging
+import mmap
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes decoded from the memory map at a time
+_CHUNK_SIZE = 1 << 20
+
+_FIRST_VALUE = re.compile(rb'\S')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+# Aspects holding an entity's display name and description
+_INFO_ASPECTS = {'datasetProperties', 'chartInfo', 'dashboardInfo', 'dataFlowInfo', 'dataJobInfo'}
+
+# Schema field type classes in MCPs -> SchemaFieldDataType values returned by GraphQL
+_FIELD_TYPES = {
+    'BooleanType': 'BOOLEAN',
+    'FixedType': 'FIXED',
+    'StringType': 'STRING',
+    'BytesType': 'BYTES',
+    'NumberType': 'NUMBER',
+    'DateType': 'DATE',
+    'TimeType': 'TIME',
+    'EnumType': 'ENUM',
+    'NullType': 'NULL',
+    'MapType': 'MAP',
+    'ArrayType': 'ARRAY',
+    'UnionType': 'UNION',
+    'RecordType': 'STRUCT'
+}
+
+def _iter_json_values(mapped) -> Iterator[Any]:
+    """Yield the top-level values of a JSON array or of concatenated JSON values (JSON Lines).
+    
+    Bytes are decoded from the map in chunks; only the chunk being parsed and
+    the value it ends in are held as text.
+    """
+    first = _FIRST_VALUE.search(mapped)
+    if first is None:
+        return
+    in_array = mapped[first.start():first.start() + 1] == b'['
+    offset = first.start() + 1 if in_array else first.start()
+    size = len(mapped)
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    index = 0
+    
+    while True:
+        index = _SEPARATORS.match(buffer, index).end()
+        if index == len(buffer):
+            if offset >= size:
+                if in_array:
+                    raise ValueError("Snapshot ends inside its top-level JSON array")
+                return
+            buffer = text_decoder.decode(mapped[offset:offset + _CHUNK_SIZE], offset + _CHUNK_SIZE >= size)
+            offset += _CHUNK_SIZE
+            index = 0
+            continue
+        if in_array and buffer[index] == ']':
+            return
+        
+        try:
+            value, end = decoder.raw_decode(buffer, index)
+        except json.JSONDecodeError:
+            if offset >= size:
+                raise
+            end = None
+        # A value running to the end of the buffer may continue in the next chunk
+        if end is None or (end == len(buffer) and offset < size):
+            read = max(_CHUNK_SIZE, len(buffer) - index)
+            buffer = buffer[index:] + text_decoder.decode(mapped[offset:offset + read], offset + read >= size)
+            offset += read
+            index = 0
+            continue
+        yield value
+        index = end
+
+def _urn_key_parts(urn: str) -> List[str]:
+    """Split the key of a tuple URN, e.g. ``urn:li:dataset:(platform,name,env)``, at its top-level commas."""
+    key = urn.split(':', 3)[3] if urn.count(':') >= 3 else ''
+    if not (key.startswith('(') and key.endswith(')')):
+        return [key]
+    parts, depth, start = [], 0, 1
+    for position, char in enumerate(key[1:-1], 1):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(key[start:position])
+            start = position + 1
+    parts.append(key[start:-1])
+    return parts
+
+def _entity_from_urn(urn: str, entity_type: str) -> Dict[str, Any]:
+    """Start an entity with the name and platform encoded in its URN."""
+    parts = _urn_key_parts(urn)
+    platform = parts[0]
+    if entity_type == 'dataJob' and platform.startswith('urn:li:dataFlow:'):
+        platform = _urn_key_parts(platform)[0]
+    if platform.startswith('urn:li:dataPlatform:'):
+        platform = platform[len('urn:li:dataPlatform:'):]
+    return {
+        'urn': urn,
+        'type': entity_type,
+        'name': parts[1] if len(parts) > 1 else parts[0],
+        'platform': {'name': platform if len(parts) > 1 else ''},
+        'properties': None,
+        'schemaMetadata': None,
+        'upstreamLineage': None,
+        'downstreamLineage': None,
+        'dataTransformLogic': None
+    }
+
+def _field_type(field_type: Any) -> Any:
+    """Map an MCP schema field type (``{"type": {"com.linkedin.schema.StringType": {}}}``) to its GraphQL value."""
+    if isinstance(field_type, dict):
+        type_class = next(iter(field_type.get('type') or {}), '')
+        return _FIELD_TYPES.get(type_class.rsplit('.', 1)[-1], type_class)
+    return field_type
+
+def _apply_aspect(entity: Dict[str, Any], aspect_name: str, aspect: Dict[str, Any]) -> None:
+    """Fold one aspect into an entity in the shape of the detector's scroll query."""
+    if aspect_name in _INFO_ASPECTS:
+        properties = entity['properties'] or {}
+        name = aspect.get('name') or aspect.get('title')
+        if name:
+            properties['name'] = name
+            if entity['type'] != 'dataset':
+                entity['name'] = name
+        if 'description' in aspect:
+            properties['description'] = aspect['description']
+        if aspect.get('customProperties'):
+            properties['customProperties'] = [
+                {'key': key, 'value': value} for key, value in aspect['customProperties'].items()
+            ]
+        entity['properties'] = properties
+    elif aspect_name == 'datasetKey':
+        entity['name'] = aspect.get('name', entity['name'])
+        platform = aspect.get('platform', '')
+        if platform:
+            entity['platform'] = {'name': platform.rsplit(':', 1)[-1]}
+    elif aspect_name == 'schemaMetadata':
+        entity['schemaMetadata'] = {'fields': [
+            {
+                'fieldPath': field.get('fieldPath'),
+                'type': _field_type(field.get('type')),
+                'nativeDataType': field.get('nativeDataType'),
+                'description': field.get('description')
+            }
+            for field in aspect.get('fields') or []
+        ]}
+    elif aspect_name == 'upstreamLineage':
+        entity['upstreamLineage'] = {'upstreams': [
+            {'dataset': {'urn': upstream['dataset']}}
+            for upstream in aspect.get('upstreams') or []
+            if upstream.get('dataset')
+        ]}
+    elif aspect_name == 'dataTransformLogic':
+        entity['dataTransformLogic'] = {'transforms': [
+            {'queryStatement': {'value': transform['queryStatement'].get('value')}}
+            for transform in aspect.get('transforms') or []
+            if transform.get('queryStatement')
+        ]}
+    elif aspect_name == 'status':
+        entity['removed'] = bool(aspect.get('removed'))
+
+def _proposal_aspect(aspect: Any) -> Dict[str, Any]:
+    """Unwrap an MCP aspect that was serialized as ``{"value": "<json>"}`` or ``{"json": {...}}``."""
+    if isinstance(aspect, dict):
+        if isinstance(aspect.get('value'), str) and 'contentType' in aspect:
+            return json.loads(aspect['value'])
+        if isinstance(aspect.get('json'), dict):
+            return aspect['json']
+        return aspect
+    return {}
+
+class SnapshotReader:
+    """Streams the assets of a snapshot file.
+    
+    Search-result entities are yielded as they are read. MCPs and MCEs are
+    merged per URN and yielded once the whole file has been read, with
+    downstream lineage derived from the upstream edges; entities whose
+    ``status`` aspect marks them removed are left out, as in a live search.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.skipped = 0
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        entities: Dict[str, Dict[str, Any]] = {}
+        read = 0
+        with open(self.path, 'rb') as snapshot_file:
+            if os.fstat(snapshot_file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for value in _iter_json_values(mapped):
+                    if not isinstance(value, dict):
+                        self.skipped += 1
+                    elif 'proposedSnapshot' in value:
+                        self._merge_event(entities, value['proposedSnapshot'])
+                    elif 'entityUrn' in value and 'aspectName' in value:
+                        entity = self._entity(entities, value['entityUrn'], value.get('entityType'))
+                        _apply_aspect(entity, value['aspectName'], _proposal_aspect(value.get('aspect')))
+                    elif isinstance(value.get('entity'), dict) or 'urn' in value:
+                        read += 1
+                        yield value.get('entity') if isinstance(value.get('entity'), dict) else value
+                    else:
+                        self.skipped += 1
+        
+        self._add_downstreams(entities)
+        for entity in entities.values():
+            if not entity.pop('removed', False):
+                read += 1
+                yield entity
+        if self.skipped:
+            logger.warning(f"Skipped {self.skipped} values in {self.path} that are not assets or aspects")
+        logger.info(f"Read {read} assets from snapshot {self.path}")
+    
+    def _entity(self, entities: Dict[str, Dict[str, Any]], urn: str,
+                entity_type: Optional[str]) -> Dict[str, Any]:
+        entity = entities.get(urn)
+        if entity is None:
+            entity_type = entity_type or (urn.split(':')[2] if urn.count(':') >= 2 else '')
+            entity = entities[urn] = _entity_from_urn(urn, entity_type)
+        return entity
+    
+    def _merge_event(self, entities: Dict[str, Dict[str, Any]], proposed: Dict[str, Any]) -> None:
+        """Merge an MCE's ``{"<...>Snapshot": {"urn": ..., "aspects": [{"<...>.AspectClass": {...}}]}}``."""
+        for snapshot in proposed.values():
+            urn = snapshot.get('urn')
+            if not urn:
+                self.skipped += 1
+                continue
+            entity = self._entity(entities, urn, None)
+            for aspect in snapshot.get('aspects') or []:
+                for aspect_class, body in aspect.items():
+                    class_name = aspect_class.rsplit('.', 1)[-1]
+                    _apply_aspect(entity, class_name[:1].lower() + class_name[1:], body or {})
+    
+    def _add_downstreams(self, entities: Dict[str, Dict[str, Any]]) -> None:
+        """Invert dataset upstream edges into downstreamLineage, which has no aspect of its own."""
+        for entity in entities.values():
+            if entity['type'] != 'dataset' or entity.get('removed'):
+                continue
+            for upstream in (entity['upstreamLineage'] or {}).get('upstreams', []):
+                source = entities.get(upstream['dataset']['urn'])
+                if source is None or source['type'] != 'dataset':
+                    continue
+                downstream = source['downstreamLineage'] or {'downstreams': []}
+                downstream['downstreams'].append({'dataset': {'urn': entity['urn']}})
+                source['downstreamLineage'] = downstream
+
+class SnapshotWriter:
+    """Captures scanned assets to a JSON Lines snapshot that SnapshotReader can replay.
+    
+    Lines go to a ``.part`` file that only replaces the snapshot once the scan
+    completes, so an interrupted capture never leaves a truncated snapshot.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._part_path = f"{path}.part"
+        self._file = open(self._part_path, 'w')
+    
+    def capture(self, assets: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Write each asset as it passes through, then publish the snapshot."""
+        try:
+            for asset in assets:
+                self._file.write(json.dumps(asset))
+                self._file.write("\n")
+                self.count += 1
+                yield asset
+        except BaseException:
+            self.discard()
+            raise
+        self.close()
+    
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._part_path, self.path)
+        logger.info(f"Captured {self.count} assets to snapshot {self.path}")
+    
+    def discard(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.remove(self._part_path)
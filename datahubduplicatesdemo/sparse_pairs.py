@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Chunked row-pair products of sparse matrices for the DataHub Duplicate Detector
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+# Candidate pairs whose sparse row products are computed at once
+PAIR_CHUNK = 1 << 20
+
+# Stored entries of both gathered row slices per chunk
+PAIR_NONZEROS = 1 << 22
+
+def _pair_chunks(matrix, rows: np.ndarray, cols: np.ndarray) -> Iterator[Tuple[int, int]]:
+    """(start, end) pair ranges gathering about PAIR_NONZEROS entries and at most PAIR_CHUNK pairs each."""
+    row_nonzeros = matrix.getnnz(axis=1)
+    gathered = np.cumsum(row_nonzeros[rows] + row_nonzeros[cols], dtype=np.int64)
+    start = 0
+    while start < len(rows):
+        budget = (gathered[start - 1] if start else 0) + PAIR_NONZEROS
+        end = int(np.searchsorted(gathered, budget, side='right'))
+        end = min(max(end, start + 1), start + PAIR_CHUNK)
+        yield start, end
+        start = end
+
+def pair_products(matrix, rows: np.ndarray, cols: np.ndarray,
+                  stats: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """Dot products of matrix rows ``rows[k]`` and ``cols[k]`` for every k, as float64.
+
+    Rows are gathered a chunk of pairs at a time, sized by the rows' stored
+    entries so the two sliced matrices held at once stay near PAIR_NONZEROS
+    entries however dense the rows are. The number of pairs is added to
+    ``stats['scored_pairs']``.
+    """
+    if stats is not None:
+        stats['scored_pairs'] = stats.get('scored_pairs', 0) + len(rows)
+    if not len(rows):
+        return np.empty(0, dtype=np.float64)
+    return np.concatenate([
+        np.asarray(matrix[rows[start:end]].multiply(matrix[cols[start:end]]).sum(axis=1),
+                   dtype=np.float64).ravel()
+        for start, end in _pair_chunks(matrix, rows, cols)
+    ])
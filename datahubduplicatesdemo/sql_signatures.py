@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+SQL-body signatures for stored procedure and data job duplicate detection
+
+Procedures generated from one template (``sp_LoadTBL_0421_From1``,
+``sp_LoadTBL_0421_From2``, ...) differ only in literals, whitespace, comments
+and a few identifiers. Bodies are normalized into tokens, and MinHash
+signatures over overlapping token shingles let LSH bucket near-duplicate
+bodies without comparing every pair.
+"""
+
+import re
+from typing import List, Optional, Set
+import numpy as np
+from minhash_lsh import MinHasher, hash_tokens
+
+# One SQL token; comments are dropped, and string and numeric literals become placeholders
+_TOKEN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>N?'(?:[^']|'')*')
+  | (?P<number>0x[0-9A-Fa-f]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<identifier>\[[^\]]*\]|"(?:[^"]|"")*"|`[^`]*`|[@#]*[A-Za-z_][\w@$#]*)
+  | (?P<symbol><>|!=|<=|>=|\|\||::|[^\s\w])
+""", re.VERBOSE | re.DOTALL)
+
+def sql_tokens(sql: str) -> List[str]:
+    """Tokenize a SQL body with comments removed, literals replaced by ``?`` and identifiers unquoted and lowercased."""
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        if kind in ('string', 'number'):
+            tokens.append('?')
+        elif kind == 'identifier':
+            token = match.group()
+            if token[0] in '["`':
+                token = token[1:-1]
+            tokens.append(token.lower())
+        else:
+            tokens.append(match.group())
+    return tokens
+
+def token_shingles(tokens: List[str], size: int = 5) -> Set[str]:
+    """Return the overlapping runs of ``size`` tokens, or the whole body when it is shorter."""
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+class SqlSignatures:
+    """Computes MinHash signatures of SQL bodies over normalized token shingles."""
+    
+    def __init__(self, shingle_size: int = 5, num_perm: int = 128, seed: int = 1):
+        self.shingle_size = shingle_size
+        self._hasher = MinHasher(num_perm, seed=seed)
+    
+    def signature(self, sql: str) -> Optional[np.ndarray]:
+        """Return the signature of one SQL body, or None when it has no tokens."""
+        shingles = token_shingles(sql_tokens(sql), self.shingle_size)
+        if not shingles:
+            return None
+        return self._hasher.signature(hash_tokens(shingles))
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation for the DataHub Duplicate Detector
+
+Each stage of a run (ingest, then one per detection type) records wall time,
+CPU time, peak RSS, pairs compared and pruned, GraphQL bytes fetched and
+findings. Results can be written as a Prometheus textfile (for the
+node_exporter textfile collector) and as a JSON summary.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, where it can be read cheaply."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus its reaped children, such as detection worker processes."""
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+class PeakRssSampler:
+    """Samples this process's RSS from /proc/self/statm on a background thread.
+    
+    On platforms without it, stop() falls back to the process-wide ru_maxrss.
+    """
+    
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_bytes: Optional[int] = None
+        self._stop = threading.Event()
+        self._peak = 0
+        self._thread: Optional[threading.Thread] = None
+    
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, current_rss_bytes() or 0)
+    
+    def start(self) -> 'PeakRssSampler':
+        self.start_bytes = current_rss_bytes()
+        self._peak = self.start_bytes or 0
+        if self.start_bytes is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self) -> Optional[int]:
+        """Stop sampling and return the peak RSS in bytes, if it could be measured."""
+        if self._thread is None:
+            return max_rss_bytes()
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return max(self._peak, current_rss_bytes() or 0)
+
+@dataclass
+class StageMetrics:
+    """What one stage of a detection run cost."""
+    stage: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: Optional[int] = None
+    # Pairs whose similarity was actually computed
+    comparisons: int = 0
+    # Pairs in the stage's search space that blocking, indexing or filtering skipped
+    pruned_pairs: int = 0
+    graphql_bytes: int = 0
+    findings: int = 0
+
+# Prometheus metric name suffix, help text and StageMetrics field
+_PROMETHEUS_METRICS = [
+    ('stage_wall_seconds', 'Wall-clock time of a detection stage', 'wall_seconds'),
+    ('stage_cpu_seconds', 'CPU time of a detection stage, including worker processes', 'cpu_seconds'),
+    ('stage_peak_rss_bytes', 'Peak resident set size of the detector process during a stage', 'peak_rss_bytes'),
+    ('stage_comparisons', 'Asset pairs scored by a detection stage', 'comparisons'),
+    ('stage_pruned_pairs', 'Asset pairs skipped by blocking, indexing or filtering in a stage', 'pruned_pairs'),
+    ('stage_graphql_bytes', 'GraphQL response bytes fetched during a stage', 'graphql_bytes'),
+    ('stage_findings', 'Duplicate findings produced by a stage', 'findings')
+]
+
+_METRIC_PREFIX = 'datahub_duplicates_'
+
+class DetectionMetrics:
+    """Collects StageMetrics for the stages of one detection run.
+    
+    Counters are added to the stage that is currently open, from any thread.
+    Time spent while a stage is paused (e.g. while its findings are handed
+    to the report writers) is not charged to it.
+    """
+    
+    def __init__(self):
+        self.started = datetime.now()
+        self.stages: Dict[str, StageMetrics] = {}
+        self._current: Optional[StageMetrics] = None
+        self._lock = threading.Lock()
+        self._wall = 0.0
+        self._cpu = 0.0
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Measure one stage; stages must not overlap."""
+        metrics = self.stages.setdefault(name, StageMetrics(stage=name))
+        sampler = PeakRssSampler().start()
+        with self._lock:
+            self._current = metrics
+        self._wall, self._cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_seconds += time.perf_counter() - self._wall
+            metrics.cpu_seconds += _cpu_seconds() - self._cpu
+            peak = sampler.stop()
+            if peak is not None:
+                metrics.peak_rss_bytes = max(metrics.peak_rss_bytes or 0, peak)
+            with self._lock:
+                self._current = None
+    
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Stop charging wall and CPU time to the open stage for the duration of the block."""
+        metrics = self._current
+        if metrics is None:
+            yield
+            return
+        metrics.wall_seconds += time.perf_counter() - self._wall
+        metrics.cpu_seconds += _cpu_seconds() - self._cpu
+        try:
+            yield
+        finally:
+            self._wall, self._cpu = time.perf_counter(), _cpu_seconds()
+    
+    def count(self, comparisons: int = 0, pruned_pairs: int = 0, graphql_bytes: int = 0) -> None:
+        """Add to the counters of the open stage; ignored when no stage is open."""
+        with self._lock:
+            if self._current is None:
+                return
+            self._current.comparisons += comparisons
+            self._current.pruned_pairs += pruned_pairs
+            self._current.graphql_bytes += graphql_bytes
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return the run's stages and totals as a JSON-serializable dict."""
+        stages = [asdict(metrics) for metrics in self.stages.values()]
+        totals = {
+            key: sum(stage[key] for stage in stages)
+            for key in ('wall_seconds', 'cpu_seconds', 'comparisons', 'pruned_pairs', 'graphql_bytes', 'findings')
+        }
+        peaks = [stage['peak_rss_bytes'] for stage in stages if stage['peak_rss_bytes'] is not None]
+        totals['peak_rss_bytes'] = max(peaks) if peaks else None
+        return {'started': self.started.isoformat(timespec='seconds'), 'stages': stages, 'totals': totals}
+    
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+    
+    def prometheus_lines(self) -> List[str]:
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+        for suffix, help_text, field_name in _PROMETHEUS_METRICS:
+            name = _METRIC_PREFIX + suffix
+            lines.append(f"# HELP {name} {help_text}.")
+            lines.append(f"# TYPE {name} gauge")
+            for metrics in self.stages.values():
+                value = getattr(metrics, field_name)
+                if value is not None:
+                    lines.append(f'{name}{{stage="{metrics.stage}"}} {value:g}' if isinstance(value, float)
+                                 else f'{name}{{stage="{metrics.stage}"}} {value}')
+        name = _METRIC_PREFIX + 'last_run_timestamp_seconds'
+        lines.append(f"# HELP {name} Unix time the last detection run started.")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {self.started.timestamp():.0f}")
+        return lines
+    
+    def write_prometheus(self, path: str) -> None:
+        """Write a Prometheus textfile, replacing it atomically so the collector never reads half a file."""
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as f:
+            f.write("\n".join(self.prometheus_lines()))
+            f.write("\n")
+        os.replace(temporary_path, path)
+    
+    def log_lines(self) -> List[str]:
+        """One human-readable line per stage for the run log."""
+        return [
+            f"{metrics.stage}: {metrics.wall_seconds:.2f}s wall, {metrics.cpu_seconds:.2f}s CPU, "
+            f"{metrics.comparisons} compared, {metrics.pruned_pairs} pruned, "
+            f"peak RSS {(metrics.peak_rss_bytes or 0) / 2**20:.0f} MB, "
+            f"{metrics.graphql_bytes / 2**20:.1f} MB GraphQL, {metrics.findings} findings"
+            for metrics in self.stages.values()
+        ]
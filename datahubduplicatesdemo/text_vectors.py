@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Hashed TF-IDF vectors and blocked sparse cosine search for asset descriptions
+"""
+
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from sparse_pairs import pair_products
+
+# Slack for floating point error when comparing cosines against a threshold
+_COSINE_EPSILON = 1e-9
+
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+class HashedTfidfVectorizer:
+    """Turns text into L2-normalized TF-IDF vectors over hashed word n-grams.
+    
+    Terms are hashed into a fixed number of features, so no vocabulary has to be
+    built or stored and term counts computed for one description stay valid for
+    any corpus. Setting ``max_df`` below 1.0 drops terms found in more than that
+    share of the documents, which keeps boilerplate from making the similarity
+    product dense but can hide descriptions made only of common words.
+    """
+    
+    def __init__(self, n_features: int = 1 << 20, ngram_range: Tuple[int, int] = (1, 2),
+                 max_df: float = 1.0):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.max_df = max_df
+    
+    def terms(self, text: str) -> List[str]:
+        """Return the lower-cased word n-grams of a text."""
+        words = _TOKEN_PATTERN.findall(text.lower())
+        low, high = self.ngram_range
+        return [
+            ' '.join(words[i:i + n])
+            for n in range(low, high + 1)
+            for i in range(len(words) - n + 1)
+        ]
+    
+    def term_counts(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (feature indices, counts) for one text, indices sorted ascending."""
+        features = np.fromiter(
+            (zlib.crc32(term.encode('utf-8')) % self.n_features for term in self.terms(text)),
+            dtype=np.int64
+        )
+        indices, counts = np.unique(features, return_counts=True)
+        return indices.astype(np.int32), counts.astype(np.float32)
+    
+    def transform_counts(self, term_counts: Sequence[Tuple[np.ndarray, np.ndarray]]) -> sparse.csr_matrix:
+        """Weight precomputed term counts by sublinear TF and corpus IDF into unit rows."""
+        indptr = np.zeros(len(term_counts) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(indices) for indices, _ in term_counts])
+        indices = np.concatenate([idx for idx, _ in term_counts]) if term_counts else np.empty(0, np.int32)
+        counts = np.concatenate([cnt for _, cnt in term_counts]) if term_counts else np.empty(0, np.float32)
+        matrix = sparse.csr_matrix((1.0 + np.log(counts), indices, indptr),
+                                   shape=(len(term_counts), self.n_features), dtype=np.float32)
+        
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        idf = np.log((1.0 + len(term_counts)) / (1.0 + document_frequency)) + 1.0
+        if self.max_df < 1.0:
+            idf[document_frequency > max(1.0, self.max_df * len(term_counts))] = 0.0
+        matrix = matrix @ sparse.diags(idf.astype(np.float32))
+        matrix.eliminate_zeros()
+        
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix, dtype=np.float32)
+    
+    def fit_transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """Vectorize a corpus of texts."""
+        return self.transform_counts([self.term_counts(text) for text in texts])
+
+def _suffix_matrix(matrix: sparse.csr_matrix, threshold: float) -> sparse.csr_matrix:
+    """Drop each row's most common features while their norm stays below threshold.
+    
+    With unit rows, features whose combined norm is below t can contribute less
+    than t to any dot product, so a pair with cosine >= t must share at least
+    one of the remaining (rarer) features of either row.
+    """
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    row_of_entry = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    order = np.lexsort((-document_frequency[matrix.indices], row_of_entry))
+    squared = matrix.data[order].astype(np.float64) ** 2
+    running = np.cumsum(squared)
+    row_totals_before = np.concatenate(([0.0], running))[matrix.indptr[:-1]]
+    running -= np.repeat(row_totals_before, np.diff(matrix.indptr))
+    in_suffix = running >= threshold * threshold * (1.0 - 1e-6)
+    
+    kept = order[in_suffix]
+    kept.sort()
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(row_of_entry[kept], minlength=matrix.shape[0]))
+    return sparse.csr_matrix((matrix.data[kept], matrix.indices[kept], indptr), shape=matrix.shape)
+
+def cosine_top_k(matrix: sparse.csr_matrix, threshold: float, top_k: int = 100,
+                 max_block_entries: int = 1 << 24, row_start: int = 0,
+                 row_end: Optional[int] = None, stats: Optional[Dict[str, int]] = None
+                 ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Yield (i, js, scores) for rows with later rows at cosine >= threshold.
+    
+    Rows must be L2-normalized. Candidates for a block of rows come from a sparse
+    product of their rare-feature suffixes against the whole matrix, so pairs
+    that only share boilerplate terms are never scored. Cosines for all
+    candidates of a block are then computed in one sparse product. At most
+    ``top_k`` of the best matches are kept per row, and matches are returned
+    sorted by row number. ``row_start`` and ``row_end`` restrict the anchor rows.
+    The number of candidate pairs scored is added to ``stats['scored_pairs']``.
+    """
+    threshold = max(threshold, 1e-9)
+    suffixes = _suffix_matrix(matrix, threshold)
+    matrix_t = matrix.T.tocsr()
+    block_size = max(1, max_block_entries // max(1, matrix.shape[0]))
+    row_end = matrix.shape[0] if row_end is None else min(row_end, matrix.shape[0])
+    for block_start in range(row_start, row_end, block_size):
+        block_end = min(block_start + block_size, row_end)
+        candidates = (suffixes[block_start:block_end] @ matrix_t).tocoo()
+        rows = candidates.row.astype(np.int64) + block_start
+        cols = candidates.col.astype(np.int64)
+        keep = cols > rows
+        rows, cols = rows[keep], cols[keep]
+        if not len(rows):
+            continue
+        
+        scores = np.minimum(pair_products(matrix, rows, cols, stats), 1.0)
+        matched = scores >= threshold - _COSINE_EPSILON
+        rows, cols, scores = rows[matched], cols[matched], scores[matched]
+        
+        # Best top_k per row, then back into row/column order
+        order = np.lexsort((-scores, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+        best = rank < top_k
+        rows, cols, scores = rows[best], cols[best], scores[best]
+        order = np.lexsort((cols, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        
+        boundaries = np.flatnonzero(np.diff(rows)) + 1
+        for row_rows, row_cols, row_scores in zip(np.split(rows, boundaries), np.split(cols, boundaries),
+                                                  np.split(scores, boundaries)):
+            if len(row_rows):
+                yield int(row_rows[0]), row_cols, row_scores
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+One-pass threshold sweeps for the DataHub Duplicate Detector
+
+A stage is scored once at the lowest threshold of the sweep. Every candidate
+pair at or above it is kept in a compact ScoreMatrix, and the clusters for
+every threshold are then derived from that matrix in a single union-find
+pass over the pairs in descending score order.
+"""
+
+from typing import Any, Callable, Dict, List, Sequence
+import numpy as np
+from asset_records import AssetRecord
+from clustering import UnionFind
+
+class ScoreMatrix:
+    """Scored candidate pairs of one stage as parallel int32 row, int32 column and float64 score arrays.
+    
+    Rows of every group are numbered in one row space (group after group),
+    and pairs are sorted by descending score, so the pairs above any threshold
+    are a prefix of the arrays. Scores keep full precision so that a pair
+    exactly at a threshold is counted as a detection run would count it.
+    """
+    
+    def __init__(self, size: int, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray):
+        order = np.argsort(-scores, kind='stable')
+        self.size = size
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.scores = scores[order]
+    
+    @classmethod
+    def from_group_matches(cls, groups: Dict[str, List[AssetRecord]],
+                           group_matches: Dict[str, List[Any]]) -> 'ScoreMatrix':
+        """Build the matrix from a stage's anchor matches, (i, [(j, score), ...]) per group."""
+        rows, cols, scores = [], [], []
+        offset = 0
+        for key, group in groups.items():
+            for i, matches in group_matches.get(key, []):
+                for j, score in matches:
+                    rows.append(offset + i)
+                    cols.append(offset + j)
+                    scores.append(score)
+            offset += len(group)
+        return cls(offset, np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32),
+                   np.array(scores, dtype=np.float64))
+    
+    def __len__(self) -> int:
+        return len(self.scores)
+    
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.cols.nbytes + self.scores.nbytes
+    
+    def pairs_at_least(self, threshold: float) -> int:
+        """Number of pairs scoring at least threshold."""
+        return int(np.searchsorted(-self.scores, -threshold, side='right'))
+
+def sweep_clusters(matrix: ScoreMatrix, thresholds: Sequence[float], min_assets: int,
+                   confidence: Callable[[float], str]) -> List[Dict[str, Any]]:
+    """Cluster counts and findings for every threshold, in the order the thresholds were given.
+    
+    Pairs are merged from the highest score down; at each threshold the
+    clusters of at least min_assets rows are the findings a detection run at
+    that threshold would report, with confidence from their mean pair score.
+    """
+    union_find = UnionFind(matrix.size)
+    score_sums: Dict[int, float] = {}
+    pair_counts: Dict[int, int] = {}
+    reported = set()
+    rows, cols, scores = matrix.rows.tolist(), matrix.cols.tolist(), matrix.scores.tolist()
+    
+    results = {}
+    position = 0
+    for threshold in sorted(set(thresholds), reverse=True):
+        end = matrix.pairs_at_least(threshold)
+        for i, j, score in zip(rows[position:end], cols[position:end], scores[position:end]):
+            root1, root2 = union_find.find(i), union_find.find(j)
+            if root1 != root2:
+                union_find.union(root1, root2)
+                root = union_find.find(root1)
+                other = root2 if root == root1 else root1
+                reported.discard(other)
+                score_sums[root] = score_sums.get(root, 0.0) + score_sums.pop(other, 0.0)
+                pair_counts[root] = pair_counts.get(root, 0) + pair_counts.pop(other, 0)
+            else:
+                root = root1
+            score_sums[root] = score_sums.get(root, 0.0) + score
+            pair_counts[root] = pair_counts.get(root, 0) + 1
+            if union_find.set_size(root) >= min_assets:
+                reported.add(root)
+        position = end
+        
+        by_confidence = {'high': 0, 'medium': 0, 'low': 0}
+        for root in reported:
+            by_confidence[confidence(score_sums[root] / pair_counts[root])] += 1
+        sizes = [union_find.set_size(root) for root in reported]
+        results[threshold] = {
+            'threshold': threshold,
+            'pairs': end,
+            'findings': len(reported),
+            'clustered_assets': sum(sizes),
+            'largest_cluster': max(sizes, default=0),
+            'confidence': by_confidence
+        }
+    return [results[threshold] for threshold in thresholds]